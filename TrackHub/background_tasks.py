@@ -0,0 +1,46 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executor = None
+
+
+def _get_executor():
+    global _executor
+
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_TASKS_MAX_WORKERS,
+                thread_name_prefix='trackhub-tasks',
+            )
+        return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed", func.__name__)
+    finally:
+        # Database connections of worker threads are not closed by request_finished
+        connections.close_all()
+
+
+def submit(func, *args, **kwargs):
+    """Runs func in the process-wide worker pool, or inline when BACKGROUND_TASKS_ALWAYS_EAGER is set."""
+    if settings.BACKGROUND_TASKS_ALWAYS_EAGER:
+        return func(*args, **kwargs)
+
+    return _get_executor().submit(_run, func, args, kwargs)
+
+
+def submit_on_commit(func, *args, **kwargs):
+    """Submits func once the current transaction commits, so the task never sees rolled back data."""
+    transaction.on_commit(lambda: submit(func, *args, **kwargs))
@@ -0,0 +1,117 @@
+"""
+Namespaced cache keys ``<namespace>:<version>:<parts>`` on top of the Django cache.
+Objects are dropped by deleting their keys, whole namespaces by replacing the version.
+Versions are random tokens, so a lost version key never brings back a version handed
+out before. No entry, version keys included, outlives CACHE_MAX_TIMEOUT.
+"""
+import hashlib
+import uuid
+from functools import partial
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+VERSION_KEY = '{}:version'
+
+_missing = object()
+
+
+def _new_version():
+    return uuid.uuid4().hex
+
+
+def get_version(namespace):
+    key = VERSION_KEY.format(namespace)
+
+    version = cache.get(key)
+    if version is None:
+        version = _new_version()
+        # Параллельный запрос мог успеть записать свою версию
+        if not cache.add(key, version, get_timeout()):
+            version = cache.get(key, version)
+    return version
+
+
+def get_timeout(timeout=None):
+    """Timeout capped by CACHE_MAX_TIMEOUT, None means the cap itself."""
+    if timeout is None:
+        return settings.CACHE_MAX_TIMEOUT
+    return min(timeout, settings.CACHE_MAX_TIMEOUT)
+
+
+def get_versions(namespaces) -> dict:
+    """Versions of several namespaces with one round trip, by namespace."""
+    keys = {VERSION_KEY.format(namespace): namespace for namespace in namespaces}
+
+    found = cache.get_many(keys)
+    return {
+        namespace: found[key] if key in found else get_version(namespace)
+        for key, namespace in keys.items()
+    }
+
+
+def _make_key(namespace, version, parts):
+    return ':'.join([namespace, str(version), *map(str, parts)])
+
+
+def make_key(namespace, *parts):
+    return _make_key(namespace, get_version(namespace), parts)
+
+
+def hash_part(value):
+    """Short stable key part for long values like URLs."""
+    return hashlib.md5(str(value).encode()).hexdigest()
+
+
+def get_or_set(namespace, parts, build, timeout=None):
+    """Returns the cached value of the key or stores the result of build() under it."""
+    key = make_key(namespace, *parts)
+
+    value = cache.get(key, _missing)
+    if value is _missing:
+        value = build()
+        cache.set(key, value, get_timeout(timeout))
+    return value
+
+
+def get_or_set_many(namespace, items, get_parts, build_many, timeout=None):
+    """
+    Same as get_or_set for several items with one round trip each way.
+
+    build_many() gets the items missing from the cache and returns their values in the same order.
+    """
+    version = get_version(namespace)
+    keys = [_make_key(namespace, version, get_parts(item)) for item in items]
+
+    values = cache.get_many(keys)
+    missing = [(key, item) for key, item in zip(keys, items) if key not in values]
+    if missing:
+        built = dict(zip(
+            [key for key, item in missing],
+            build_many([item for key, item in missing]),
+        ))
+        cache.set_many(built, get_timeout(timeout))
+        values.update(built)
+    return [values[key] for key in keys]
+
+
+def get_object(namespace, object_id, build, timeout=None):
+    return get_or_set(namespace, [object_id], build, timeout)
+
+
+def delete_objects(namespace, object_ids):
+    object_ids = list(object_ids)
+    if object_ids:
+        version = get_version(namespace)
+        cache.delete_many([_make_key(namespace, version, [object_id]) for object_id in object_ids])
+
+
+def invalidate_namespace(namespace):
+    """Moves the namespace to a new version, all its keys become unreachable."""
+    cache.set(VERSION_KEY.format(namespace), _new_version(), get_timeout())
+
+
+def invalidate_namespace_on_commit(namespace):
+    # Кэш не должен заполняться данными транзакции, которая может откатиться
+    transaction.on_commit(partial(invalidate_namespace, namespace))
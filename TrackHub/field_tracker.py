@@ -0,0 +1,85 @@
+import copy
+from django.db.models.base import DEFERRED
+from django.db.models.fields.files import FieldFile
+
+
+class FieldTrackerMixin:
+    """
+    Remembers field values an instance was loaded with, so save() overrides
+    can find changed fields without re-reading the row from the database.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            field_name: cls._snapshot_value(value)
+            for field_name, value in zip(field_names, values)
+            if value is not DEFERRED
+        }
+        return instance
+
+    @staticmethod
+    def _snapshot_value(value):
+        if isinstance(value, FieldFile):
+            return value.name
+        if isinstance(value, (dict, list)):
+            # JSON values can be changed in place
+            return copy.deepcopy(value)
+        return value
+
+    def _get_loaded_values(self):
+        if not hasattr(self, '_loaded_values'):
+            self._loaded_values = {}
+            if self.pk is None:
+                return self._loaded_values
+
+            # Instance was built in memory with an existing pk: read the row once
+            row = type(self)._base_manager.filter(pk=self.pk).values(
+                *[field.attname for field in self._meta.concrete_fields]
+            ).first()
+            if row:
+                self._loaded_values = {
+                    attname: self._snapshot_value(value) for attname, value in row.items()
+                }
+        return self._loaded_values
+
+    def snapshot_loaded_values(self, fields=None):
+        """Marks the current values of the fields (all by default) as the ones stored in the database."""
+        if fields is None:
+            self._loaded_values = {}
+            fields = self._meta.concrete_fields
+        else:
+            self._get_loaded_values()
+            fields = [self._meta.get_field(field_name) for field_name in fields]
+
+        for field in fields:
+            if field.attname in self.__dict__:
+                self._loaded_values[field.attname] = self._snapshot_value(self.__dict__[field.attname])
+
+    def get_previous_value(self, field_name):
+        """Value of the field as it was loaded from the database."""
+        field = self._meta.get_field(field_name)
+        return self._get_loaded_values().get(field.attname)
+
+    def has_changed(self, field_name):
+        field = self._meta.get_field(field_name)
+        loaded_values = self._get_loaded_values()
+        if field.attname not in loaded_values:
+            return False
+        return self._snapshot_value(getattr(self, field.attname)) != loaded_values[field.attname]
+
+    def get_changed_fields(self):
+        return [
+            field.name
+            for field in self._meta.concrete_fields
+            if self.has_changed(field.name)
+        ]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.snapshot_loaded_values(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self.snapshot_loaded_values(fields)
@@ -0,0 +1,81 @@
+import threading
+import boto3
+from botocore.config import Config
+from django.conf import settings
+
+
+_lock = threading.Lock()
+_local = threading.local()
+_shared_resource = None
+_stats = {
+    'clients_created': 0,
+    'client_reuses': 0,
+}
+
+
+def get_client_config():
+    return Config(
+        s3={'addressing_style': getattr(settings, 'AWS_S3_ADDRESSING_STYLE', None)},
+        signature_version=getattr(settings, 'AWS_S3_SIGNATURE_VERSION', None),
+        max_pool_connections=settings.AWS_S3_MAX_POOL_CONNECTIONS,
+        tcp_keepalive=settings.AWS_S3_TCP_KEEPALIVE,
+    )
+
+
+def _get_shared_resource():
+    global _shared_resource
+
+    with _lock:
+        if _shared_resource is None:
+            session = boto3.session.Session(
+                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            )
+            _shared_resource = session.resource(
+                's3',
+                region_name=getattr(settings, 'AWS_S3_REGION_NAME', None),
+                endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+                config=get_client_config(),
+            )
+            _stats['clients_created'] += 1
+        else:
+            _stats['client_reuses'] += 1
+
+        return _shared_resource
+
+
+def get_s3_client():
+    """
+    Process-wide S3 client. Clients are thread-safe, so every thread
+    shares the same credentials, endpoint and connection pool.
+    """
+    return _get_shared_resource().meta.client
+
+
+def get_s3_resource():
+    """
+    S3 resource of the current thread. Resources are not thread-safe,
+    so each thread gets its own one on top of the shared client.
+    """
+    shared_resource = _get_shared_resource()
+    resource = getattr(_local, 'resource', None)
+
+    if resource is None or resource.meta.client is not shared_resource.meta.client:
+        resource = type(shared_resource)(client=shared_resource.meta.client)
+        _local.resource = resource
+    return resource
+
+
+def get_s3_client_stats():
+    with _lock:
+        return dict(_stats)
+
+
+def reset_s3_client():
+    """Drops the shared client, the next call creates a new one with current settings."""
+    global _shared_resource
+
+    with _lock:
+        _shared_resource = None
+        _stats['clients_created'] = 0
+        _stats['client_reuses'] = 0
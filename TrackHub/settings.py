@@ -160,6 +160,60 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Кэш: память процесса по умолчанию, Redis при заданном REDIS_URL
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "trackhub",
+        "KEY_PREFIX": "trackhub",
+    }
+}
+if os.getenv('REDIS_URL'):
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv('REDIS_URL'),
+        "KEY_PREFIX": "trackhub",
+    }
+
+# Предельное время жизни любой записи кэша. Память процесса не видит сбросов
+# из других воркеров и post_migrate, поэтому без Redis записи живут минуту
+CACHE_MAX_TIMEOUT = int(os.getenv('CACHE_MAX_TIMEOUT', 24 * 60 * 60 if os.getenv('REDIS_URL') else 60))
+# Время жизни закэшированных списков (публикации, подписки и т.п.)
+CACHE_LIST_TIMEOUT = int(os.getenv('CACHE_LIST_TIMEOUT', 60))
+# Время жизни представлений упражнений, тренировок и планов (ключи меняются вместе с changed_at и версией автора)
+CACHE_REPRESENTATION_TIMEOUT = int(os.getenv('CACHE_REPRESENTATION_TIMEOUT', 24 * 60 * 60))
+# Время жизни справочников: тренажёров и категорий упражнений
+CACHE_REFERENCE_DATA_TIMEOUT = int(os.getenv('CACHE_REFERENCE_DATA_TIMEOUT', 60 * 60))
+
+# Курсорная пагинация списков упражнений, тренировок и планов
+WORKOUT_MANAGER_PAGE_SIZE = int(os.getenv('WORKOUT_MANAGER_PAGE_SIZE', 20))
+WORKOUT_MANAGER_MAX_PAGE_SIZE = int(os.getenv('WORKOUT_MANAGER_MAX_PAGE_SIZE', 100))
+
+# Подписки ссылаются на оригинал, копия создаётся только при изменении
+WORKOUT_MANAGER_COPY_ON_WRITE_SUBSCRIPTIONS = bool(int(os.getenv('WORKOUT_MANAGER_COPY_ON_WRITE_SUBSCRIPTIONS', 1)))
+
+# Загрузка видео упражнений напрямую в хранилище по частям
+WORKOUT_MANAGER_VIDEO_MAX_SIZE_MB = int(os.getenv('WORKOUT_MANAGER_VIDEO_MAX_SIZE_MB', 500))
+WORKOUT_MANAGER_VIDEO_PART_SIZE_MB = int(os.getenv('WORKOUT_MANAGER_VIDEO_PART_SIZE_MB', 8))
+WORKOUT_MANAGER_VIDEO_UPLOAD_URL_EXPIRES = int(os.getenv('WORKOUT_MANAGER_VIDEO_UPLOAD_URL_EXPIRES', 3600))
+# Незавершённые загрузки отменяются командой abort_expired_video_uploads
+WORKOUT_MANAGER_VIDEO_UPLOAD_SESSION_EXPIRES = int(os.getenv('WORKOUT_MANAGER_VIDEO_UPLOAD_SESSION_EXPIRES', 24 * 60 * 60))
+
+# Размеры уменьшенных копий превью и изображений тренажёров
+MEDIA_RENDITION_SIZES = [int(size) for size in os.getenv('MEDIA_RENDITION_SIZES', '160,320,640').split(',')]
+
+# Фоновые задачи (генерация аватарок и т.п.)
+BACKGROUND_TASKS_MAX_WORKERS = int(os.getenv('BACKGROUND_TASKS_MAX_WORKERS', 4))
+BACKGROUND_TASKS_ALWAYS_EAGER = bool(int(os.getenv('BACKGROUND_TASKS_ALWAYS_EAGER', 0)))
+
+# Время жизни закэшированной оценки оригинальности (0 - без кэша)
+WORKOUT_MANAGER_ORIGINALITY_CACHE_TIMEOUT = int(os.getenv('WORKOUT_MANAGER_ORIGINALITY_CACHE_TIMEOUT', 3600))
+
+# Поиск похожих названий при создании упражнения (оценка rapidfuzz от 0 до 100)
+WORKOUT_MANAGER_DUPLICATE_NAME_SCORE = int(os.getenv('WORKOUT_MANAGER_DUPLICATE_NAME_SCORE', 90))
+WORKOUT_MANAGER_DUPLICATE_LIMIT = int(os.getenv('WORKOUT_MANAGER_DUPLICATE_LIMIT', 5))
+WORKOUT_MANAGER_DUPLICATE_INDEX_TIMEOUT = int(os.getenv('WORKOUT_MANAGER_DUPLICATE_INDEX_TIMEOUT', 24 * 60 * 60))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=5),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=30),
@@ -224,6 +278,9 @@ AWS_S3_ENDPOINT_URL = os.getenv('AWS_S3_ENDPOINT_URL')
 AWS_S3_FILE_OVERWRITE = False
 AWS_QUERYSTRING_AUTH = False
 AWS_S3_CUSTOM_DOMAIN = os.getenv('AWS_S3_CUSTOM_DOMAIN')
+# Общий пул соединений с хранилищем на процесс
+AWS_S3_MAX_POOL_CONNECTIONS = int(os.getenv('AWS_S3_MAX_POOL_CONNECTIONS', 50))
+AWS_S3_TCP_KEEPALIVE = bool(int(os.getenv('AWS_S3_TCP_KEEPALIVE', 1)))
 
 STORAGES = {
 
@@ -1,8 +1,16 @@
 from rest_framework.test import APITestCase
 import boto3
+import fakeredis
 import logging
 import os
+import threading
+from unittest import mock
 from django.conf import settings
+from django.core.cache import cache as django_cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.test import override_settings
+from TrackHub import cache, s3_client
+from TrackHub.trackhub_bucket import TrackHubMediaStorage, TrackHubStaticStorage
 
 
 # class StorageS3ConnectionTest(APITestCase):
@@ -25,3 +33,96 @@ from django.conf import settings
 #         get_object_response = s3.get_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key="cat.jpg")
 #         s3.download_file(settings.AWS_STORAGE_BUCKET_NAME,'cat.jpg','my_file.jpg')
 
+
+
+class SharedS3ClientTests(APITestCase):
+    def setUp(self):
+        s3_client.reset_s3_client()
+
+    def test_client_is_created_once_and_reused(self):
+        clients = []
+        threads = [
+            threading.Thread(target=lambda: clients.append(s3_client.get_s3_client()))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len({id(client) for client in clients}), 1)
+        self.assertEqual(s3_client.get_s3_client_stats(), {'clients_created': 1, 'client_reuses': 7})
+        self.assertEqual(
+            clients[0].meta.config.max_pool_connections,
+            settings.AWS_S3_MAX_POOL_CONNECTIONS,
+        )
+
+    def test_storages_share_the_client(self):
+        resources = []
+        thread = threading.Thread(target=lambda: resources.append(TrackHubStaticStorage().connection))
+        thread.start()
+        thread.join()
+        media_resource = TrackHubMediaStorage().connection
+
+        self.assertIsNot(resources[0], media_resource)
+        self.assertIs(resources[0].meta.client, s3_client.get_s3_client())
+        self.assertIs(media_resource.meta.client, s3_client.get_s3_client())
+
+
+class CacheNamespaceTests(APITestCase):
+    def setUp(self):
+        django_cache.clear()
+        self.addCleanup(django_cache.clear)
+
+    def test_objects_and_namespaces_are_invalidated(self):
+        build = mock.Mock(side_effect=['first', 'second', 'third'])
+
+        self.assertEqual(cache.get_object('test', 1, build), 'first')
+        self.assertEqual(cache.get_object('test', 1, build), 'first')
+
+        cache.delete_objects('test', [1])
+        self.assertEqual(cache.get_object('test', 1, build), 'second')
+
+        cache.invalidate_namespace('test')
+        self.assertEqual(cache.get_object('test', 1, build), 'third')
+        self.assertEqual(build.call_count, 3)
+
+    def test_entries_never_outlive_the_max_timeout(self):
+        build = mock.Mock(return_value='value')
+
+        with override_settings(CACHE_MAX_TIMEOUT=60), mock.patch.object(cache.cache, 'set') as cache_set:
+            cache.get_or_set('test', ['forever'], build)
+            cache.get_or_set('test', ['day'], build, 24 * 60 * 60)
+            cache.get_or_set('test', ['short'], build, 10)
+
+        self.assertEqual([call.args[2] for call in cache_set.call_args_list], [60, 60, 10])
+
+    def test_lost_version_is_never_reused(self):
+        build = mock.Mock(side_effect=['first', 'second'])
+        cache.get_or_set('test', ['key'], build)
+
+        # Ключ версии вытеснен из кэша, а записи старой версии ещё живы
+        django_cache.delete(cache.VERSION_KEY.format('test'))
+
+        self.assertEqual(cache.get_or_set('test', ['key'], build), 'second')
+
+    def test_redis_backend(self):
+        caches_setting = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                'LOCATION': 'redis://localhost:6379/0',
+                'OPTIONS': {'connection_class': fakeredis.FakeConnection},
+            }
+        }
+        with override_settings(CACHES=caches_setting):
+            self.assertIsInstance(caches['default'], RedisCache)
+            build = mock.Mock(return_value={'value': 1})
+
+            cache.get_or_set('test', ['key'], build)
+            self.assertEqual(cache.get_or_set('test', ['key'], build), {'value': 1})
+            version = cache.get_version('test')
+            cache.invalidate_namespace('test')
+            cache.get_or_set('test', ['key'], build)
+
+            self.assertEqual(build.call_count, 2)
+            self.assertNotEqual(cache.get_version('test'), version)
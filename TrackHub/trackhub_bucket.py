@@ -1,9 +1,18 @@
 from storages.backends.s3boto3 import S3Boto3Storage
 import os
 from TrackHub.settings import AWS_STORAGE_BUCKET_NAME
+from TrackHub.s3_client import get_s3_resource
 
 
-class TrackHubMediaStorage(S3Boto3Storage):
+class SharedConnectionStorage(S3Boto3Storage):
+    """Uses the process-wide S3 connection pool instead of a connection per storage."""
+
+    @property
+    def connection(self):
+        return get_s3_resource()
+
+
+class TrackHubMediaStorage(SharedConnectionStorage):
     bucket_name = AWS_STORAGE_BUCKET_NAME
     location = 'media'
 
@@ -15,6 +24,6 @@ class TrackHubMediaStorage(S3Boto3Storage):
         return f"https://{domain}/{self.location}%2F{name}"
 
 
-class TrackHubStaticStorage(S3Boto3Storage):
+class TrackHubStaticStorage(SharedConnectionStorage):
     bucket_name = AWS_STORAGE_BUCKET_NAME
-    location = 'static'
\ No newline at end of file
+    location = 'static'
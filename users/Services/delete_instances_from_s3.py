@@ -1,35 +1,165 @@
-import boto3
+import logging
+import posixpath
+from datetime import timedelta
+from botocore.exceptions import BotoCoreError, ClientError
+from django.apps import apps
 from django.conf import settings
-from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+from TrackHub.s3_client import get_s3_client
+from TrackHub.trackhub_bucket import TrackHubMediaStorage
+from users.Services.image_handler import get_names_with_renditions
 
 
-def delete_instance_from_s3(file_path):
-        """Deletes the old avatar from Yandex Object Storage"""
+logger = logging.getLogger(__name__)
+
+# S3 DeleteObjects accepts at most 1000 keys per request
+MAX_DELETE_BATCH_SIZE = 1000
+# Время, на которое воркер забирает ключи; ключи упавшего воркера вернутся в очередь
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def get_media_key(file_path):
+    """Key of the media storage file in the bucket."""
+    if isinstance(file_path, FieldFile):
+        file_path = file_path.name
+
+    if not file_path:
+        return None
+    return posixpath.join(TrackHubMediaStorage.location, file_path.lstrip('/'))
+
+
+def get_media_name(key):
+    """Name of the media storage file by its key in the bucket, the inverse of get_media_key."""
+    return posixpath.relpath(key, TrackHubMediaStorage.location)
+
 
-        if not file_path:
-            return
+def _get_referenced_keys(keys):
+    """Keys of files that got references again after being queued, with their renditions."""
+    StoredMedia = apps.get_model('users', 'StoredMedia')
+    referenced_names = StoredMedia.objects.filter(
+        name__in=[get_media_name(key) for key in keys],
+        reference_count__gt=0,
+    ).values_list('name', flat=True)
 
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            endpoint_url=settings.AWS_S3_ENDPOINT_URL
+    return {
+        get_media_key(stored_name)
+        for name in referenced_names
+        for stored_name in get_names_with_renditions(name)
+    }
+
+
+def delete_instances_from_s3(file_paths):
+        """
+        Queues media files for deletion from Yandex Object Storage.
+        Keys are stored in the current transaction, so they are dropped
+        together with a rolled back save() and never block the request on S3.
+        """
+        PendingS3Deletion = apps.get_model('users', 'PendingS3Deletion')
+        keys = {get_media_key(file_path) for file_path in file_paths} - {None}
+
+        PendingS3Deletion.objects.bulk_create(
+            [PendingS3Deletion(key=key) for key in keys],
+            ignore_conflicts=True,
         )
-        try:
-            s3_client.delete_object(
-                Bucket=settings.AWS_STORAGE_BUCKET_NAME,
-                # The file path (including folder) in your bucket
-                Key=file_path
-            )
-        except Exception as e:
-            raise ImproperlyConfigured(
-                "Error deleting image from Yandex Object Storage:" +
-                f" {str(e)}"
+
+
+def delete_instance_from_s3(file_path):
+        """Queues the old file for deletion from Yandex Object Storage"""
+        delete_instances_from_s3([file_path])
+
+
+def _delete_batch(s3_client, keys):
+    """Deletes keys with one DeleteObjects request, returns keys S3 failed to delete."""
+    response = s3_client.delete_objects(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        Delete={
+            'Objects': [{'Key': key} for key in keys],
+            'Quiet': True,
+        }
+    )
+
+    return {error['Key'] for error in response.get('Errors', [])}
+
+
+def _claim_batch(batch_size, max_attempts, exclude_ids):
+    """
+    Marks up to batch_size queued keys as taken until CLAIM_TIMEOUT and commits,
+    so no row lock or transaction is held while S3 is called.
+    Keys of files that are referenced again are dropped from the queue instead.
+    """
+    PendingS3Deletion = apps.get_model('users', 'PendingS3Deletion')
+    now = timezone.now()
+
+    with transaction.atomic():
+        while True:
+            pending = list(
+                PendingS3Deletion.objects.filter(
+                    Q(claimed_until__isnull=True) | Q(claimed_until__lt=now),
+                    attempts__lt=max_attempts,
+                ).exclude(
+                    id__in=exclude_ids,
+                ).order_by('id').select_for_update(skip_locked=True).values_list('id', 'key')[:batch_size]
             )
+            if not pending:
+                return pending
+
+            referenced_keys = _get_referenced_keys([key for id, key in pending])
+            PendingS3Deletion.objects.filter(
+                id__in=[id for id, key in pending if key in referenced_keys]
+            ).delete()
+            pending = [(id, key) for id, key in pending if key not in referenced_keys]
+
+            if pending:
+                PendingS3Deletion.objects.filter(
+                    id__in=[id for id, key in pending]
+                ).update(claimed_until=now + CLAIM_TIMEOUT)
+                return pending
+
+
+def drain_pending_deletions(batch_size=MAX_DELETE_BATCH_SIZE, max_attempts=5) -> int:
+    """
+    Deletes queued keys from Yandex Object Storage in batches of up to 1000 keys.
+    Each batch is claimed in its own short transaction, so several workers can
+    drain the queue at once. If S3 is unavailable the batch stays queued for the next pass.
+    Returns the number of deleted keys.
+    """
+    PendingS3Deletion = apps.get_model('users', 'PendingS3Deletion')
+    batch_size = min(batch_size, MAX_DELETE_BATCH_SIZE)
+    s3_client = get_s3_client()
+    deleted_count = 0
+    failed_ids = set()
+
+    while True:
+        pending = _claim_batch(batch_size, max_attempts, failed_ids)
+        if not pending:
+            return deleted_count
+
+        try:
+            failed_keys = _delete_batch(s3_client, [key for _, key in pending])
+        except (BotoCoreError, ClientError):
+            logger.exception("Error deleting objects from Yandex Object Storage")
+            PendingS3Deletion.objects.filter(
+                id__in=[id for id, key in pending]
+            ).update(claimed_until=None)
+            return deleted_count
+
+        failed_ids.update(id for id, key in pending if key in failed_keys)
+
+        PendingS3Deletion.objects.filter(
+            id__in=[id for id, key in pending if key not in failed_keys]
+        ).delete()
+        PendingS3Deletion.objects.filter(
+            key__in=failed_keys
+        ).update(attempts=F('attempts') + 1, claimed_until=None)
+
+        deleted_count += len(pending) - len(failed_keys)
 
 
 def get_instance_path_in_s3(filename):
     path = filename.split('/')[-1]
     path = path.replace("%2F", "/")
 
-    return path
\ No newline at end of file
+    return path
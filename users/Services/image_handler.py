@@ -1,9 +1,14 @@
 from django.core.files.base import ContentFile
 from PIL import Image, ImageDraw, ImageFont
 import io
+import mimetypes
 from django.contrib.auth import get_user_model
 import os
+import threading
+from functools import lru_cache
 from django.conf import settings
+from django.core.exceptions import SuspiciousOperation
+from TrackHub.background_tasks import submit_on_commit
 
 
 AVATAR_COLORS = [
@@ -25,15 +30,53 @@ AVATAR_COLORS = [
     "#55B4B0",  # Аквамариновый
 ]
 
-def generate_default_avatar(id):
-    user = get_user_model()
-    user = user.objects.get(id=id)
-    name = user.first_name
+RENDITIONS_PATH = "renditions/"
+RENDITION_FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+
+# Общие для всех пользователей плитки: (первая буква, цвет) -> один файл
+DEFAULT_AVATARS_PATH = "avatars/default/"
+
+_tiles_lock = threading.Lock()
+_stored_tiles = set()
+
+
+@lru_cache(maxsize=1)
+def _get_font():
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    font_path = os.path.join(current_dir, '../static/fonts/pt-sans.narrow-bold.ttf')
+
+    try:
+        return ImageFont.truetype(font_path, 150)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def get_default_avatar_tile(first_name, id):
+    """Returns (letter, color index) of the default avatar of the user."""
+    letter = first_name[0].upper() if first_name else "U"
+    # Выбираем цвет на основе хэша от id пользователя
+    color_index = hash(id) % len(AVATAR_COLORS)
+
+    return letter, color_index
+
+
+def get_default_avatar_name(letter, color_index):
+    return f"{DEFAULT_AVATARS_PATH}{ord(letter)}_{color_index}.png"
+
+
+def is_default_avatar(name):
+    """Shared tiles are used by many users and must never be deleted."""
+    return bool(name) and name.startswith(DEFAULT_AVATARS_PATH)
+
+
+@lru_cache(maxsize=256)
+def render_default_avatar(letter, color_index):
     # Размер изображения
     size = (200, 200)
     
-    # Выбираем цвет на основе хэша от id пользователя
-    color_index = hash(id) % len(AVATAR_COLORS)
     background_color = AVATAR_COLORS[color_index]
     
     # Преобразуем HEX-цвет в RGB
@@ -41,34 +84,124 @@ def generate_default_avatar(id):
     
     # Создаем квадратное изображение
     image = Image.new("RGB", size, background_rgb)
-    
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    font_path = os.path.join(current_dir, '../static/fonts/pt-sans.narrow-bold.ttf')
 
     draw = ImageDraw.Draw(image)
-    try:
-        font = ImageFont.truetype(font_path, 150)
-    except:
-        font = ImageFont.load_default()
+    font = _get_font()
     
-    text = name[0].upper() if name else "U"
     text_color = (255, 255, 255)  # Белый цвет текста
     
     # Получаем размеры текста с помощью getbbox
-    bbox = font.getbbox(text)
+    bbox = font.getbbox(letter)
     text_width = bbox[2] - bbox[0]
     text_height = bbox[3] - bbox[1]
     
     # Позиционируем текст по центру
     text_position = ((size[0] - text_width) / 2.15, (size[1] - text_height) / 7)
-    draw.text(text_position, text, font=font, fill=text_color)
+    draw.text(text_position, letter, font=font, fill=text_color)
     
     # Сохраняем изображение в BytesIO
     buffer = io.BytesIO()
     image.save(buffer, format="PNG")
-    buffer.seek(0)
-    
-    # Сохраняем изображение в поле avatar
-    user.avatar.save(f"default_avatar_{id}.png", ContentFile(buffer.getvalue()), save=False)
-    user.save()
-    buffer.close()
\ No newline at end of file
+
+    return buffer.getvalue()
+
+
+def store_default_avatar_tile(letter, color_index):
+    """Renders and uploads the tile unless it is already in the storage."""
+    name = get_default_avatar_name(letter, color_index)
+
+    with _tiles_lock:
+        if name in _stored_tiles:
+            return name
+
+        storage = get_user_model()._meta.get_field('avatar').storage
+        if not storage.exists(name):
+            storage.save(name, ContentFile(render_default_avatar(letter, color_index)))
+        _stored_tiles.add(name)
+
+    return name
+
+
+def generate_default_avatar(user):
+    """
+    Points the avatar of the user at the shared tile without saving the user.
+    The tile is rendered and uploaded in background after the transaction commits.
+    """
+    letter, color_index = get_default_avatar_tile(user.first_name, user.id)
+    user.avatar.name = get_default_avatar_name(letter, color_index)
+
+    submit_on_commit(store_default_avatar_tile, letter, color_index)
+
+
+def get_rendition_names(name):
+    """Names of the downscaled copies of the image: {size: {format: name}}."""
+    base_name = os.path.splitext(name.lstrip('/'))[0]
+
+    return {
+        str(size): {
+            extension: f"{RENDITIONS_PATH}{base_name}/{size}.{extension}"
+            for extension in RENDITION_FORMATS
+        }
+        for size in settings.MEDIA_RENDITION_SIZES
+    }
+
+
+def get_names_with_renditions(name):
+    """The file name followed by the names of its renditions, if it is an image."""
+    if not (mimetypes.guess_type(name)[0] or '').startswith('image/'):
+        return [name]
+
+    return [name] + [
+        rendition_name
+        for names in get_rendition_names(name).values()
+        for rendition_name in names.values()
+    ]
+
+
+def render_renditions(name, storage):
+    """
+    Stores WebP and JPEG copies of the image fitted into every rendition size.
+    The original is downloaded and decoded once, renditions already stored are skipped.
+    Returns an empty dict when the original is not in the storage.
+    """
+    try:
+        if not storage.exists(name):
+            return {}
+    except SuspiciousOperation:
+        return {}
+
+    renditions = get_rendition_names(name)
+    missing = [
+        (int(size), extension, rendition_name)
+        for size, names in renditions.items()
+        for extension, rendition_name in names.items()
+        if not storage.exists(rendition_name)
+    ]
+    if not missing:
+        return renditions
+
+    with storage.open(name) as file:
+        original = Image.open(file)
+        # JPEG декодируется сразу в уменьшенном размере
+        original.draft('RGB', (max(settings.MEDIA_RENDITION_SIZES),) * 2)
+        original = original.convert('RGB')
+
+    for size, extension, rendition_name in missing:
+        image = original.copy()
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format=RENDITION_FORMATS[extension], quality=80)
+        storage.save(rendition_name, ContentFile(buffer.getvalue()))
+
+    return renditions
+
+
+def get_rendition_urls(renditions, storage):
+    return {
+        size: {
+            extension: storage.url(rendition_name)
+            for extension, rendition_name in names.items()
+        }
+        for size, names in renditions.items()
+    }
@@ -0,0 +1,136 @@
+import hashlib
+import os
+from collections import Counter, defaultdict
+from django.apps import apps
+from django.db.models import F
+from django.db.models.functions import Greatest
+from users.Services.delete_instances_from_s3 import delete_instances_from_s3, get_media_key
+from users.Services.image_handler import get_names_with_renditions, is_default_avatar
+
+
+CONTENT_PATH = "content/"
+
+
+def get_content_name(file):
+    """Name of the file in the storage derived from the SHA-256 of its content."""
+    content_hash = hashlib.sha256()
+    for chunk in file.chunks():
+        content_hash.update(chunk)
+    file.seek(0)
+
+    return get_digest_name(content_hash.hexdigest(), file.name)
+
+
+def get_digest_name(digest, file_name):
+    """Content-addressed name for a SHA-256 hex digest, keeping the extension of file_name."""
+    extension = os.path.splitext(file_name)[1].lower()
+
+    return f"{CONTENT_PATH}{digest[:2]}/{digest}{extension}"
+
+
+def is_stored(name):
+    StoredMedia = apps.get_model('users', 'StoredMedia')
+    return StoredMedia.objects.filter(name=name).exists()
+
+
+def store(file, storage):
+    """Uploads the file unless a file with the same content is already stored."""
+    name = get_content_name(file)
+
+    if not is_stored(name) and not storage.exists(name):
+        storage.save(name, file)
+
+    return name
+
+
+def _counted(names):
+    # Общие плитки аватарок используются всеми пользователями и не удаляются
+    return Counter(
+        name for name in names
+        if name and not is_default_avatar(name)
+    )
+
+
+def _group_by_count(counts):
+    groups = defaultdict(list)
+    for name, count in counts.items():
+        groups[count].append(name)
+    return groups.items()
+
+
+def acquire(names):
+    """Adds one reference per occurrence of the name, with one UPDATE per distinct count."""
+    StoredMedia = apps.get_model('users', 'StoredMedia')
+    PendingS3Deletion = apps.get_model('users', 'PendingS3Deletion')
+    counts = _counted(names)
+    if not counts:
+        return
+
+    # Файл и его копии снова используются, поэтому они не должны быть удалены из очереди
+    PendingS3Deletion.objects.filter(key__in=[
+        get_media_key(stored_name)
+        for name in counts
+        for stored_name in get_names_with_renditions(name)
+    ]).delete()
+
+    for count, group in _group_by_count(counts):
+        while group:
+            StoredMedia.objects.bulk_create(
+                [StoredMedia(name=name) for name in group],
+                ignore_conflicts=True,
+            )
+            updated = StoredMedia.objects.filter(
+                name__in=group
+            ).update(reference_count=F('reference_count') + count)
+            if updated == len(group):
+                break
+
+            # Строку успел удалить параллельный release(), создаём её заново
+            group = list(set(group) - set(
+                StoredMedia.objects.filter(name__in=group).values_list('name', flat=True)
+            ))
+
+
+def release(names):
+    """Drops references and queues files nobody references anymore for deletion."""
+    StoredMedia = apps.get_model('users', 'StoredMedia')
+    counts = _counted(names)
+    if not counts:
+        return
+
+    for count, group in _group_by_count(counts):
+        StoredMedia.objects.filter(
+            name__in=group
+        ).update(reference_count=Greatest(F('reference_count') - count, 0))
+
+    unreferenced = list(
+        StoredMedia.objects.filter(
+            name__in=counts,
+            reference_count__lte=0,
+        ).select_for_update().values_list('id', 'name')
+    )
+    if unreferenced:
+        StoredMedia.objects.filter(id__in=[id for id, _ in unreferenced]).delete()
+        delete_instances_from_s3([
+            stored_name
+            for _, name in unreferenced
+            for stored_name in get_names_with_renditions(name)
+        ])
+
+
+def get_changed_files(instance, field_names):
+    """Previous file names of the media fields that changed since the instance was loaded."""
+    if instance.pk is None or instance._state.adding:
+        return {field_name: None for field_name in field_names}
+
+    return {
+        field_name: instance.get_previous_value(field_name)
+        for field_name in field_names
+        if instance.has_changed(field_name)
+    }
+
+
+def move_references(instance, changed_files):
+    """Moves references from the previous files to the current ones after the instance is saved."""
+    acquire([getattr(instance, field_name).name for field_name in changed_files])
+    release(changed_files.values())
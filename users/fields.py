@@ -0,0 +1,21 @@
+from django.db import models
+from users.Services import media_store
+
+
+class ContentAddressedFileMixin:
+    """Stores new uploads under the hash of their content instead of upload_to."""
+
+    def pre_save(self, model_instance, add):
+        file = getattr(model_instance, self.attname)
+        if file and not file._committed:
+            file.name = media_store.store(file, self.storage)
+            file._committed = True
+        return file
+
+
+class ContentAddressedFileField(ContentAddressedFileMixin, models.FileField):
+    pass
+
+
+class ContentAddressedImageField(ContentAddressedFileMixin, models.ImageField):
+    pass
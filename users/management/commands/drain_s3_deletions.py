@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand
+from users.Services.delete_instances_from_s3 import (
+    MAX_DELETE_BATCH_SIZE,
+    drain_pending_deletions,
+)
+
+
+class Command(BaseCommand):
+    help = "Удаляет из Yandex Object Storage файлы, ожидающие удаления"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=MAX_DELETE_BATCH_SIZE)
+        parser.add_argument('--max-attempts', type=int, default=5)
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help="Работать как воркер, проверяя очередь каждые N секунд",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            deleted_count = drain_pending_deletions(
+                batch_size=options['batch_size'],
+                max_attempts=options['max_attempts'],
+            )
+            self.stdout.write(f"Deleted {deleted_count} objects")
+
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
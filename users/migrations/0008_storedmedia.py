@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:28
+
+import TrackHub.trackhub_bucket
+import users.fields
+import users.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_pendings3deletion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredMedia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=1024, unique=True)),
+                ('reference_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='avatar',
+            field=users.fields.ContentAddressedImageField(blank=True, null=True, storage=TrackHub.trackhub_bucket.TrackHubMediaStorage(), upload_to='avatars/', validators=[users.validators.validate_image]),
+        ),
+    ]
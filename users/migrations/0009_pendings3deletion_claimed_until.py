@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_storedmedia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendings3deletion',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
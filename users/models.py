@@ -3,6 +3,7 @@ from django.contrib.auth.models import (AbstractBaseUser,
                                         BaseUserManager,
                                         PermissionsMixin)
 from django.core.validators import EmailValidator
+from django.db import transaction
 from TrackHub import settings
 from users.validators import (
     validate_image,
@@ -12,8 +13,10 @@ from users.validators import (
 import boto3
 from django.core.exceptions import ImproperlyConfigured
 from TrackHub.trackhub_bucket import TrackHubMediaStorage
-from users.Services.image_handler import generate_default_avatar
-from users.Services.delete_instances_from_s3 import delete_instance_from_s3
+from TrackHub.field_tracker import FieldTrackerMixin
+from users.Services.image_handler import generate_default_avatar, is_default_avatar
+from users.Services import media_store
+from users.fields import ContentAddressedImageField
 
 
 class CustomUserManager(BaseUserManager):
@@ -59,14 +62,14 @@ class CustomUserManager(BaseUserManager):
         return self.create_user(email, password, **extra_fields)
 
 
-class CustomUser(AbstractBaseUser, PermissionsMixin):
+class CustomUser(FieldTrackerMixin, AbstractBaseUser, PermissionsMixin):
     """
     Custom user model.
     """
     email = models.EmailField(validators=[EmailValidator()], unique=True, db_index=True)
     password = models.CharField(max_length=128,
                                 validators=[validate_password])
-    avatar = models.ImageField(
+    avatar = ContentAddressedImageField(
         null=True,
         blank=True,
         validators=[validate_image],
@@ -92,24 +95,19 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.email
 
+    @transaction.atomic
     def save(self, *args, **kwargs):
+        # The old avatar is released after saving and deleted
+        # from Yandex Storage when nobody else uses it
+        changed_files = media_store.get_changed_files(self, ['avatar'])
+
         # Check if we are updating an existing user
         if self.pk:
-            # Get the current instance
-            old_instance = CustomUser.objects.get(pk=self.pk)
-
-            # Check if the avatar has changed and delete the
-            # old one from Yandex Storage
-            if old_instance.avatar and old_instance.avatar != self.avatar:
-                # Delete the old avatar from Yandex Storage
-                old_avatar_path = old_instance.avatar.name
-                delete_instance_from_s3(old_avatar_path)
-            
-            if old_instance.email != self.email:
+            if self.has_changed('email'):
                 self.is_verified = False
             
-            if old_instance.first_name != self.first_name:
-                generate_default_avatar(self.id)
+            if self.has_changed('first_name') and is_default_avatar(self.avatar.name):
+                generate_default_avatar(self)
 
         if self.first_name:
             self.first_name = self.first_name.lower().capitalize()
@@ -118,18 +116,20 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
         # Сохраняем объект User
         super().save(*args, **kwargs)
+        media_store.move_references(self, changed_files)
 
         # Проверяем, есть ли связанные объекты (чтобы избежать дублирования)
         if not hasattr(self, 'user_rating'):
             RatingOfUser.objects.create(user=self)
 
         if not self.avatar:
-            generate_default_avatar(self.id)
+            # id нужен для выбора цвета, поэтому аватарку проставляем после сохранения
+            generate_default_avatar(self)
+            CustomUser.objects.filter(pk=self.pk).update(avatar=self.avatar.name)
+            self.snapshot_loaded_values(['avatar'])
 
         
     def delete(self, *args, **kwargs):
-        delete_instance_from_s3(self.avatar)
-
         self.created_exercises.filter(is_published=False).delete()
         self.created_exercises.filter(is_published=True).update(author=None)
 
@@ -203,3 +203,31 @@ class Review(models.Model):
     def __str__(self):
         return f"Review for {self.for_user.first_name}" + \
                f" by {self.user.first_name}"
+
+
+class PendingS3Deletion(models.Model):
+    """
+    Object storage key that is no longer referenced and waits
+    for the drain_s3_deletions command to remove it.
+    """
+    key = models.CharField(max_length=1024, unique=True)
+    attempts = models.PositiveIntegerField(default=0)
+    # Ключ взят воркером до этого момента, после него его заберёт следующий проход
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.key
+
+
+class StoredMedia(models.Model):
+    """
+    File of the media storage with the number of model fields referencing it.
+    Uploads are stored under the hash of their content, so identical files share one row.
+    """
+    name = models.CharField(max_length=1024, unique=True)
+    reference_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
@@ -1,9 +1,10 @@
 import os
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_migrate, post_save
+from django.db.models.signals import post_migrate, post_save, post_delete
 from django.dispatch import receiver
 from django.conf import settings
 from workout_manager.models import UserWorkoutManagerLimitation
+from users.Services import media_store
 
 @receiver(post_migrate)
 def create_superuser(sender, **kwargs):
@@ -27,3 +28,7 @@ def create_user_workout_manager_limitation(sender, instance, created, **kwargs):
     if created:
         UserWorkoutManagerLimitation.objects.create(user=instance)
 
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def release_user_avatar(sender, instance, **kwargs):
+    media_store.release([instance.avatar.name])
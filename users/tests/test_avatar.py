@@ -4,6 +4,14 @@ from django.contrib.auth import get_user_model
 from PIL import Image
 from io import BytesIO
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from users.models import PendingS3Deletion
+from users.Services.image_handler import (
+    get_default_avatar_name,
+    get_default_avatar_tile,
+    is_default_avatar,
+    render_default_avatar,
+)
 
 User = get_user_model()
 
@@ -112,3 +120,45 @@ class AvatarTests(APITestCase):
 
         response = self.client.post(url, {"avatar": avatar}, format="multipart")
         self.assertEqual(response.status_code, 400)
+
+
+@override_settings(BACKGROUND_TASKS_ALWAYS_EAGER=True)
+class DefaultAvatarTileTests(APITestCase):
+    def create_user(self, email, first_name):
+        with self.captureOnCommitCallbacks(execute=True):
+            return User.objects.create_user(
+                email=email,
+                password='Securepassword123',
+                first_name=first_name,
+            )
+
+    def test_users_share_rendered_tile(self):
+        render_default_avatar.cache_clear()
+
+        first_user = self.create_user('first@example.com', 'tile')
+        letter, color_index = get_default_avatar_tile('tile', first_user.id)
+        self.assertEqual(first_user.avatar.name, get_default_avatar_name(letter, color_index))
+
+        # Пользователь с той же буквой и тем же цветом получает ту же плитку
+        User.objects.filter(id=first_user.id).delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            second_user = User.objects.create_user(
+                id=first_user.id,
+                email='second@example.com',
+                password='Securepassword123',
+                first_name='Tim',
+            )
+
+        self.assertEqual(second_user.avatar.name, first_user.avatar.name)
+        self.assertEqual(render_default_avatar.cache_info().misses, 1)
+        self.assertTrue(second_user.avatar.storage.exists(second_user.avatar.name))
+
+    def test_replacing_default_avatar_keeps_shared_tile(self):
+        user = self.create_user('keeper@example.com', 'keeper')
+        tile_name = user.avatar.name
+
+        user.avatar = None
+        user.save()
+
+        self.assertFalse(PendingS3Deletion.objects.filter(key=tile_name).exists())
+        self.assertTrue(is_default_avatar(User.objects.get(id=user.id).avatar.name))
@@ -0,0 +1,52 @@
+from io import BytesIO
+from unittest import mock
+from PIL import Image
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+from users.validators import validate_image
+
+
+class ValidateImageTests(SimpleTestCase):
+    def create_upload(self, size=(100, 100), image_format='PNG'):
+        buffer = BytesIO()
+        Image.new('RGB', size, color='white').save(buffer, format=image_format)
+        return SimpleUploadedFile(f'image.{image_format.lower()}', buffer.getvalue())
+
+    def test_oversized_upload_is_rejected_without_parsing(self):
+        upload = SimpleUploadedFile('large.png', b'\0' * (200 * 1024 + 1))
+
+        with mock.patch('users.validators.Image.open') as image_open:
+            with self.assertRaisesMessage(ValidationError, 'КБ'):
+                validate_image(upload)
+
+        image_open.assert_not_called()
+
+    def test_malformed_upload_is_rejected(self):
+        upload = SimpleUploadedFile('broken.png', b'not an image at all')
+
+        with self.assertRaisesMessage(ValidationError, 'не является изображением'):
+            validate_image(upload)
+
+    def test_only_header_is_read(self):
+        upload = self.create_upload(size=(2000, 2000), image_format='BMP')
+        upload.size = 1024
+
+        with mock.patch.object(Image.Image, 'load', side_effect=AssertionError('pixels decoded')):
+            validate_image(upload)
+
+        self.assertEqual(upload._dimensions_cache, (2000, 2000))
+        self.assertEqual(upload.tell(), 0)
+
+    def test_cached_dimensions_are_reused(self):
+        upload = self.create_upload(size=(100, 50))
+        upload._dimensions_cache = (100, 100)
+
+        with mock.patch('users.validators.Image.open') as image_open:
+            validate_image(upload)
+
+        image_open.assert_not_called()
+
+    def test_not_square_image_is_rejected(self):
+        with self.assertRaisesMessage(ValidationError, 'квадратным'):
+            validate_image(self.create_upload(size=(100, 50)))
@@ -0,0 +1,69 @@
+from io import BytesIO
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from users.models import PendingS3Deletion, StoredMedia
+from workout_manager.models import Exercise
+from workout_manager.Services import clone_service
+
+User = get_user_model()
+
+
+class MediaStoreTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='media@example.com',
+            password='Securepassword123',
+            first_name='Media',
+        )
+        self.subscriber = User.objects.create_user(
+            email='media_subscriber@example.com',
+            password='Securepassword123',
+            first_name='Subscriber',
+        )
+
+    def create_preview(self, color='white'):
+        buffer = BytesIO()
+        Image.new('RGB', (10, 10), color=color).save(buffer, format='PNG')
+        return SimpleUploadedFile('preview.png', buffer.getvalue(), content_type='image/png')
+
+    def create_exercise(self, name, preview):
+        return Exercise.objects.create(name=name, created_by=self.user, preview=preview)
+
+    def get_reference_count(self, name):
+        return StoredMedia.objects.get(name=name).reference_count
+
+    def test_identical_uploads_are_stored_once(self):
+        first = self.create_exercise('first', self.create_preview())
+        second = self.create_exercise('second', self.create_preview())
+
+        self.assertTrue(first.preview.name.startswith('content/'))
+        self.assertEqual(first.preview.name, second.preview.name)
+        self.assertEqual(self.get_reference_count(first.preview.name), 2)
+
+    def test_file_is_deleted_with_the_last_reference(self):
+        exercise = self.create_exercise('original', self.create_preview())
+        name = exercise.preview.name
+        cloned_exercise = clone_service.clone_exercise(exercise, self.subscriber)
+        self.assertEqual(self.get_reference_count(name), 2)
+
+        exercise.delete()
+        self.assertEqual(self.get_reference_count(name), 1)
+        self.assertFalse(PendingS3Deletion.objects.exists())
+
+        cloned_exercise.delete()
+        self.assertFalse(StoredMedia.objects.filter(name=name).exists())
+        self.assertTrue(PendingS3Deletion.objects.filter(key=f'media/{name}').exists())
+
+    def test_replaced_preview_is_released(self):
+        exercise = self.create_exercise('replaced', self.create_preview())
+        old_name = exercise.preview.name
+
+        exercise.preview = self.create_preview(color='black')
+        exercise.save()
+
+        self.assertNotEqual(exercise.preview.name, old_name)
+        self.assertEqual(self.get_reference_count(exercise.preview.name), 1)
+        self.assertFalse(StoredMedia.objects.filter(name=old_name).exists())
+        self.assertTrue(PendingS3Deletion.objects.filter(key=f'media/{old_name}').exists())
@@ -0,0 +1,120 @@
+import boto3
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from botocore.exceptions import ClientError
+from moto import mock_aws
+from django.conf import settings
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+from TrackHub.s3_client import get_s3_client
+from users.models import PendingS3Deletion, StoredMedia
+from users.Services.delete_instances_from_s3 import (
+    delete_instance_from_s3,
+    delete_instances_from_s3,
+    drain_pending_deletions,
+)
+from users.Services.image_handler import get_names_with_renditions
+
+
+@mock_aws
+class S3DeletionQueueTests(TestCase):
+    def setUp(self):
+        self.s3_client = boto3.client('s3', region_name='us-east-1')
+        self.s3_client.create_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+
+    def put_objects(self, count):
+        names = [f'exercises/previews/{index}.jpg' for index in range(count)]
+        for name in names:
+            self.s3_client.put_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=f'media/{name}', Body=b'x')
+        return names
+
+    def stored_keys(self):
+        response = self.s3_client.list_objects_v2(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Prefix='media/exercises/previews/',
+        )
+        return {item['Key'] for item in response.get('Contents', [])}
+
+    def test_delete_only_queues_the_key(self):
+        [name] = self.put_objects(1)
+
+        delete_instance_from_s3(name)
+        delete_instance_from_s3(name)
+
+        self.assertEqual(list(PendingS3Deletion.objects.values_list('key', flat=True)), [f'media/{name}'])
+        self.assertIn(f'media/{name}', self.stored_keys())
+
+    def test_rolled_back_transaction_drops_the_key(self):
+        try:
+            with transaction.atomic():
+                delete_instance_from_s3('avatars/rolled_back.jpg')
+                raise ValueError
+        except ValueError:
+            pass
+
+        self.assertFalse(PendingS3Deletion.objects.exists())
+
+    def test_drain_deletes_keys_in_batches(self):
+        names = self.put_objects(5)
+        for name in names:
+            delete_instance_from_s3(name)
+
+        deleted_count = drain_pending_deletions(batch_size=2)
+
+        self.assertEqual(deleted_count, 5)
+        self.assertEqual(self.stored_keys(), set())
+        self.assertFalse(PendingS3Deletion.objects.exists())
+
+    def test_keys_are_queued_with_the_storage_location(self):
+        delete_instance_from_s3('avatars/user.jpg')
+
+        self.assertEqual(PendingS3Deletion.objects.get().key, 'media/avatars/user.jpg')
+
+    def test_s3_error_leaves_keys_for_the_next_pass(self):
+        names = self.put_objects(2)
+        for name in names:
+            delete_instance_from_s3(name)
+        error = ClientError({'Error': {'Code': 'ServiceUnavailable', 'Message': 'down'}}, 'DeleteObjects')
+
+        with mock.patch.object(get_s3_client(), 'delete_objects', side_effect=error):
+            with self.assertLogs('users.Services.delete_instances_from_s3', level='ERROR'):
+                self.assertEqual(drain_pending_deletions(), 0)
+
+        self.assertEqual(PendingS3Deletion.objects.filter(claimed_until__isnull=True, attempts=0).count(), 2)
+        self.assertEqual(drain_pending_deletions(), 2)
+        self.assertEqual(self.stored_keys(), set())
+
+    def test_keys_claimed_by_another_worker_are_skipped(self):
+        [name] = self.put_objects(1)
+        delete_instance_from_s3(name)
+        PendingS3Deletion.objects.update(claimed_until=timezone.now() + timedelta(minutes=1))
+
+        self.assertEqual(drain_pending_deletions(), 0)
+
+        PendingS3Deletion.objects.update(claimed_until=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(drain_pending_deletions(), 1)
+
+    def test_referenced_again_keys_are_not_deleted(self):
+        [name, other_name] = self.put_objects(2)
+        delete_instances_from_s3(get_names_with_renditions(name) + [other_name])
+        # Файл снова использован после того, как попал в очередь
+        StoredMedia.objects.create(name=name, reference_count=1)
+
+        self.assertEqual(drain_pending_deletions(), 1)
+
+        self.assertEqual(self.stored_keys(), {f'media/{name}'})
+        self.assertFalse(PendingS3Deletion.objects.exists())
+
+    def test_management_command_drains_queue(self):
+        names = self.put_objects(3)
+        for name in names:
+            delete_instance_from_s3(name)
+        out = StringIO()
+
+        call_command('drain_s3_deletions', stdout=out)
+
+        self.assertIn('Deleted 3 objects', out.getvalue())
+        self.assertEqual(self.stored_keys(), set())
@@ -1,6 +1,6 @@
 from django.core.exceptions import ValidationError
 import re
-from PIL import Image
+from PIL import Image, UnidentifiedImageError
 
 
 def validate_password(password, min_length=8, require_uppercase=True, require_lowercase=True,
@@ -41,15 +41,38 @@ def validate_name(value):
         raise ValidationError("Имя и фамилия должны содержать только буквы.")
         
 
-def validate_image(image, max_size=200 * 1024):
-    errors = []
+def get_image_dimensions(image):
+    """
+    Reads (width, height) from the image header without decoding pixel data.
+    The result is cached on the upload, so later stages do not open it again.
+    """
+    dimensions = getattr(image, '_dimensions_cache', None)
+    if dimensions:
+        return dimensions
 
-    img = Image.open(image)
-    if img.width != img.height:
-            errors.append("Изображение должно быть квадратным.")
-    
+    # forms.ImageField уже открыл загруженный файл при валидации
+    if getattr(image, 'image', None) is not None:
+        dimensions = image.image.size
+    else:
+        position = image.tell()
+        image.seek(0)
+        try:
+            with Image.open(image) as img:
+                dimensions = img.size
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+            raise ValidationError("Файл не является изображением.")
+        finally:
+            image.seek(position)
+
+    image._dimensions_cache = dimensions
+    return dimensions
+
+
+def validate_image(image, max_size=200 * 1024):
+    # Размер проверяем до чтения файла, большие файлы не открываем
     if image.size > max_size:
-            errors.append(f"Размер файла не должен превышать {max_size//1024} КБ.")
+        raise ValidationError(f"Размер файла не должен превышать {max_size//1024} КБ.")
 
-    if errors:
-        raise ValidationError(errors)
\ No newline at end of file
+    width, height = get_image_dimensions(image)
+    if width != height:
+        raise ValidationError("Изображение должно быть квадратным.")
@@ -190,8 +190,8 @@ class AvatarView(APIView):
     def delete(self, request):
         user = request.user
         if user.avatar:
-            user.avatar.delete(save=False)  # Delete the file from S3
-            user.avatar = None  # Set the avatar field to None
+            # The old file is queued for deletion and replaced by the default avatar in save()
+            user.avatar = None
             user.save()
         
         return Response(status=status.HTTP_200_OK)
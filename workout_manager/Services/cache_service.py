@@ -0,0 +1,114 @@
+from django.apps import apps
+from TrackHub import cache
+
+
+# Представления объектов, ключи содержат changed_at и версию автора
+EXERCISE_NAMESPACE = 'exercise'
+WORKOUT_NAMESPACE = 'workout'
+PLAN_NAMESPACE = 'weekly_fitness_plan'
+# Версия представлений всего, что создал автор; меняется только в кэше, changed_at не трогается
+AUTHOR_NAMESPACE = 'author:{}'
+
+EXERCISE_LIST_NAMESPACE = 'exercise:list'
+WORKOUT_LIST_NAMESPACE = 'workout:list'
+PLAN_LIST_NAMESPACE = 'weekly_fitness_plan:list'
+
+
+def get_author_namespace(author_id):
+    return AUTHOR_NAMESPACE.format(author_id)
+
+
+def invalidate_authors(author_ids):
+    """Drops cached representations of everything the authors created."""
+    for author_id in set(author_ids):
+        cache.invalidate_namespace_on_commit(get_author_namespace(author_id))
+
+
+def invalidate_plan_trees(plan_ids):
+    WeeklyFitnessPlan = apps.get_model('workout_manager', 'WeeklyFitnessPlan')
+
+    invalidate_authors(
+        WeeklyFitnessPlan.objects.filter(id__in=plan_ids).values_list('created_by_id', flat=True).distinct()
+    )
+
+
+def invalidate_workout_trees(workout_ids):
+    """Workouts are nested into plans of any author, their representations are dropped too."""
+    Workout = apps.get_model('workout_manager', 'Workout')
+    WeeklyFitnessPlanWorkout = apps.get_model('workout_manager', 'WeeklyFitnessPlanWorkout')
+
+    invalidate_authors(
+        Workout.objects.filter(id__in=workout_ids).values_list('created_by_id', flat=True).distinct()
+    )
+    invalidate_plan_trees(
+        WeeklyFitnessPlanWorkout.objects.filter(workout_id__in=workout_ids).values('weekly_fitness_plan_id')
+    )
+
+
+def invalidate_exercise_trees(exercise_ids):
+    """Exercises are nested into workouts and plans of any author, their representations are dropped too."""
+    Exercise = apps.get_model('workout_manager', 'Exercise')
+    WorkoutExercise = apps.get_model('workout_manager', 'WorkoutExercise')
+
+    invalidate_authors(
+        Exercise.objects.filter(id__in=exercise_ids).values_list('created_by_id', flat=True).distinct()
+    )
+    invalidate_workout_trees(
+        WorkoutExercise.objects.filter(exercise_id__in=exercise_ids).values('workout_id')
+    )
+
+
+def invalidate_exercise_tree(exercise):
+    """Same as invalidate_exercise_trees for a loaded exercise, its author is not read again."""
+    WorkoutExercise = apps.get_model('workout_manager', 'WorkoutExercise')
+
+    invalidate_authors([exercise.created_by_id])
+    invalidate_workout_trees(
+        WorkoutExercise.objects.filter(exercise_id=exercise.pk).values('workout_id')
+    )
+
+
+def invalidate_workout_tree(workout):
+    WeeklyFitnessPlanWorkout = apps.get_model('workout_manager', 'WeeklyFitnessPlanWorkout')
+
+    invalidate_authors([workout.created_by_id])
+    invalidate_plan_trees(
+        WeeklyFitnessPlanWorkout.objects.filter(workout_id=workout.pk).values('weekly_fitness_plan_id')
+    )
+
+
+def invalidate_author_content(author_id):
+    """The author preview is part of their objects and of every tree they are nested into."""
+    Exercise = apps.get_model('workout_manager', 'Exercise')
+    Workout = apps.get_model('workout_manager', 'Workout')
+
+    invalidate_authors([author_id])
+    invalidate_exercise_trees(Exercise.objects.filter(created_by_id=author_id).values('id'))
+    invalidate_workout_trees(Workout.objects.filter(created_by_id=author_id).values('id'))
+
+
+def invalidate_plans():
+    cache.invalidate_namespace_on_commit(PLAN_LIST_NAMESPACE)
+
+
+def invalidate_workouts():
+    """Workouts are nested into plans, so cached plan lists are dropped too."""
+    cache.invalidate_namespace_on_commit(WORKOUT_LIST_NAMESPACE)
+    cache.invalidate_namespace_on_commit(PLAN_LIST_NAMESPACE)
+
+
+def invalidate_exercises():
+    """Exercises are nested into workouts and plans, so their cached lists are dropped too."""
+    cache.invalidate_namespace_on_commit(EXERCISE_LIST_NAMESPACE)
+    cache.invalidate_namespace_on_commit(WORKOUT_LIST_NAMESPACE)
+    cache.invalidate_namespace_on_commit(PLAN_LIST_NAMESPACE)
+
+
+def invalidate_representations():
+    """
+    Drops every cached representation. Used for shared reference data
+    (gym equipment, categories) that does not touch changed_at of exercises.
+    """
+    for namespace in [EXERCISE_NAMESPACE, WORKOUT_NAMESPACE, PLAN_NAMESPACE]:
+        cache.invalidate_namespace_on_commit(namespace)
+    invalidate_exercises()
@@ -0,0 +1,165 @@
+from django.db import transaction
+from users.Services import media_store
+from workout_manager.Services import duplicate_service, limitation_service
+from workout_manager.models import (
+    Exercise,
+    Workout,
+    WorkoutExercise,
+    WeeklyFitnessPlan,
+    WeeklyFitnessPlanWorkout,
+)
+
+
+def clone_exercises(exercises, user) -> dict:
+    """
+    Copies exercises with their categories and gym equipment for the user.
+
+    Every table is written with a single bulk_create.
+    Returns a mapping of source exercise id to the cloned exercise.
+    """
+    exercises = list({exercise.id: exercise for exercise in exercises}.values())
+    if not exercises:
+        return {}
+
+    cloned_exercises = Exercise.objects.bulk_create([
+        Exercise(
+            name=exercise.name,
+            description=exercise.description,
+            instructions=exercise.instructions,
+            preview=exercise.preview,
+            preview_renditions=exercise.preview_renditions,
+            video=exercise.video,
+
+            is_measured_in_reps=exercise.is_measured_in_reps,
+
+            original=exercise,
+            created_by=user,
+        )
+        for exercise in exercises
+    ])
+    cloned_by_source_id = {
+        exercise.id: cloned_exercise
+        for exercise, cloned_exercise in zip(exercises, cloned_exercises)
+    }
+    # bulk_create не отправляет post_save
+    limitation_service.increment(user.id, Exercise, len(cloned_exercises))
+    duplicate_service.invalidate_name_index(user.id)
+
+    # Копии ссылаются на те же файлы
+    media_store.acquire(
+        [exercise.preview.name for exercise in exercises] +
+        [exercise.video.name for exercise in exercises]
+    )
+
+    for m2m_field, related_column in [
+        (Exercise.category, 'exercisecategory_id'),
+        (Exercise.gym_equipment, 'gymequipment_id'),
+    ]:
+        through = m2m_field.through
+        source_rows = through.objects.filter(
+            exercise_id__in=cloned_by_source_id
+        ).values_list('exercise_id', related_column)
+
+        through.objects.bulk_create([
+            through(**{
+                'exercise_id': cloned_by_source_id[exercise_id].id,
+                related_column: related_id,
+            })
+            for exercise_id, related_id in source_rows
+        ])
+
+    return cloned_by_source_id
+
+
+def clone_workouts(workouts, user) -> dict:
+    """
+    Copies workouts with their ordered workout exercises and exercises for the user.
+
+    Returns a mapping of source workout id to the cloned workout.
+    """
+    workouts = list({workout.id: workout for workout in workouts}.values())
+    if not workouts:
+        return {}
+
+    cloned_workouts = Workout.objects.bulk_create([
+        Workout(
+            name=workout.name,
+            description=workout.description,
+
+            original=workout,
+            created_by=user,
+        )
+        for workout in workouts
+    ])
+    cloned_by_source_id = {
+        workout.id: cloned_workout
+        for workout, cloned_workout in zip(workouts, cloned_workouts)
+    }
+    limitation_service.increment(user.id, Workout, len(cloned_workouts))
+
+    source_workout_exercises = list(
+        WorkoutExercise.objects.filter(
+            workout_id__in=cloned_by_source_id
+        ).select_related('exercise')
+    )
+    cloned_exercises = clone_exercises(
+        [workout_exercise.exercise for workout_exercise in source_workout_exercises],
+        user,
+    )
+
+    WorkoutExercise.objects.bulk_create([
+        WorkoutExercise(
+            workout=cloned_by_source_id[workout_exercise.workout_id],
+            exercise=cloned_exercises[workout_exercise.exercise_id],
+            sets=workout_exercise.sets,
+            value=workout_exercise.value,
+            rest_time_after_set=workout_exercise.rest_time_after_set,
+            order=workout_exercise.order,
+        )
+        for workout_exercise in source_workout_exercises
+    ])
+
+    return cloned_by_source_id
+
+
+@transaction.atomic
+def clone_exercise(exercise, user) -> Exercise:
+    return clone_exercises([exercise], user)[exercise.id]
+
+
+@transaction.atomic
+def clone_workout(workout, user) -> Workout:
+    return clone_workouts([workout], user)[workout.id]
+
+
+@transaction.atomic
+def clone_plan(plan, user) -> WeeklyFitnessPlan:
+    """Copies the whole plan tree with one INSERT per table."""
+    cloned_plan = WeeklyFitnessPlan.objects.create(
+        name=plan.name,
+        description=plan.description,
+
+        original=plan,
+        created_by=user,
+    )
+
+    source_plan_workouts = list(
+        WeeklyFitnessPlanWorkout.objects.filter(
+            weekly_fitness_plan=plan
+        ).select_related('workout')
+    )
+    cloned_workouts = clone_workouts(
+        [plan_workout.workout for plan_workout in source_plan_workouts],
+        user,
+    )
+
+    WeeklyFitnessPlanWorkout.objects.bulk_create([
+        WeeklyFitnessPlanWorkout(
+            weekly_fitness_plan=cloned_plan,
+            workout=cloned_workouts[plan_workout.workout_id],
+            week_day=plan_workout.week_day,
+        )
+        for plan_workout in source_plan_workouts
+    ])
+
+    return cloned_plan
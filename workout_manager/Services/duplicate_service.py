@@ -0,0 +1,61 @@
+import re
+from django.conf import settings
+from rapidfuzz import fuzz, process
+from rapidfuzz.utils import default_process
+from TrackHub import cache
+from workout_manager.models import Exercise
+
+
+CACHE_NAMESPACE = 'exercise_names'
+
+
+def normalize_name(name) -> str:
+    # "Жим  лёжа!" и "жим лежа" считаются одним названием
+    name = default_process(name or '').replace('ё', 'е')
+    return re.sub(r'\s+', ' ', name).strip()
+
+
+def _build_name_index(user_id) -> dict:
+    return {
+        exercise_id: normalize_name(name)
+        for exercise_id, name in Exercise.objects.filter(created_by_id=user_id).values_list('id', 'name')
+    }
+
+
+def get_name_index(user_id) -> dict:
+    """Normalized names of the user's exercises by id, read from the database once per change."""
+    return cache.get_object(
+        CACHE_NAMESPACE,
+        user_id,
+        lambda: _build_name_index(user_id),
+        settings.WORKOUT_MANAGER_DUPLICATE_INDEX_TIMEOUT,
+    )
+
+
+def invalidate_name_index(user_id) -> None:
+    if user_id:
+        cache.delete_objects(CACHE_NAMESPACE, [user_id])
+
+
+def find_similar_exercises(user, name, exclude_id=None) -> list:
+    """
+    Ids of the user's exercises whose names are likely duplicates of name,
+    the most similar first. All names are scored in one rapidfuzz batch.
+    """
+    name_index = get_name_index(user.id)
+    if exclude_id is not None:
+        name_index = {
+            exercise_id: indexed_name
+            for exercise_id, indexed_name in name_index.items()
+            if exercise_id != exclude_id
+        }
+
+    matches = process.extract(
+        normalize_name(name),
+        name_index,
+        scorer=fuzz.token_sort_ratio,
+        processor=None,
+        score_cutoff=settings.WORKOUT_MANAGER_DUPLICATE_NAME_SCORE,
+        limit=settings.WORKOUT_MANAGER_DUPLICATE_LIMIT,
+    )
+    return [exercise_id for indexed_name, score, exercise_id in matches]
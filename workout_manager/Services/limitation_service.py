@@ -0,0 +1,40 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from workout_manager.models import UserWorkoutManagerLimitation, Exercise, Workout, WeeklyFitnessPlan
+
+
+# Модель -> (поле счётчика, поле лимита)
+COUNTERS = {
+    Exercise: ('exercise_count', 'exercise_limitation'),
+    Workout: ('workout_count', 'workout_limitation'),
+    WeeklyFitnessPlan: ('plans_count', 'plans_limitation'),
+}
+
+
+def lock_counter(user, model):
+    """
+    Returns (count, limit) of the user's rows of the model.
+    Must run inside the transaction that creates the row: the limitation row
+    stays locked until commit, so concurrent creates are checked one by one.
+    """
+    count_field, limit_field = COUNTERS[model]
+    limitation = UserWorkoutManagerLimitation.objects.select_for_update().only(
+        count_field, limit_field
+    ).get(user=user)
+    return getattr(limitation, count_field), getattr(limitation, limit_field)
+
+
+def increment(user_id, model, amount=1) -> None:
+    count_field, _ = COUNTERS[model]
+    if amount:
+        UserWorkoutManagerLimitation.objects.filter(user_id=user_id).update(
+            **{count_field: F(count_field) + amount}
+        )
+
+
+def decrement(user_id, model, amount=1) -> None:
+    count_field, _ = COUNTERS[model]
+    if amount:
+        UserWorkoutManagerLimitation.objects.filter(user_id=user_id).update(
+            **{count_field: Greatest(F(count_field) - amount, 0)}
+        )
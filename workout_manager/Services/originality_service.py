@@ -1,45 +1,153 @@
+from django.conf import settings
+from TrackHub import cache
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
 from workout_manager.models import (
-    Exercise,
     Workout,
+    WorkoutExercise,
     WeeklyFitnessPlan,
+    WeeklyFitnessPlanWorkout,
 )
-from users.models import CustomUser
 
 
-def get_workout_originality_values(workout_id, user_id):
-    workout = Workout.objects.filter(id=workout_id).prefetch_related('exercises').first()
+WORKOUT_CACHE_NAMESPACE = 'workout_originality'
+PLAN_CACHE_NAMESPACE = 'plan_originality'
+
+
+def _count(queryset, group_by, condition=None):
+    """Correlated COUNT(*) subquery, optionally restricted to rows with condition."""
+    counted = queryset.order_by().values(group_by).annotate(
+        count=Count('id', filter=condition)
+    ).values('count')
+
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def _get_cached(namespace, object_id, calculate):
+    timeout = settings.WORKOUT_MANAGER_ORIGINALITY_CACHE_TIMEOUT
+    if not timeout:
+        return calculate()
+
+    return cache.get_object(namespace, object_id, calculate, timeout)
+
+
+def _not_original(prefix, owner):
+    """Copies and elements of other users, e.g. referenced through a subscription."""
+    return Q(**{f'{prefix}__original__isnull': False}) | ~Q(**{f'{prefix}__created_by_id': owner})
+
+
+def _get_owner(user_id):
+    # Без пользователя элементы сравниваются с автором самого дерева
+    return OuterRef('created_by_id') if user_id is None else user_id
+
+
+def _is_root_not_original(values, user_id):
+    if values['original_id']:
+        return True
+    return user_id is not None and values['created_by_id'] != user_id
+
+
+def _calculate_workout_originality_values(workout_id, user_id=None):
+    workout_exercises = WorkoutExercise.objects.filter(workout_id=OuterRef('pk'))
+    owner = _get_owner(user_id)
+
+    values = Workout.objects.filter(id=workout_id).annotate(
+        exercises_all=_count(workout_exercises, 'workout_id'),
+        exercises_not_original=_count(workout_exercises, 'workout_id', _not_original('exercise', owner)),
+    ).values('original_id', 'created_by_id', 'exercises_all', 'exercises_not_original').get()
 
-    count_all = 1
-    count_not_original = 1 if workout.original else 0
+    count_all = 1 + values['exercises_all']
+    count_not_original = (
+        (1 if _is_root_not_original(values, user_id) else 0) +
+        values['exercises_not_original']
+    )
+
+    return values['created_by_id'], count_all, count_not_original
+
+
+def _calculate_plan_originality_values(plan_id, user_id=None):
+    plan_workouts = WeeklyFitnessPlanWorkout.objects.filter(weekly_fitness_plan_id=OuterRef('pk'))
+    workout_exercises = WorkoutExercise.objects.filter(
+        workout__weekly_fitness_plan_workouts__weekly_fitness_plan_id=OuterRef('pk')
+    )
+    plan_group = 'workout__weekly_fitness_plan_workouts__weekly_fitness_plan_id'
+    owner = _get_owner(user_id)
+
+    values = WeeklyFitnessPlan.objects.filter(id=plan_id).annotate(
+        workouts_all=_count(plan_workouts, 'weekly_fitness_plan_id'),
+        workouts_not_original=_count(
+            plan_workouts, 'weekly_fitness_plan_id', _not_original('workout', owner)
+        ),
+        exercises_all=_count(workout_exercises, plan_group),
+        exercises_not_original=_count(
+            workout_exercises, plan_group, _not_original('exercise', owner)
+        ),
+    ).values(
+        'original_id',
+        'created_by_id',
+        'workouts_all',
+        'workouts_not_original',
+        'exercises_all',
+        'exercises_not_original',
+    ).get()
+
+    count_all = 1 + values['workouts_all'] + values['exercises_all']
+    count_not_original = (
+        (1 if _is_root_not_original(values, user_id) else 0) +
+        values['workouts_not_original'] +
+        values['exercises_not_original']
+    )
+
+    return values['created_by_id'], count_all, count_not_original
+
+
+def _get_values(namespace, object_id, user_id, calculate):
+    """
+    Values against the tree author are cached, for any other user
+    the whole tree is counted again.
+    """
+    owner_id, count_all, count_not_original = _get_cached(
+        namespace, object_id, lambda: calculate(object_id)
+    )
+    if owner_id != user_id:
+        owner_id, count_all, count_not_original = calculate(object_id, user_id)
 
-    for exercise in workout.exercises.all():
-        count_all += 1
-        if exercise.original:
-            count_not_original += 1
-    
     return count_all, count_not_original
 
 
+def get_workout_originality_values(workout_id, user_id):
+    """Counts all nodes of the workout tree and the ones not made by the user with a single aggregate query."""
+    return _get_values(
+        WORKOUT_CACHE_NAMESPACE, workout_id, user_id, _calculate_workout_originality_values
+    )
+
+
 def get_plan_originality_values(plan_id, user_id):
-    plan = WeeklyFitnessPlan.objects.filter(id=plan_id).prefetch_related('workouts').first()
+    """Counts all nodes of the plan tree and the ones not made by the user with a single aggregate query."""
+    return _get_values(
+        PLAN_CACHE_NAMESPACE, plan_id, user_id, _calculate_plan_originality_values
+    )
 
-    count_all = 1
-    count_not_original = 1 if plan.original else 0
 
-    for workout in plan.workouts.all():
-        workout_count_all, workout_count_not_original = get_workout_originality_values(workout.id, user_id)
+def invalidate_workouts(workout_ids):
+    """Drops cached values of the workouts and of every plan containing them."""
+    workout_ids = list(workout_ids)
+    if not workout_ids:
+        return
 
-        count_all += workout_count_all
-        count_not_original += workout_count_not_original
+    plan_ids = WeeklyFitnessPlanWorkout.objects.filter(
+        workout_id__in=workout_ids
+    ).values_list('weekly_fitness_plan_id', flat=True)
+
+    cache.delete_objects(WORKOUT_CACHE_NAMESPACE, workout_ids)
+    cache.delete_objects(PLAN_CACHE_NAMESPACE, plan_ids)
+
+
+def invalidate_plans(plan_ids):
+    cache.delete_objects(PLAN_CACHE_NAMESPACE, plan_ids)
 
-        count_all += 1
-        if workout.original:
-            count_not_original += 1
-    
-    return count_all, count_not_original
 
 def get_originality(count_all, count_not_original):
     percentage = (count_not_original / count_all) * 100
 
     return True if percentage < 80 else False
-
@@ -0,0 +1,71 @@
+from django.db.models import Prefetch, prefetch_related_objects
+from workout_manager.models import WorkoutExercise, WeeklyFitnessPlanWorkout
+
+
+def get_exercise_related_lookups(prefix=''):
+    """Returns select_related and prefetch_related lookups needed by ExerciseSerializer."""
+    select_related = [
+        f'{prefix}created_by',
+    ]
+    prefetch_related = [
+        f'{prefix}gym_equipment',
+        f'{prefix}category',
+    ]
+
+    return select_related, prefetch_related
+
+
+def get_workout_prefetch_lookups(prefix=''):
+    """
+    Returns prefetch_related lookups for the whole workout tree:
+    ordered workout exercises, their exercises and the exercises' M2M relations.
+    """
+    exercise_select_related, exercise_prefetch_related = get_exercise_related_lookups('exercise__')
+
+    workout_exercises = WorkoutExercise.objects.select_related(
+        'exercise',
+        *exercise_select_related,
+    )
+
+    return [
+        Prefetch(f'{prefix}workout_exercises', queryset=workout_exercises),
+        *[f'{prefix}workout_exercises__{lookup}' for lookup in exercise_prefetch_related],
+    ]
+
+
+def get_plan_prefetch_lookups(prefix=''):
+    """Returns prefetch_related lookups for the whole weekly plan tree down to exercise relations."""
+    plan_workouts = WeeklyFitnessPlanWorkout.objects.select_related(
+        'workout',
+        'workout__created_by',
+    )
+
+    return [
+        Prefetch(f'{prefix}weekly_fitness_plan_workouts', queryset=plan_workouts),
+        *get_workout_prefetch_lookups(f'{prefix}weekly_fitness_plan_workouts__workout__'),
+    ]
+
+
+def select_authors(queryset):
+    """
+    Joins the author only. The rest of the tree is loaded by the prefetch_*_objects
+    functions for the objects missing from the representation cache.
+    """
+    return queryset.select_related('created_by')
+
+
+def prefetch_exercise_objects(exercises):
+    """Loads every relation used by ExerciseSerializer in a constant number of queries."""
+    select_related, prefetch_related = get_exercise_related_lookups()
+
+    prefetch_related_objects(exercises, *select_related, *prefetch_related)
+
+
+def prefetch_workout_objects(workouts):
+    """Loads workouts' whole exercise tree in a constant number of queries."""
+    prefetch_related_objects(workouts, 'created_by', *get_workout_prefetch_lookups())
+
+
+def prefetch_plan_objects(plans):
+    """Loads weekly plans' whole workout tree in a constant number of queries."""
+    prefetch_related_objects(plans, 'created_by', *get_plan_prefetch_lookups())
@@ -1,29 +1,57 @@
-from workout_manager.models import Exercise, Workout, WeeklyFitnessPlan
+from django.db import transaction
+from workout_manager.Services import cache_service
+from workout_manager.models import Exercise, Workout, WeeklyFitnessPlan, WeeklyFitnessPlanWorkout
 
-def publish_workout(workout_id) -> None:
-    # Fetch the workout with exercises
-    workout = Workout.objects.prefetch_related('exercises').get(id=workout_id)
 
-    # Bulk update exercises instead of saving them one by one
-    exercises = list(workout.exercises.all())
-    for exercise in exercises:
-        exercise.is_published = True
-    Workout.exercises.model.objects.bulk_update(exercises, ['is_published'])
+def _publish_workouts(workout_ids) -> int:
+    """Publishes workouts and their exercises with two UPDATE ... WHERE id IN (subquery) statements."""
+    exercise_ids = list(Exercise.objects.filter(
+        workout_exercises__workout_id__in=workout_ids,
+        is_published=False,
+    ).values_list('id', flat=True))
+    exercises_count = Exercise.objects.filter(
+        workout_exercises__workout_id__in=workout_ids,
+        is_published=False,
+    ).update(is_published=True)
 
-    # Update workout
-    workout.is_published = True
-    workout.save(update_fields=['is_published'])
+    workouts_count = Workout.objects.filter(
+        id__in=workout_ids,
+        is_published=False,
+    ).update(is_published=True)
 
+    # update() не отправляет post_save, поэтому сбрасываем кэш сами
+    if exercises_count:
+        cache_service.invalidate_exercise_trees(exercise_ids)
+        cache_service.invalidate_exercises()
+    if workouts_count:
+        cache_service.invalidate_workout_trees(workout_ids)
+        cache_service.invalidate_workouts()
 
-def publish_plan(plan_id) -> None:
-    # Fetch plan with workouts and exercises efficiently
-    plan = WeeklyFitnessPlan.objects.prefetch_related('workouts', 'workouts__exercises').get(id=plan_id)
+    return exercises_count + workouts_count
 
-    # Publish all workouts
-    workouts = list(plan.workouts.all())
-    for workout in workouts:
-        publish_workout(workout.id)
 
-    # Update plan
-    plan.is_published = True
-    plan.save(update_fields=['is_published'])
+@transaction.atomic
+def publish_workout(workout_id) -> int:
+    """Publishes the workout tree and returns the number of rows touched."""
+    return _publish_workouts([workout_id])
+
+
+@transaction.atomic
+def publish_plan(plan_id) -> int:
+    """Publishes the whole plan tree and returns the number of rows touched."""
+    workout_ids = WeeklyFitnessPlanWorkout.objects.filter(
+        weekly_fitness_plan_id=plan_id
+    ).values_list('workout_id', flat=True)
+
+    workouts_count = _publish_workouts(workout_ids)
+
+    plans_count = WeeklyFitnessPlan.objects.filter(
+        id=plan_id,
+        is_published=False,
+    ).update(is_published=True)
+
+    if plans_count:
+        cache_service.invalidate_plan_trees([plan_id])
+        cache_service.invalidate_plans()
+
+    return workouts_count + plans_count
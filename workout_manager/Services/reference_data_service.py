@@ -0,0 +1,36 @@
+import hashlib
+import json
+from django.conf import settings
+from TrackHub import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from workout_manager.models import ExerciseCategory, GymEquipment
+from workout_manager.serializers import ExerciseCategorySerializer, GymEquipmentSerializer
+
+
+CACHE_NAMESPACE = 'reference_data'
+
+
+def _build_reference_data():
+    data = dict()
+    data['gym_equipment'] = GymEquipmentSerializer(GymEquipment.objects.all(), many=True).data
+    data['exercise_categories'] = ExerciseCategorySerializer(ExerciseCategory.objects.all(), many=True).data
+
+    # Сильный ETag от содержимого ответа
+    content = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True).encode()
+    etag = f'"{hashlib.sha256(content).hexdigest()}"'
+
+    return data, etag
+
+
+def get_reference_data():
+    """Gym equipment and exercise categories with their ETag, serialized once per version."""
+    return cache.get_or_set(
+        CACHE_NAMESPACE,
+        ['payload'],
+        _build_reference_data,
+        settings.CACHE_REFERENCE_DATA_TIMEOUT,
+    )
+
+
+def invalidate():
+    cache.invalidate_namespace(CACHE_NAMESPACE)
@@ -0,0 +1,44 @@
+from django.apps import apps
+from users.Services.image_handler import render_renditions
+from workout_manager.Services import cache_service
+
+
+def _generate_renditions(model_name, instance_id, field_name):
+    model = apps.get_model('workout_manager', model_name)
+    instance = model.objects.filter(id=instance_id).only(field_name).first()
+    if not instance:
+        return
+
+    file = getattr(instance, field_name)
+    if not file:
+        return
+
+    renditions = render_renditions(file.name, file.storage)
+
+    # Изображение могли заменить, пока копии создавались
+    updated = model.objects.filter(
+        id=instance_id,
+        **{field_name: file.name},
+    ).update(**{f'{field_name}_renditions': renditions})
+
+    if not updated:
+        return
+
+    # update() не отправляет post_save, ссылки на копии есть в справочных данных
+    # и в представлениях упражнений
+    if model_name == 'GymEquipment':
+        from workout_manager.Services import reference_data_service
+
+        reference_data_service.invalidate()
+        cache_service.invalidate_representations()
+    else:
+        cache_service.invalidate_exercise_trees([instance_id])
+        cache_service.invalidate_exercises()
+
+
+def generate_exercise_preview_renditions(exercise_id):
+    _generate_renditions('Exercise', exercise_id, 'preview')
+
+
+def generate_gym_equipment_image_renditions(gym_equipment_id):
+    _generate_renditions('GymEquipment', gym_equipment_id, 'image')
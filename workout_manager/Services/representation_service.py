@@ -0,0 +1,63 @@
+from django.conf import settings
+from TrackHub import cache
+from workout_manager.models import Exercise, Workout, WeeklyFitnessPlan
+from workout_manager.Services import cache_service, prefetch_service
+
+
+# Пространство имён кэша и загрузка дерева объекта для сериализации
+REPRESENTATIONS = {
+    Exercise: (cache_service.EXERCISE_NAMESPACE, prefetch_service.prefetch_exercise_objects),
+    Workout: (cache_service.WORKOUT_NAMESPACE, prefetch_service.prefetch_workout_objects),
+    WeeklyFitnessPlan: (cache_service.PLAN_NAMESPACE, prefetch_service.prefetch_plan_objects),
+}
+
+
+def _get_author_versions(instances) -> dict:
+    versions = cache.get_versions(
+        {cache_service.get_author_namespace(instance.created_by_id) for instance in instances}
+    )
+    return {
+        instance.created_by_id: versions[cache_service.get_author_namespace(instance.created_by_id)]
+        for instance in instances
+    }
+
+
+def _get_cache_parts(instance, author_versions):
+    # Версия автора сдвигается при изменении любого вложенного объекта и превью авторов
+    return [instance.pk, instance.changed_at.isoformat(), author_versions[instance.created_by_id]]
+
+
+def get_etag(instance) -> str:
+    """
+    ETag of the cached representation. The author version covers the whole tree of the object,
+    the namespace version covers shared gym equipment and categories.
+    """
+    namespace, prefetch = REPRESENTATIONS[type(instance)]
+    parts = _get_cache_parts(instance, _get_author_versions([instance]))
+    return f'"{cache.hash_part(cache.make_key(namespace, *parts))}"'
+
+
+def get_representations(instances, serializer) -> list:
+    """
+    Serialized instances in the same order.
+
+    Only the instances missing from the cache get their tree loaded and go through the serializer.
+    """
+    namespace, prefetch = REPRESENTATIONS[type(serializer).Meta.model]
+    author_versions = _get_author_versions(instances)
+
+    def serialize(missing_instances):
+        prefetch(missing_instances)
+        return [serializer.to_representation(instance) for instance in missing_instances]
+
+    return cache.get_or_set_many(
+        namespace,
+        instances,
+        lambda instance: _get_cache_parts(instance, author_versions),
+        serialize,
+        settings.CACHE_REPRESENTATION_TIMEOUT,
+    )
+
+
+def get_representation(instance, serializer_class):
+    return get_representations([instance], serializer_class())[0]
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import F
+
+
+# Конфигурации должны совпадать с триггером search_vector (миграция 0011)
+SEARCH_CONFIGS = ['russian', 'english']
+
+_trigram_available = {}
+
+
+def has_trigram_extension() -> bool:
+    """pg_trgm is optional, the result is remembered per database."""
+    alias = connection.alias
+    if alias not in _trigram_available:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+            _trigram_available[alias] = cursor.fetchone()[0]
+    return _trigram_available[alias]
+
+
+def get_search_query(text) -> SearchQuery:
+    search_query = None
+    for config in SEARCH_CONFIGS:
+        config_query = SearchQuery(text, config=config, search_type='websearch')
+        search_query = config_query if search_query is None else search_query | config_query
+    return search_query
+
+
+def search_exercises(queryset, text):
+    """
+    Exercises ranked by the full-text match on name, description and instructions.
+
+    When nothing matches and pg_trgm is installed, falls back to the trigram
+    similarity of the name, so queries with typos still find exercises.
+    """
+    search_query = get_search_query(text)
+    exercises = queryset.filter(search_vector=search_query).annotate(
+        rank=SearchRank(F('search_vector'), search_query),
+    )
+
+    if has_trigram_extension() and not exercises.exists():
+        exercises = queryset.filter(name__trigram_word_similar=text).annotate(
+            rank=TrigramWordSimilarity(text, 'name'),
+        )
+
+    return exercises.order_by('-rank', '-id')
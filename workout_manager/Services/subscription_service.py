@@ -0,0 +1,291 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from workout_manager.models import (
+    Exercise,
+    Workout,
+    WorkoutExercise,
+    WeeklyFitnessPlan,
+    WeeklyFitnessPlanWorkout,
+    WorkoutSubscription,
+    WeeklyFitnessPlanSubscription,
+)
+from workout_manager.Services import clone_service
+
+
+def subscribe_on_workout(workout, user) -> None:
+    """Subscribes the user on a published workout: a reference in copy-on-write mode, a clone otherwise."""
+    if settings.WORKOUT_MANAGER_COPY_ON_WRITE_SUBSCRIPTIONS:
+        WorkoutSubscription.objects.get_or_create(user=user, workout=workout)
+    else:
+        clone_service.clone_workout(workout, user)
+
+
+def subscribe_on_plan(plan, user) -> None:
+    """Subscribes the user on a published plan: a reference in copy-on-write mode, a clone otherwise."""
+    if settings.WORKOUT_MANAGER_COPY_ON_WRITE_SUBSCRIPTIONS:
+        WeeklyFitnessPlanSubscription.objects.get_or_create(user=user, weekly_fitness_plan=plan)
+    else:
+        clone_service.clone_plan(plan, user)
+
+
+def _filter_archived(queryset, is_archived):
+    if is_archived is None:
+        return queryset
+    return queryset.filter(is_archived=is_archived)
+
+
+def _referenced_workout_ids(user, is_archived=None) -> list:
+    """Workout id querysets referenced by the user directly and through plans, to be UNIONed."""
+    workout_subscriptions = _filter_archived(
+        WorkoutSubscription.objects.filter(user=user),
+        is_archived,
+    )
+    plan_subscriptions = _filter_archived(
+        WeeklyFitnessPlanSubscription.objects.filter(user=user),
+        is_archived,
+    )
+
+    return [
+        workout_subscriptions.values('workout_id'),
+        WeeklyFitnessPlanWorkout.objects.filter(
+            weekly_fitness_plan_id__in=plan_subscriptions.values('weekly_fitness_plan_id'),
+        ).values('workout_id'),
+    ]
+
+
+def _union_ids(first, *others):
+    # UNION вместо OR: каждая часть читается своим индексом, без полного просмотра таблицы
+    return first.union(*others)
+
+
+def _subscribed_workout_ids(user, is_archived=None):
+    """Q for workouts referenced by the user directly or through a plan."""
+    return Q(id__in=_union_ids(*_referenced_workout_ids(user, is_archived)))
+
+
+def _copies(model, user, is_archived):
+    return model.objects.filter(
+        created_by=user,
+        is_archived=is_archived,
+        original__isnull=False,
+    ).values('id')
+
+
+def get_subscribed_exercises(user, is_archived=False):
+    """Cloned exercises of the user and exercises of the workouts and plans the user references."""
+    referenced_exercise_ids = WorkoutExercise.objects.filter(
+        workout_id__in=_union_ids(*_referenced_workout_ids(user, is_archived))
+    ).values('exercise_id')
+
+    return Exercise.objects.filter(
+        id__in=_union_ids(_copies(Exercise, user, is_archived), referenced_exercise_ids)
+    )
+
+
+def get_subscribed_workouts(user, is_archived=False):
+    """Cloned workouts of the user and workouts the user references directly or through plans."""
+    return Workout.objects.filter(
+        id__in=_union_ids(_copies(Workout, user, is_archived), *_referenced_workout_ids(user, is_archived))
+    )
+
+
+def get_subscribed_plans(user, is_archived=False):
+    """Cloned plans of the user and plans the user references."""
+    referenced_plan_ids = WeeklyFitnessPlanSubscription.objects.filter(
+        user=user,
+        is_archived=is_archived,
+    ).values('weekly_fitness_plan_id')
+
+    return WeeklyFitnessPlan.objects.filter(
+        id__in=_union_ids(_copies(WeeklyFitnessPlan, user, is_archived), referenced_plan_ids)
+    )
+
+
+def get_archived_workouts(user):
+    """Archived workouts of the user, cloned or own, and archived workout subscriptions."""
+    own_workout_ids = Workout.objects.filter(created_by=user, is_archived=True).values('id')
+
+    return Workout.objects.filter(
+        id__in=_union_ids(own_workout_ids, *_referenced_workout_ids(user, is_archived=True))
+    )
+
+
+def get_archived_plans(user):
+    """Archived plans of the user, cloned or own, and archived plan subscriptions."""
+    own_plan_ids = WeeklyFitnessPlan.objects.filter(created_by=user, is_archived=True).values('id')
+    referenced_plan_ids = WeeklyFitnessPlanSubscription.objects.filter(
+        user=user,
+        is_archived=True,
+    ).values('weekly_fitness_plan_id')
+
+    return WeeklyFitnessPlan.objects.filter(id__in=_union_ids(own_plan_ids, referenced_plan_ids))
+
+
+def is_subscribed_on_exercise(exercise, user) -> bool:
+    if not user.is_authenticated:
+        return False
+    return Workout.objects.filter(
+        Q(workout_exercises__exercise=exercise),
+        _subscribed_workout_ids(user),
+    ).exists()
+
+
+def is_subscribed_on_workout(workout, user) -> bool:
+    if not user.is_authenticated:
+        return False
+    return Workout.objects.filter(
+        Q(id=workout.id),
+        _subscribed_workout_ids(user),
+    ).exists()
+
+
+def is_subscribed_on_plan(plan, user) -> bool:
+    if not user.is_authenticated:
+        return False
+    return WeeklyFitnessPlanSubscription.objects.filter(user=user, weekly_fitness_plan=plan).exists()
+
+
+def unsubscribe_from_workout(workout, user) -> bool:
+    deleted, _ = WorkoutSubscription.objects.filter(user=user, workout=workout).delete()
+    return bool(deleted)
+
+
+def unsubscribe_from_plan(plan, user) -> bool:
+    deleted, _ = WeeklyFitnessPlanSubscription.objects.filter(user=user, weekly_fitness_plan=plan).delete()
+    return bool(deleted)
+
+
+def toggle_workout_subscription_archived(workout, user):
+    """Returns the new is_archived value or None when the user is not subscribed on the workout."""
+    subscription = WorkoutSubscription.objects.filter(user=user, workout=workout).first()
+    if not subscription:
+        return None
+
+    subscription.is_archived = not subscription.is_archived
+    subscription.save(update_fields=['is_archived'])
+    return subscription.is_archived
+
+
+def toggle_plan_subscription_archived(plan, user):
+    """Returns the new is_archived value or None when the user is not subscribed on the plan."""
+    subscription = WeeklyFitnessPlanSubscription.objects.filter(user=user, weekly_fitness_plan=plan).first()
+    if not subscription:
+        return None
+
+    subscription.is_archived = not subscription.is_archived
+    subscription.save(update_fields=['is_archived'])
+    return subscription.is_archived
+
+
+def exercise_has_subscribers(exercise) -> bool:
+    """Subscribers either own a clone of the exercise or reference a workout containing it."""
+    return (
+        Exercise.objects.filter(original=exercise).exists() or
+        Workout.objects.filter(
+            Q(workout_exercises__exercise=exercise),
+            Q(subscriptions__isnull=False) |
+            Q(weekly_fitness_plan_workouts__weekly_fitness_plan__subscriptions__isnull=False),
+        ).exists()
+    )
+
+
+def workout_has_subscribers(workout) -> bool:
+    return (
+        Workout.objects.filter(original=workout).exists() or
+        WorkoutSubscription.objects.filter(workout=workout).exists() or
+        WeeklyFitnessPlanSubscription.objects.filter(
+            weekly_fitness_plan__weekly_fitness_plan_workouts__workout=workout
+        ).exists()
+    )
+
+
+def plan_has_subscribers(plan) -> bool:
+    return (
+        WeeklyFitnessPlan.objects.filter(original=plan).exists() or
+        WeeklyFitnessPlanSubscription.objects.filter(weekly_fitness_plan=plan).exists()
+    )
+
+
+@transaction.atomic
+def _materialize_workout_subscription(subscription) -> Workout:
+    cloned_workout = clone_service.clone_workout(subscription.workout, subscription.user)
+    if subscription.is_archived:
+        Workout.objects.filter(id=cloned_workout.id).update(is_archived=True)
+        cloned_workout.is_archived = True
+    subscription.delete()
+
+    return cloned_workout
+
+
+@transaction.atomic
+def _materialize_plan_subscription(subscription) -> WeeklyFitnessPlan:
+    cloned_plan = clone_service.clone_plan(subscription.weekly_fitness_plan, subscription.user)
+    if subscription.is_archived:
+        WeeklyFitnessPlan.objects.filter(id=cloned_plan.id).update(is_archived=True)
+        cloned_plan.is_archived = True
+    subscription.delete()
+
+    return cloned_plan
+
+
+def get_private_plan_copy(plan, user):
+    """
+    Materializes the user's private copy of a referenced plan before it is edited.
+    Returns None when the user is not subscribed on the plan.
+    """
+    subscription = WeeklyFitnessPlanSubscription.objects.filter(
+        user=user,
+        weekly_fitness_plan=plan,
+    ).select_related('weekly_fitness_plan', 'user').first()
+    if not subscription:
+        return None
+
+    return _materialize_plan_subscription(subscription)
+
+
+def get_private_workout_copy(workout, user):
+    """
+    Materializes the user's private copy of a referenced workout before it is edited.
+    A workout referenced through a plan materializes the whole plan.
+    Returns None when the user is not subscribed on the workout.
+    """
+    subscription = WorkoutSubscription.objects.filter(
+        user=user,
+        workout=workout,
+    ).select_related('workout', 'user').first()
+    if subscription:
+        return _materialize_workout_subscription(subscription)
+
+    plan = WeeklyFitnessPlan.objects.filter(
+        subscriptions__user=user,
+        weekly_fitness_plan_workouts__workout=workout,
+    ).first()
+    if not plan:
+        return None
+
+    cloned_plan = get_private_plan_copy(plan, user)
+    return Workout.objects.filter(
+        original=workout,
+        weekly_fitness_plan_workouts__weekly_fitness_plan=cloned_plan,
+    ).first()
+
+
+def get_private_exercise_copy(exercise, user):
+    """
+    Materializes the user's private copy of a referenced exercise before it is edited.
+    The subscribed workout or plan containing the exercise is materialized with it.
+    Returns None when the user is not subscribed on the exercise.
+    """
+    workout = Workout.objects.filter(
+        Q(workout_exercises__exercise=exercise),
+        _subscribed_workout_ids(user),
+    ).first()
+    if not workout:
+        return None
+
+    cloned_workout = get_private_workout_copy(workout, user)
+    return Exercise.objects.filter(
+        original=exercise,
+        workout_exercises__workout=cloned_workout,
+    ).first()
@@ -0,0 +1,186 @@
+import hashlib
+import math
+import os
+import uuid
+from datetime import timedelta
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from TrackHub.s3_client import get_s3_client
+from users.Services import media_store
+from users.Services.delete_instances_from_s3 import get_media_key
+from workout_manager.models import VideoUploadSession
+from workout_manager.Services import subscription_service
+
+
+VIDEO_UPLOAD_PATH = "exercises/videos/"
+MB = 1024 * 1024
+# S3 допускает не более 10000 частей в одной загрузке
+MAX_PARTS_COUNT = 10000
+
+
+def get_max_video_size():
+    return settings.WORKOUT_MANAGER_VIDEO_MAX_SIZE_MB * MB
+
+
+def _get_part_size(file_size):
+    part_size = settings.WORKOUT_MANAGER_VIDEO_PART_SIZE_MB * MB
+    return max(part_size, math.ceil(file_size / MAX_PARTS_COUNT))
+
+
+def _check_exercise_can_be_updated(exercise):
+    # То же правило, что и в ExerciseSerializer.validate
+    if exercise.is_published and subscription_service.exercise_has_subscribers(exercise):
+        raise ValidationError("Cannot update a published exercise with subscribers.")
+
+
+def get_expired_before():
+    return timezone.now() - timedelta(seconds=settings.WORKOUT_MANAGER_VIDEO_UPLOAD_SESSION_EXPIRES)
+
+
+def get_part_urls(session):
+    """Presigned URLs the client PUTs the parts to, directly and in any order."""
+    s3_client = get_s3_client()
+    parts_count = math.ceil(session.file_size / session.part_size)
+
+    return [
+        {
+            'part_number': part_number,
+            'url': s3_client.generate_presigned_url(
+                'upload_part',
+                Params={
+                    'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
+                    'Key': get_media_key(session.name),
+                    'UploadId': session.upload_id,
+                    'PartNumber': part_number,
+                },
+                ExpiresIn=settings.WORKOUT_MANAGER_VIDEO_UPLOAD_URL_EXPIRES,
+            ),
+        }
+        for part_number in range(1, parts_count + 1)
+    ]
+
+
+def start_upload(exercise, user, file_name, file_size) -> VideoUploadSession:
+    _check_exercise_can_be_updated(exercise)
+    if file_size > get_max_video_size():
+        raise ValidationError(
+            f"Файл слишком большой! Максимальный размер: {settings.WORKOUT_MANAGER_VIDEO_MAX_SIZE_MB}MB."
+        )
+
+    name = f"{VIDEO_UPLOAD_PATH}{uuid.uuid4().hex}{os.path.splitext(file_name)[1].lower()}"
+    response = get_s3_client().create_multipart_upload(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        Key=get_media_key(name),
+    )
+
+    return VideoUploadSession.objects.create(
+        exercise=exercise,
+        created_by=user,
+        upload_id=response['UploadId'],
+        name=name,
+        file_size=file_size,
+        part_size=_get_part_size(file_size),
+    )
+
+
+def abort_upload(session) -> None:
+    try:
+        get_s3_client().abort_multipart_upload(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=get_media_key(session.name),
+            UploadId=session.upload_id,
+        )
+    except ClientError as e:
+        # Загрузка уже завершена или отменена в хранилище
+        if e.response['Error']['Code'] != 'NoSuchUpload':
+            raise
+    session.delete()
+
+
+def abort_expired_uploads() -> int:
+    """
+    Aborts uploads started more than WORKOUT_MANAGER_VIDEO_UPLOAD_SESSION_EXPIRES seconds ago,
+    so their parts don't stay in the bucket. Returns the number of aborted uploads.
+    """
+    expired_sessions = list(VideoUploadSession.objects.filter(created_at__lt=get_expired_before()))
+    for session in expired_sessions:
+        abort_upload(session)
+    return len(expired_sessions)
+
+
+def _move_to_content_name(s3_client, session):
+    """
+    Copies the assembled object to its content-addressed name, like media_store.store()
+    does for regular uploads, so identical videos share one object and one reference count.
+    """
+    content_hash = hashlib.sha256()
+    body = s3_client.get_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=get_media_key(session.name))['Body']
+    for chunk in body.iter_chunks(chunk_size=MB):
+        content_hash.update(chunk)
+
+    name = media_store.get_digest_name(content_hash.hexdigest(), session.name)
+    if not media_store.is_stored(name):
+        # Managed copy: объекты больше 5GB копируются по частям
+        s3_client.copy(
+            {'Bucket': settings.AWS_STORAGE_BUCKET_NAME, 'Key': get_media_key(session.name)},
+            settings.AWS_STORAGE_BUCKET_NAME,
+            get_media_key(name),
+        )
+    return name
+
+
+def complete_upload(session, parts):
+    """
+    Assembles the uploaded parts, moves them to the content-addressed name
+    and points Exercise.video at it. Exercise.save() moves the media references,
+    so the previous video is released through the media store.
+    """
+    if session.created_at < get_expired_before():
+        abort_upload(session)
+        raise ValidationError("Загрузка видео устарела, начните её заново.")
+    _check_exercise_can_be_updated(session.exercise)
+
+    s3_client = get_s3_client()
+    key = get_media_key(session.name)
+
+    try:
+        s3_client.complete_multipart_upload(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=key,
+            UploadId=session.upload_id,
+            MultipartUpload={
+                'Parts': [
+                    {'PartNumber': part['part_number'], 'ETag': part['etag']}
+                    for part in sorted(parts, key=lambda part: part['part_number'])
+                ],
+            },
+        )
+    except ClientError as e:
+        raise ValidationError(f"Не удалось завершить загрузку видео: {e.response['Error']['Message']}")
+
+    uploaded_size = s3_client.head_object(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        Key=key,
+    )['ContentLength']
+    if uploaded_size > get_max_video_size():
+        s3_client.delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)
+        session.delete()
+        raise ValidationError(
+            f"Файл слишком большой! Максимальный размер: {settings.WORKOUT_MANAGER_VIDEO_MAX_SIZE_MB}MB."
+        )
+
+    name = _move_to_content_name(s3_client, session)
+
+    with transaction.atomic():
+        exercise = session.exercise
+        exercise.video.name = name
+        exercise.save()
+        session.delete()
+
+    # Временный объект загрузки больше не нужен
+    s3_client.delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)
+
+    return exercise
@@ -0,0 +1,87 @@
+import django_filters
+from django.db.models import Count, Exists, OuterRef
+from rest_framework.exceptions import ValidationError
+from workout_manager.models import Exercise
+
+
+FACETS_QUERY_PARAM = 'facets'
+
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    pass
+
+
+def _related_exists(through, related_column, related_ids):
+    """
+    EXISTS over the M2M table instead of a JOIN: no duplicate rows, and with
+    the (related_id, exercise_id) indexes the subquery is index-only.
+    """
+    return Exists(through.objects.filter(
+        exercise_id=OuterRef('pk'),
+        **{f'{related_column}__in': related_ids},
+    ))
+
+
+class ExerciseFilter(django_filters.FilterSet):
+    """
+    ?category=1,2&equipment=3&measured_in_reps=true
+
+    Values of one parameter are combined with OR, different parameters with AND.
+    """
+    category = NumberInFilter(method='filter_category')
+    equipment = NumberInFilter(method='filter_equipment')
+    measured_in_reps = django_filters.BooleanFilter(field_name='is_measured_in_reps')
+
+    class Meta:
+        model = Exercise
+        fields = ['category', 'equipment', 'measured_in_reps']
+
+    def filter_category(self, queryset, name, value):
+        return queryset.filter(_related_exists(Exercise.category.through, 'exercisecategory_id', value))
+
+    def filter_equipment(self, queryset, name, value):
+        return queryset.filter(_related_exists(Exercise.gym_equipment.through, 'gymequipment_id', value))
+
+
+def _count_related(through, related_column, exercise_ids):
+    counts = through.objects.filter(exercise_id__in=exercise_ids).values(related_column).annotate(
+        count=Count('exercise_id'),
+    ).order_by(related_column)
+
+    return [{'id': row[related_column], 'count': row['count']} for row in counts]
+
+
+def get_facets(queryset) -> dict:
+    """Number of filtered exercises per category, gym equipment and measure."""
+    exercise_ids = queryset.order_by().values('id')
+
+    measured_in_reps = {
+        row['is_measured_in_reps']: row['count']
+        for row in queryset.order_by().values('is_measured_in_reps').annotate(count=Count('id'))
+    }
+
+    return {
+        'category': _count_related(Exercise.category.through, 'exercisecategory_id', exercise_ids),
+        'equipment': _count_related(Exercise.gym_equipment.through, 'gymequipment_id', exercise_ids),
+        'measured_in_reps': {
+            'true': measured_in_reps.get(True, 0),
+            'false': measured_in_reps.get(False, 0),
+        },
+    }
+
+
+def filter_exercises(request, queryset):
+    """
+    Applies ExerciseFilter to the queryset. Returns the filtered queryset and,
+    when the client asked for them with ?facets=true, its facet counts.
+    """
+    filterset = ExerciseFilter(request.query_params, queryset=queryset, request=request)
+    if not filterset.is_valid():
+        raise ValidationError(filterset.errors)
+
+    exercises = filterset.qs
+    facets = None
+    if request.query_params.get(FACETS_QUERY_PARAM) in ['1', 'true', 'True']:
+        facets = get_facets(exercises)
+
+    return exercises, facets
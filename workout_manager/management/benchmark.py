@@ -0,0 +1,2 @@
+# Пользователи, созданные seed_list_benchmark; по домену их находит explain_list_queries
+BENCHMARK_EMAIL_DOMAIN = 'benchmark.trackhub.local'
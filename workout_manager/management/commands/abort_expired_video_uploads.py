@@ -0,0 +1,24 @@
+import time
+from django.core.management.base import BaseCommand
+from workout_manager.Services.video_upload_service import abort_expired_uploads
+
+
+class Command(BaseCommand):
+    help = "Отменяет незавершённые загрузки видео и удаляет их части из хранилища"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help="Работать как воркер, проверяя загрузки каждые N секунд",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            aborted_count = abort_expired_uploads()
+            self.stdout.write(f"Aborted {aborted_count} uploads")
+
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from workout_manager.models import LIST_ORDERING, Exercise, Workout, WeeklyFitnessPlan
+from workout_manager.Services import subscription_service
+from workout_manager.management.benchmark import BENCHMARK_EMAIL_DOMAIN
+
+
+def get_list_querysets(user) -> dict:
+    """Querysets of the list endpoints, filtered the same way the views do."""
+    return {
+        'exercises': Exercise.objects.filter(is_public=True),
+        'exercises/published': Exercise.objects.filter(created_by=user, is_published=True),
+        'exercises/personal': Exercise.objects.filter(created_by=user, is_archived=False, original=None),
+        'exercises/subscribed': subscription_service.get_subscribed_exercises(user),
+        'exercises/archived': Exercise.objects.filter(created_by=user, is_archived=True),
+
+        'workouts': Workout.objects.filter(is_public=True),
+        'workouts/published': Workout.objects.filter(is_published=True),
+        'workouts/personal': Workout.objects.filter(created_by=user, is_archived=False, original=None),
+        'workouts/subscribed': subscription_service.get_subscribed_workouts(user),
+        'workouts/archived': subscription_service.get_archived_workouts(user),
+
+        'weekly_plans': WeeklyFitnessPlan.objects.filter(is_public=True),
+        'weekly_plans/published': WeeklyFitnessPlan.objects.filter(is_published=True),
+        'weekly_plans/personal': WeeklyFitnessPlan.objects.filter(created_by=user, is_archived=False, original=None),
+        'weekly_plans/subscribed': subscription_service.get_subscribed_plans(user),
+        'weekly_plans/archived': subscription_service.get_archived_plans(user),
+    }
+
+
+class Command(BaseCommand):
+    help = "Выводит EXPLAIN для первой страницы каждого списка упражнений, тренировок и планов"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, help="По умолчанию первый пользователь из seed_list_benchmark")
+        parser.add_argument('--analyze', action='store_true', help="Выполнить запросы (EXPLAIN ANALYZE)")
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.all()
+        if options['user_id']:
+            user = users.filter(id=options['user_id']).first()
+        else:
+            user = users.filter(email__endswith=f'@{BENCHMARK_EMAIL_DOMAIN}').order_by('id').first()
+        if not user:
+            raise CommandError("Пользователь не найден, сначала запустите seed_list_benchmark.")
+
+        for endpoint, queryset in get_list_querysets(user).items():
+            page = queryset.order_by(*LIST_ORDERING)[:settings.WORKOUT_MANAGER_PAGE_SIZE]
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f'/workout_manager/{endpoint}/'))
+            self.stdout.write(page.explain(analyze=options['analyze']))
+            self.stdout.write('')
@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from workout_manager.management.benchmark import BENCHMARK_EMAIL_DOMAIN
+from workout_manager.models import Exercise, Workout, WeeklyFitnessPlan
+
+
+EXERCISE_COLUMNS_SQL = """
+    'benchmark exercise ' || n, '[]'::jsonb, '{}'::jsonb, n %% 2 = 0,
+"""
+
+# Доли строк в срезах списков: 10% публичных, 5% опубликованных, 14% в архиве
+INSERT_SQL = """
+INSERT INTO {table} ({columns} is_public, is_published, is_archived, created_by_id, changed_at)
+SELECT {values}
+    (users.id + n) %% 10 = 0, (users.id + n) %% 20 = 0, (users.id + n) %% 7 = 0, users.id,
+    now() - (users.id * %(per_user)s + n) * interval '1 second'
+FROM (SELECT id FROM {user_table} WHERE email LIKE %(email)s) AS users
+CROSS JOIN generate_series(1, %(per_user)s) AS n
+"""
+
+# Каждая пятая строка становится копией предыдущей (подписки без copy-on-write)
+COPIES_SQL = """
+UPDATE {table} AS copy SET original_id = previous.id
+FROM {table} AS previous
+WHERE previous.id = copy.id - 1 AND copy.id %% 5 = 0
+    AND copy.created_by_id IN (SELECT id FROM {user_table} WHERE email LIKE %(email)s)
+"""
+
+
+class Command(BaseCommand):
+    help = "Наполняет базу данными для проверки планов запросов списков (только для тестовой базы)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--exercises-per-user', type=int, default=20)
+        parser.add_argument('--workouts-per-user', type=int, default=5)
+        parser.add_argument('--plans-per-user', type=int, default=2)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help="Запустить без DEBUG, например на отдельной базе для замеров",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError(
+                "Команда пишет в базу DATABASES['default'] и запускается только с DEBUG или --force."
+            )
+
+        User = get_user_model()
+        email_pattern = f'%@{BENCHMARK_EMAIL_DOMAIN}'
+        start = User.objects.filter(email__endswith=f'@{BENCHMARK_EMAIL_DOMAIN}').count()
+
+        # bulk_create не вызывает save() и сигналы: аватары и лимиты пользователям не нужны
+        for batch_start in range(start, options['users'], options['batch_size']):
+            batch_end = min(batch_start + options['batch_size'], options['users'])
+            User.objects.bulk_create([
+                User(
+                    email=f'user{index}@{BENCHMARK_EMAIL_DOMAIN}',
+                    password='!',
+                    first_name='Benchmark',
+                )
+                for index in range(batch_start, batch_end)
+            ])
+        self.stdout.write(f"Users: {options['users']}")
+
+        user_table = connection.ops.quote_name(User._meta.db_table)
+        for model, per_user, columns, values in [
+            (
+                Exercise,
+                options['exercises_per_user'],
+                'name, instructions, preview_renditions, is_measured_in_reps,',
+                EXERCISE_COLUMNS_SQL,
+            ),
+            (Workout, options['workouts_per_user'], 'name,', "'benchmark workout ' || n,"),
+            (WeeklyFitnessPlan, options['plans_per_user'], 'name,', "'benchmark plan ' || n,"),
+        ]:
+            table = connection.ops.quote_name(model._meta.db_table)
+            params = {'per_user': per_user, 'email': email_pattern}
+
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    INSERT_SQL.format(table=table, columns=columns, values=values, user_table=user_table),
+                    params,
+                )
+                inserted = cursor.rowcount
+                cursor.execute(COPIES_SQL.format(table=table, user_table=user_table), params)
+
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {table}')
+            self.stdout.write(f"{model.__name__}: {inserted}")
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workout_manager', '0006_alter_exercise_instructions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyFitnessPlanSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_archived', models.BooleanField(default=False)),
+                ('subscribed_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_fitness_plan_subscriptions', to=settings.AUTH_USER_MODEL)),
+                ('weekly_fitness_plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subscriptions', to='workout_manager.weeklyfitnessplan')),
+            ],
+            options={
+                'unique_together': {('user', 'weekly_fitness_plan')},
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkoutSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_archived', models.BooleanField(default=False)),
+                ('subscribed_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='workout_subscriptions', to=settings.AUTH_USER_MODEL)),
+                ('workout', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subscriptions', to='workout_manager.workout')),
+            ],
+            options={
+                'unique_together': {('user', 'workout')},
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:28
+
+import TrackHub.trackhub_bucket
+import users.fields
+import users.validators
+import workout_manager.validators
+from collections import Counter
+from django.db import migrations
+
+
+def backfill_stored_media(apps, schema_editor):
+    """Counts references to files uploaded before the media store existed."""
+    StoredMedia = apps.get_model('users', 'StoredMedia')
+    Exercise = apps.get_model('workout_manager', 'Exercise')
+    GymEquipment = apps.get_model('workout_manager', 'GymEquipment')
+    CustomUser = apps.get_model('users', 'CustomUser')
+
+    counts = Counter()
+    for queryset, field_name in [
+        (Exercise.objects.all(), 'preview'),
+        (Exercise.objects.all(), 'video'),
+        (GymEquipment.objects.all(), 'image'),
+        (CustomUser.objects.exclude(avatar__startswith='avatars/default/'), 'avatar'),
+    ]:
+        counts.update(
+            queryset.exclude(**{f'{field_name}__isnull': True}).exclude(
+                **{field_name: ''}
+            ).values_list(field_name, flat=True).iterator()
+        )
+
+    StoredMedia.objects.bulk_create(
+        [StoredMedia(name=name, reference_count=count) for name, count in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workout_manager', '0007_workoutsubscription_weeklyfitnessplansubscription'),
+        ('users', '0008_storedmedia'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exercise',
+            name='preview',
+            field=users.fields.ContentAddressedImageField(blank=True, null=True, storage=TrackHub.trackhub_bucket.TrackHubMediaStorage(), upload_to='exercises/previews/', validators=[users.validators.validate_image]),
+        ),
+        migrations.AlterField(
+            model_name='exercise',
+            name='video',
+            field=users.fields.ContentAddressedFileField(blank=True, null=True, upload_to='exercises/videos/', validators=[workout_manager.validators.validate_video_size]),
+        ),
+        migrations.AlterField(
+            model_name='gymequipment',
+            name='image',
+            field=users.fields.ContentAddressedImageField(storage=TrackHub.trackhub_bucket.TrackHubMediaStorage(), upload_to='gym_equipment/', validators=[users.validators.validate_image]),
+        ),
+        migrations.RunPython(backfill_stored_media, migrations.RunPython.noop),
+    ]
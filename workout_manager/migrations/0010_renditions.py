@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workout_manager', '0009_videouploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exercise',
+            name='preview_renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='gymequipment',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
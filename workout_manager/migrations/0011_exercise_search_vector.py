@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:57
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+SEARCH_VECTOR_SQL = """
+CREATE FUNCTION workout_manager_exercise_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(NEW.description, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B') ||
+        setweight(jsonb_to_tsvector('russian', coalesce(NEW.instructions, '[]'), '["string"]'), 'C') ||
+        setweight(jsonb_to_tsvector('english', coalesce(NEW.instructions, '[]'), '["string"]'), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER workout_manager_exercise_search_vector
+    BEFORE INSERT OR UPDATE OF name, description, instructions, search_vector
+    ON workout_manager_exercise
+    FOR EACH ROW EXECUTE FUNCTION workout_manager_exercise_search_vector();
+
+UPDATE workout_manager_exercise SET search_vector = NULL;
+"""
+
+DROP_SEARCH_VECTOR_SQL = """
+DROP TRIGGER IF EXISTS workout_manager_exercise_search_vector ON workout_manager_exercise;
+DROP FUNCTION IF EXISTS workout_manager_exercise_search_vector();
+"""
+
+# pg_trgm есть не во всех установках PostgreSQL, без него поиск обходится без исправления опечаток
+TRIGRAM_SQL = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS exercise_name_trgm_idx
+            ON workout_manager_exercise USING gin (name gin_trgm_ops);
+    END IF;
+EXCEPTION WHEN insufficient_privilege THEN
+    RAISE NOTICE 'pg_trgm is not installed: %', SQLERRM;
+END
+$$;
+"""
+
+DROP_TRIGRAM_SQL = "DROP INDEX IF EXISTS exercise_name_trgm_idx;"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workout_manager', '0010_renditions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exercise',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='exercise',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='exercise_search_vector_idx'),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_SQL, DROP_SEARCH_VECTOR_SQL),
+        migrations.RunSQL(TRIGRAM_SQL, DROP_TRIGRAM_SQL),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:20
+
+from django.db import migrations
+
+
+# Автоматические таблицы M2M не поддерживают Meta.indexes. Индексы
+# (related_id, exercise_id) дополняют уникальные (exercise_id, related_id):
+# фильтр по категории или тренажёру читает только индекс.
+INDEXES = [
+    ('exercise_category_exercise_idx', 'workout_manager_exercise_category', 'exercisecategory_id'),
+    ('exercise_equipment_exercise_idx', 'workout_manager_exercise_gym_equipment', 'gymequipment_id'),
+]
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY не выполняется внутри транзакции
+    atomic = False
+
+    dependencies = [
+        ('workout_manager', '0011_exercise_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({column}, exercise_id);',
+            f'DROP INDEX CONCURRENTLY IF EXISTS {name};',
+        )
+        for name, table, column in INDEXES
+    ]
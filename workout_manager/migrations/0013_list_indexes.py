@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:08
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся без блокировки записи в таблицы
+    atomic = False
+
+    dependencies = [
+        ('workout_manager', '0012_exercise_relation_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='exercise',
+            index=models.Index(condition=models.Q(('is_archived', False), ('original__isnull', True)), fields=['created_by', '-changed_at', '-id'], name='exercise_personal_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='exercise',
+            index=models.Index(condition=models.Q(('is_archived', True)), fields=['created_by', '-changed_at', '-id'], name='exercise_archived_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='exercise',
+            index=models.Index(condition=models.Q(('original__isnull', False)), fields=['created_by', 'is_archived'], name='exercise_copies_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='exercise',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-changed_at', '-id'], name='exercise_public_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='exercise',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['created_by', '-changed_at', '-id'], name='exercise_published_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='weeklyfitnessplan',
+            index=models.Index(condition=models.Q(('is_archived', False), ('original__isnull', True)), fields=['created_by', '-changed_at', '-id'], name='plan_personal_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='weeklyfitnessplan',
+            index=models.Index(condition=models.Q(('is_archived', True)), fields=['created_by', '-changed_at', '-id'], name='plan_archived_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='weeklyfitnessplan',
+            index=models.Index(condition=models.Q(('original__isnull', False)), fields=['created_by', 'is_archived'], name='plan_copies_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='weeklyfitnessplan',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-changed_at', '-id'], name='plan_public_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='weeklyfitnessplan',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['-changed_at', '-id'], name='plan_published_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='workout',
+            index=models.Index(condition=models.Q(('is_archived', False), ('original__isnull', True)), fields=['created_by', '-changed_at', '-id'], name='workout_personal_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='workout',
+            index=models.Index(condition=models.Q(('is_archived', True)), fields=['created_by', '-changed_at', '-id'], name='workout_archived_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='workout',
+            index=models.Index(condition=models.Q(('original__isnull', False)), fields=['created_by', 'is_archived'], name='workout_copies_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='workout',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-changed_at', '-id'], name='workout_public_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='workout',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['-changed_at', '-id'], name='workout_published_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:17
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_library_counters(apps, schema_editor):
+    """Counts the rows users created before the counters existed."""
+    UserWorkoutManagerLimitation = apps.get_model('workout_manager', 'UserWorkoutManagerLimitation')
+
+    UserWorkoutManagerLimitation.objects.update(**{
+        count_field: Coalesce(
+            Subquery(
+                apps.get_model('workout_manager', model_name).objects.filter(
+                    created_by=OuterRef('user_id')
+                ).order_by().values('created_by').annotate(count=Count('id')).values('count')
+            ),
+            0,
+        )
+        for model_name, count_field in [
+            ('Exercise', 'exercise_count'),
+            ('Workout', 'workout_count'),
+            ('WeeklyFitnessPlan', 'plans_count'),
+        ]
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workout_manager', '0013_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userworkoutmanagerlimitation',
+            name='exercise_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userworkoutmanagerlimitation',
+            name='plans_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userworkoutmanagerlimitation',
+            name='workout_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_library_counters, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
 from users.models import CustomUser
 from django.core.validators import MaxValueValidator, MinValueValidator
 from users.validators import validate_image
@@ -7,9 +9,54 @@ from workout_manager.validators import (
     validate_instructions,
 )
 from TrackHub.trackhub_bucket import TrackHubMediaStorage
+from TrackHub.field_tracker import FieldTrackerMixin
 from django.core.exceptions import ValidationError
-from users.Services.delete_instances_from_s3 import delete_instance_from_s3
-from workout_manager.Services import created_at_service
+from users.Services import media_store
+from users.fields import ContentAddressedFileField, ContentAddressedImageField
+from workout_manager.Services import created_at_service, rendition_service
+from TrackHub.background_tasks import submit_on_commit
+
+
+LIST_ORDERING = ['-changed_at', '-id']
+
+
+def get_list_indexes(prefix, published_by_author=False):
+    """
+    Partial indexes for the list views of exercises, workouts and plans.
+    Sorted like the cursor pagination, so a page is read straight from the index.
+    """
+    published_fields = ['created_by', *LIST_ORDERING] if published_by_author else LIST_ORDERING
+
+    return [
+        # личные
+        models.Index(
+            fields=['created_by', *LIST_ORDERING],
+            condition=models.Q(is_archived=False, original__isnull=True),
+            name=f'{prefix}_personal_idx',
+        ),
+        # архив
+        models.Index(
+            fields=['created_by', *LIST_ORDERING],
+            condition=models.Q(is_archived=True),
+            name=f'{prefix}_archived_idx',
+        ),
+        # копии подписок
+        models.Index(
+            fields=['created_by', 'is_archived'],
+            condition=models.Q(original__isnull=False),
+            name=f'{prefix}_copies_idx',
+        ),
+        models.Index(
+            fields=LIST_ORDERING,
+            condition=models.Q(is_public=True),
+            name=f'{prefix}_public_idx',
+        ),
+        models.Index(
+            fields=published_fields,
+            condition=models.Q(is_published=True),
+            name=f'{prefix}_published_idx',
+        ),
+    ]
 
 
 class UserWorkoutManagerLimitation(models.Model):
@@ -19,19 +66,37 @@ class UserWorkoutManagerLimitation(models.Model):
     exercise_limitation=models.PositiveIntegerField(default=100)
     plans_limitation=models.PositiveIntegerField(default=25)
 
+    # Поддерживаются limitation_service, чтобы не считать строки на каждое создание
+    workout_count = models.PositiveIntegerField(default=0)
+    exercise_count = models.PositiveIntegerField(default=0)
+    plans_count = models.PositiveIntegerField(default=0)
+
 
-class GymEquipment(models.Model):
+class GymEquipment(FieldTrackerMixin, models.Model):
     name = models.CharField(max_length=100)
-    image = models.ImageField(
+    image = ContentAddressedImageField(
         validators=[
             validate_image
         ],
         storage=TrackHubMediaStorage(),
         upload_to="gym_equipment/",
     )
+    image_renditions = models.JSONField(default=dict, blank=True)
+
+    @transaction.atomic
+    def save(self, *args, **kwargs):
+        changed_files = media_store.get_changed_files(self, ['image'])
+        if 'image' in changed_files:
+            self.image_renditions = {}
+
+        super().save(*args, **kwargs)
+        media_store.move_references(self, changed_files)
 
+        if 'image' in changed_files and self.image:
+            submit_on_commit(rendition_service.generate_gym_equipment_image_renditions, self.id)
 
-class Exercise(models.Model):
+
+class Exercise(FieldTrackerMixin, models.Model):
     name = models.CharField(max_length=100)
     description = models.CharField(max_length=500, blank=True, null=True)
     instructions = models.JSONField(default=list, validators=[validate_instructions])
@@ -44,7 +109,7 @@ class Exercise(models.Model):
         GymEquipment,
         related_name='exercises',
     )
-    preview = models.ImageField(
+    preview = ContentAddressedImageField(
         validators=[
             validate_image
         ],
@@ -53,7 +118,9 @@ class Exercise(models.Model):
         null=True,
         blank=True,
     )
-    video = models.FileField(
+    # Уменьшенные копии превью: {размер: {формат: имя файла}}
+    preview_renditions = models.JSONField(default=dict, blank=True)
+    video = ContentAddressedFileField(
         upload_to='exercises/videos/',
         validators=[
             validate_video_size,
@@ -86,73 +153,44 @@ class Exercise(models.Model):
 
     changed_at = models.DateTimeField(auto_now_add=True)
 
+    # Заполняется триггером в базе по name, description и instructions
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         unique_together = ("name", "description", "preview", "video", "created_by", "original")
+        indexes = [
+            GinIndex(fields=['search_vector'], name='exercise_search_vector_idx'),
+            *get_list_indexes('exercise', published_by_author=True),
+        ]
 
     def __str__(self):
         return self.name
 
+    @transaction.atomic
     def save(self, *args, **kwargs):
+        """Moves media references, old files are deleted once no exercise uses them."""
+        changed_files = media_store.get_changed_files(self, ['preview', 'video'])
+        if 'preview' in changed_files:
+            self.preview_renditions = {}
+
         if self.pk:
-            old_instance = Exercise.objects.filter(pk=self.pk).first()
-
-            if old_instance:
-                if old_instance.preview != self.preview:
-                    preview_used_elsewhere = Exercise.objects.filter(preview=old_instance.preview).exclude(pk=self.pk).exists()
-                    
-                    if not preview_used_elsewhere and old_instance.preview:
-                        delete_instance_from_s3(old_instance.preview)
-                
-                if old_instance.video != self.video:
-                    video_used_elsewhere = Exercise.objects.filter(video=old_instance.video).exclude(pk=self.pk).exists()
-                    
-                    if not video_used_elsewhere and old_instance.video:
-                        delete_instance_from_s3(old_instance.video)
-            
-            created_at_service.update_changed_at(self, old_instance)
+            created_at_service.update_changed_at(self)
     
         super().save(*args, **kwargs)
-        
-    def delete(self, *args, **kwargs):
-        """Check if the preview is used elsewhere before deleting it when deleting this record."""
-
-        if self.preview != self.preview:
-            preview_used_elsewhere = Exercise.objects.filter(preview=self.preview).exclude(pk=self.pk).exists()
-            
-            if not preview_used_elsewhere and self.preview:
-                delete_instance_from_s3(self.preview)
-        
-        if self.video != self.video:
-            video_used_elsewhere = Exercise.objects.filter(video=self.video).exclude(pk=self.pk).exists()
-            
-            if not video_used_elsewhere and self.video:
-                delete_instance_from_s3(self.video)
+        media_store.move_references(self, changed_files)
 
-        return super().delete(*args, **kwargs)
+        if 'preview' in changed_files and self.preview:
+            submit_on_commit(rendition_service.generate_exercise_preview_renditions, self.id)
 
 
     def clone_for_user(self, user):
         """Создаёт копию упражнения для нового пользователя"""
-        cloned_exercise = Exercise.objects.create(
-            name=self.name,
-            description=self.description,
-            instructions=self.instructions,
-            category=self.category,
-            gym_equipment=self.gym_equipment,
-            preview=self.preview,
-            video=self.video,
+        from workout_manager.Services import clone_service
 
-            is_measured_in_reps=self.is_measured_in_reps,
+        return clone_service.clone_exercise(self, user)
 
-            original=self,
-            created_by=user,
-        )
 
-        return cloned_exercise
-        
-
-
-class Workout(models.Model):
+class Workout(FieldTrackerMixin, models.Model):
     name = models.CharField(max_length=100)
     description = models.CharField(max_length=500, blank=True, null=True)
     exercises = models.ManyToManyField(Exercise, through='WorkoutExercise')
@@ -178,6 +216,9 @@ class Workout(models.Model):
 
     changed_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = get_list_indexes('workout')
+
 
     def __str__(self):
 
@@ -192,45 +233,16 @@ class Workout(models.Model):
     def save(self, *args, **kwargs):
 
         if self.pk:
-            old_instance = Exercise.objects.filter(pk=self.pk).first()
-
-            created_at_service.update_changed_at(self, old_instance)
+            created_at_service.update_changed_at(self)
 
         super().save(*args, **kwargs)
 
     
     def clone_for_user(self, user):
         """Создаёт копию тренировки для нового пользователя"""
+        from workout_manager.Services import clone_service
 
-        cloned_workout = Workout.objects.create(
-            name = self.name,
-            description = self.description,
-
-            original = self,
-            created_by=user
-        )
-
-        original_workout_exercises = WorkoutExercise.objects.filter(workout=self).select_related('exercise')
-
-        workout_exercises = []
-
-        for original_we in original_workout_exercises:
-            cloned_exercise = original_we.exercise.clone_for_user(user)
-
-            workout_exercises.append(
-                WorkoutExercise(
-                    workout=cloned_workout,
-                    exercise=cloned_exercise,
-                    sets=original_we.sets,
-                    value=original_we.value,
-                    rest_time_after_set=original_we.rest_time_after_set,
-                )
-            )
-
-        # Bulk create all WorkoutExercise instances
-        WorkoutExercise.objects.bulk_create(workout_exercises)
-
-        return cloned_workout
+        return clone_service.clone_workout(self, user)
     
 
     def __str__(self):
@@ -316,7 +328,7 @@ class WeeklyFitnessPlanWorkout(models.Model):
         return f"{self.weekly_fitness_plan.name}"
 
 
-class WeeklyFitnessPlan(models.Model):
+class WeeklyFitnessPlan(FieldTrackerMixin, models.Model):
     name = models.CharField(max_length=100)
     description = models.CharField(max_length=500, blank=True, null=True)
     workouts = models.ManyToManyField(Workout, through=WeeklyFitnessPlanWorkout)
@@ -342,45 +354,69 @@ class WeeklyFitnessPlan(models.Model):
 
     changed_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = get_list_indexes('plan')
+
 
     def save(self, *args, **kwargs):
 
         if self.pk:
-            old_instance = WeeklyFitnessPlan.objects.filter(pk=self.pk).first()
-
-            created_at_service.update_changed_at(self, old_instance)
+            created_at_service.update_changed_at(self)
 
         super().save(*args, **kwargs)
 
 
     def clone_for_user(self, user):
-        """Создаёт копию тренировки для нового пользователя"""
+        """Создаёт копию недельного плана для нового пользователя"""
+        from workout_manager.Services import clone_service
+
+        return clone_service.clone_plan(self, user)
+
+
+class WorkoutSubscription(models.Model):
+    """Подписка на опубликованную тренировку без физического копирования"""
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="workout_subscriptions")
+    workout = models.ForeignKey(Workout, on_delete=models.CASCADE, related_name="subscriptions")
+
+    is_archived = models.BooleanField(default=False)
+
+    subscribed_at = models.DateTimeField(auto_now_add=True)
 
-        cloned_plan = WeeklyFitnessPlan.objects.create(
-            name = self.name,
-            description = self.description,
+    class Meta:
+        unique_together = ("user", "workout")
+
+    def __str__(self):
+        return f"{self.user} -> {self.workout}"
 
-            original = self,
-            created_by=user
-        )
 
-        original_plan_workouts = WeeklyFitnessPlanWorkout.objects.filter(weekly_fitness_plan=self).select_related('workout')
+class WeeklyFitnessPlanSubscription(models.Model):
+    """Подписка на опубликованный недельный план без физического копирования"""
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="weekly_fitness_plan_subscriptions")
+    weekly_fitness_plan = models.ForeignKey(WeeklyFitnessPlan, on_delete=models.CASCADE, related_name="subscriptions")
 
-        plan_workouts = []
+    is_archived = models.BooleanField(default=False)
 
-        for original_pw in original_plan_workouts:
-            cloned_workout = original_pw.workout.clone_for_user(user)
+    subscribed_at = models.DateTimeField(auto_now_add=True)
 
-            plan_workouts.append(
-                WeeklyFitnessPlanWorkout(
-                    weekly_fitness_plan=cloned_plan,
-                    wokrout=cloned_workout,
-                    week_day=original_pw.week_day,
-                )
-            )
+    class Meta:
+        unique_together = ("user", "weekly_fitness_plan")
 
-        # Bulk create all WorkoutExercise instances
-        WeeklyFitnessPlanWorkout.objects.bulk_create(plan_workouts)
+    def __str__(self):
+        return f"{self.user} -> {self.weekly_fitness_plan}"
 
-        return cloned_plan
 
+class VideoUploadSession(models.Model):
+    """Загрузка видео упражнения напрямую в хранилище по частям (S3 multipart upload)"""
+    exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE, related_name="video_upload_sessions")
+    created_by = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="video_upload_sessions")
+
+    upload_id = models.CharField(max_length=1024)
+    name = models.CharField(max_length=255)
+
+    file_size = models.PositiveBigIntegerField()
+    part_size = models.PositiveIntegerField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.exercise} <- {self.name}"
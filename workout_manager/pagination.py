@@ -0,0 +1,82 @@
+from django.conf import settings
+from rest_framework import status
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from TrackHub import cache
+
+
+class ChangedAtCursorPagination(CursorPagination):
+    """
+    Cursor pagination ordered by (changed_at, id).
+
+    DRF keeps only changed_at in the cursor and filters on it
+    (changed_at < position), so pages are found through the index instead of
+    an OFFSET over the whole list. Rows that share the same changed_at are
+    stepped over with an offset inside the cursor; id only makes their order
+    stable. The cursor is opaque for clients: it is taken from the
+    `next`/`previous` links of the previous page.
+    """
+    cursor_query_param = 'cursor'
+    page_size = settings.WORKOUT_MANAGER_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.WORKOUT_MANAGER_MAX_PAGE_SIZE
+    ordering = ('-changed_at', '-id')
+
+
+class RankPageNumberPagination(PageNumberPagination):
+    """
+    Page number pagination for ranked results (search), where there is
+    no stable (changed_at, id) key to build a cursor from.
+    """
+    page_size = settings.WORKOUT_MANAGER_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.WORKOUT_MANAGER_MAX_PAGE_SIZE
+
+
+def is_pagination_requested(request):
+    """Pagination is enabled when the client passes a cursor or a page size."""
+    query_params = request.query_params
+    return (
+        ChangedAtCursorPagination.cursor_query_param in query_params or
+        ChangedAtCursorPagination.page_size_query_param in query_params
+    )
+
+
+def get_list_response(request, view, queryset, serializer_class, facets=None):
+    """
+    Serializes a list endpoint.
+
+    Without pagination parameters the whole queryset is returned as a plain
+    list, so existing clients keep working. Facet counts, when given, turn
+    the plain list into {"results": [...], "facets": {...}}.
+    """
+    if not is_pagination_requested(request):
+        data = serializer_class(queryset, many=True).data
+        if facets is not None:
+            data = {'results': data, 'facets': facets}
+        return Response(data, status=status.HTTP_200_OK)
+
+    paginator = ChangedAtCursorPagination()
+    page = paginator.paginate_queryset(queryset, request, view=view)
+    data = serializer_class(page, many=True).data
+
+    response = paginator.get_paginated_response(data)
+    if facets is not None:
+        response.data['facets'] = facets
+    return response
+
+
+def get_cached_list_response(request, view, queryset, serializer_class, namespace):
+    """
+    Same as get_list_response for lists that do not depend on the requesting user.
+
+    The data is cached per URL for CACHE_LIST_TIMEOUT seconds or until
+    the namespace is invalidated by a write.
+    """
+    data = cache.get_or_set(
+        namespace,
+        [cache.hash_part(request.build_absolute_uri())],
+        lambda: get_list_response(request, view, queryset, serializer_class).data,
+        settings.CACHE_LIST_TIMEOUT,
+    )
+    return Response(data, status=status.HTTP_200_OK)
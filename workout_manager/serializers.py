@@ -1,3 +1,4 @@
+from django.db import models, transaction
 from rest_framework import serializers
 from workout_manager.models import (
     ExerciseCategory,
@@ -7,19 +8,50 @@ from workout_manager.models import (
     GymEquipment,
     WeeklyFitnessPlan,
     WeeklyFitnessPlanWorkout,
+    VideoUploadSession,
 )
 from users.models import CustomUser
 from users.serializers import CustomUserPreviewSerializer
+from users.Services.image_handler import get_rendition_urls
 from rest_framework.exceptions import ValidationError
 from workout_manager.validators import validate_instructions
+from workout_manager.Services import (
+    duplicate_service,
+    limitation_service,
+    representation_service,
+    subscription_service,
+    video_upload_service,
+)
+
+
+def check_library_limit(user, model, name):
+    """Must be called in the transaction that creates the row, see limitation_service.lock_counter."""
+    count, user_limit = limitation_service.lock_counter(user, model)
+    if count >= user_limit:
+        raise ValidationError({
+            "non_field_errors": [f"You can create a maximum of {user_limit} {name}."]
+        })
+
+
+class CachedRepresentationListSerializer(serializers.ListSerializer):
+    """Serializes only the items missing from the representation cache."""
+
+    def to_representation(self, data):
+        items = data.all() if isinstance(data, models.manager.BaseManager) else data
+        return representation_service.get_representations(list(items), self.child)
 
 
 class GymEquipmentSerializer(serializers.ModelSerializer):
+    image_renditions = serializers.SerializerMethodField()
+
     class Meta:
         model = GymEquipment
         fields = '__all__'
         read_only_fields = [GymEquipment._meta.get_field('id').name]
 
+    def get_image_renditions(self, instance):
+        return get_rendition_urls(instance.image_renditions, instance.image.storage)
+
 
 class ExerciseCategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -56,9 +88,11 @@ class ExerciseSerializer(serializers.ModelSerializer):
         validators=[validate_instructions],
         required=True
     )
+    preview_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Exercise
+        list_serializer_class = CachedRepresentationListSerializer
         fields = [
             Exercise._meta.get_field('id').name,
             Exercise._meta.get_field('name').name,
@@ -75,6 +109,7 @@ class ExerciseSerializer(serializers.ModelSerializer):
             'gym_equipment',
             'category',
             'created_by',
+            'preview_renditions',
         ]
         read_only_fields = [
             Exercise._meta.get_field('id').name,
@@ -92,53 +127,51 @@ class ExerciseSerializer(serializers.ModelSerializer):
         data['gym_equipment'] = GymEquipmentSerializer(instance.gym_equipment, many=True).data
         data['category'] = ExerciseCategorySerializer(instance.category, many=True).data
         data['created_by'] = CustomUserPreviewSerializer(instance.created_by).data
-        data['original'] = instance.original.id if instance.original else ""
+        data['original'] = instance.original_id if instance.original_id else ""
+        # Предупреждение только в ответе на создание, в кэш представлений не попадает
+        if hasattr(self, 'similar_exercises'):
+            data['similar_exercises'] = self.similar_exercises
         return data
+
+    def get_preview_renditions(self, instance):
+        return get_rendition_urls(instance.preview_renditions, instance.preview.storage)
     
     def validate(self, data):
         """Custom validation for unique_together constraint."""
         user = self.context['request'].user
 
-        if not self.instance:
-            # Get user-specific limit from UserProfile
-            user_limit = user.workout_manager_limitation.exercise_limitation
-
-            # Check if user exceeded the limit
-            exercise_count = Exercise.objects.filter(created_by=user).count()
-            if exercise_count >= user_limit:
-                raise ValidationError({
-                    "non_field_errors": [f"You can create a maximum of {user_limit} exercises."]
-                })
-
-
         # Check if an identical Exercise already exists
-
-        if Exercise.objects.filter(id=data.get("original")).exists():
-            original = Exercise.objects.get(id=data.get("original"))
-
+        if not self.instance:
             existing_exercise = Exercise.objects.filter(
                 name=data.get("name"),
                 description=data.get("description"),
-                preview=data.get("preview"),
-                video=data.get("video"),
+                # Пустые файловые поля хранятся как ''
+                preview=data.get("preview") or "",
+                video=data.get("video") or "",
                 created_by=user,
-                original=original,
+                original=data.get("original"),
             ).exists()
 
             if existing_exercise:
                 raise serializers.ValidationError({
                     "non_field_errors": ["An exercise with these exact details already exists."]
                 })
+
+        # Likely duplicates are returned with the created exercise, they don't block the create
+        if not self.instance:
+            self.similar_exercises = duplicate_service.find_similar_exercises(user, data.get('name'))
         
         if self.instance and self.instance.is_published:
             # Check if there are any subscribers to the exercise
-            if Exercise.objects.filter(original=self.instance).exists():
+            if subscription_service.exercise_has_subscribers(self.instance):
                 raise serializers.ValidationError("Cannot update a published exercise with subscribers.")
 
         return data
     
+    @transaction.atomic
     def create(self, validated_data):
         validated_data['created_by'] = self.context['request'].user
+        check_library_limit(validated_data['created_by'], Exercise, 'exercises')
         return super().create(validated_data)
     
     def update(self, instance, validated_data):
@@ -211,6 +244,7 @@ class WorkoutSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Workout
+        list_serializer_class = CachedRepresentationListSerializer
         fields = [
             Workout._meta.get_field('id').name,
             Workout._meta.get_field('name').name,
@@ -238,28 +272,17 @@ class WorkoutSerializer(serializers.ModelSerializer):
 
     def validate(self, attrs):
 
-        user = self.context['request'].user
-
-        if not self.instance:
-            # Get user-specific limit from UserProfile
-            user_limit = user.workout_manager_limitation.workout_limitation
-
-            # Check if user exceeded the limit
-            workout_count = Workout.objects.filter(created_by=user).count()
-            if workout_count >= user_limit:
-                raise ValidationError({
-                    "non_field_errors": [f"You can create a maximum of {user_limit} workouts."]
-                })
-
         if self.instance and self.instance.is_published:
             # Check if there are any subscribers to the exercise
-            if Workout.objects.filter(original=self.instance).exists():
+            if subscription_service.workout_has_subscribers(self.instance):
                 raise serializers.ValidationError("Cannot update a published workout with subscribers.")
             
         return super().validate(attrs)
 
+    @transaction.atomic
     def create(self, validated_data):
         workout_exercises_data = validated_data.pop('workout_exercises', [])
+        check_library_limit(self.context['request'].user, Workout, 'workouts')
 
         # Создаем Workout
         workout = Workout.objects.create(**validated_data)
@@ -299,10 +322,10 @@ class WorkoutSerializer(serializers.ModelSerializer):
         return instance
     
     def to_representation(self, instance):
+        # workout_exercises are already serialized by the nested field
         data = super().to_representation(instance)
-        data['workout_exercises'] = WorkoutExerciseSerializer(instance.workout_exercises, many=True).data
         data['created_by'] = CustomUserPreviewSerializer(instance.created_by).data
-        data['original'] = instance.original.id if instance.original else ""
+        data['original'] = instance.original_id if instance.original_id else ""
         return data
     
 
@@ -328,6 +351,11 @@ class WeeklyFitnessPlanWorkoutSerializer(serializers.ModelSerializer):
         read_only_fields = [
             WeeklyFitnessPlanWorkout._meta.get_field('id').name,
         ]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['workout'] = WorkoutSerializer(instance.workout).data
+        return data
     
 
 class WeeklyFitnessPlanSerializer(serializers.ModelSerializer):
@@ -345,6 +373,7 @@ class WeeklyFitnessPlanSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = WeeklyFitnessPlan
+        list_serializer_class = CachedRepresentationListSerializer
         fields = [
             WeeklyFitnessPlan._meta.get_field('id').name,
             WeeklyFitnessPlan._meta.get_field('name').name,
@@ -372,38 +401,27 @@ class WeeklyFitnessPlanSerializer(serializers.ModelSerializer):
 
 
     def to_representation(self, instance):
+        # weekly_fitness_plan_workouts are already serialized by the nested field
         data = super().to_representation(instance)
-        data['weekly_fitness_plan_workouts'] = WeeklyFitnessPlanWorkoutSerializer(instance.weekly_fitness_plan_workouts, many=True).data
         data['created_by'] = CustomUserPreviewSerializer(instance.created_by).data
-        data['original'] = instance.original.id if instance.original else ""
+        data['original'] = instance.original_id if instance.original_id else ""
         return data
     
 
     def validate(self, attrs):
 
-        user = self.context['request'].user
-
-        if not self.instance:
-            # Get user-specific limit from UserProfile
-            user_limit = user.workout_manager_limitation.plans_limitation
-
-            # Check if user exceeded the limit
-            plans_count = WeeklyFitnessPlan.objects.filter(created_by=user).count()
-            if plans_count >= user_limit:
-                raise ValidationError({
-                    "non_field_errors": [f"You can create a maximum of {user_limit} plans."]
-                })
-
         if self.instance and self.instance.is_published:
             # Check if there are any subscribers to the exercise
-            if WeeklyFitnessPlan.objects.filter(original=self.instance).exists():
+            if subscription_service.plan_has_subscribers(self.instance):
                 raise serializers.ValidationError("Cannot update a published weekly plan with subscribers.")
             
         return super().validate(attrs)
 
 
+    @transaction.atomic
     def create(self, validated_data):
         plan_workouts_data = validated_data.pop('weekly_fitness_plan_workouts', [])
+        check_library_limit(self.context['request'].user, WeeklyFitnessPlan, 'plans')
 
         plan = WeeklyFitnessPlan.objects.create(**validated_data)
 
@@ -452,4 +470,44 @@ class WeeklyFitnessPlanSerializer(serializers.ModelSerializer):
                     **pw_data
                 )
 
-        return instance
\ No newline at end of file
+        return instance
+
+
+class VideoUploadSessionSerializer(serializers.ModelSerializer):
+    file_name = serializers.CharField(write_only=True, max_length=255)
+    parts = serializers.SerializerMethodField()
+
+    class Meta:
+        model = VideoUploadSession
+        fields = [
+            VideoUploadSession._meta.get_field('id').name,
+            VideoUploadSession._meta.get_field('exercise').name,
+            VideoUploadSession._meta.get_field('file_size').name,
+            VideoUploadSession._meta.get_field('part_size').name,
+            'file_name',
+            'parts',
+        ]
+        read_only_fields = [
+            VideoUploadSession._meta.get_field('id').name,
+            VideoUploadSession._meta.get_field('exercise').name,
+            VideoUploadSession._meta.get_field('part_size').name,
+        ]
+
+    def get_parts(self, instance):
+        return video_upload_service.get_part_urls(instance)
+
+    def validate_file_size(self, value):
+        if value > video_upload_service.get_max_video_size():
+            raise ValidationError(
+                f"Файл слишком большой! Максимальный размер: {video_upload_service.get_max_video_size() // video_upload_service.MB}MB."
+            )
+        return value
+
+
+class VideoUploadPartSerializer(serializers.Serializer):
+    part_number = serializers.IntegerField(min_value=1, max_value=video_upload_service.MAX_PARTS_COUNT)
+    etag = serializers.CharField(max_length=255)
+
+
+class VideoUploadCompleteSerializer(serializers.Serializer):
+    parts = VideoUploadPartSerializer(many=True, allow_empty=False)
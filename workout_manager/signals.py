@@ -1,7 +1,28 @@
-from django.db.models.signals import post_migrate
+from django.db.models.signals import m2m_changed, post_migrate, post_save, post_delete, pre_save
 from workout_manager.apps import WorkoutManagerConfig
-from workout_manager.models import ExerciseCategory, GymEquipment
+from workout_manager.models import (
+    ExerciseCategory,
+    GymEquipment,
+    Exercise,
+    Workout,
+    WorkoutExercise,
+    WeeklyFitnessPlan,
+    WeeklyFitnessPlanWorkout,
+)
+from workout_manager.Services import (
+    cache_service,
+    duplicate_service,
+    limitation_service,
+    originality_service,
+    reference_data_service,
+)
+from users.models import CustomUser
+from users.Services import media_store
 from django.dispatch import receiver
+from django.db import transaction
+
+
+AUTHOR_PREVIEW_FIELDS = ['first_name', 'last_name', 'avatar']
 
 
 @receiver(post_migrate)
@@ -58,3 +79,141 @@ def create_gym_equipment(sender, **kwargs):
         for equipment in gym_equipment:
             image_path = '/gym_equipment/' + equipment[1]
             gq, create = GymEquipment.objects.get_or_create(name=equipment[0], image=image_path)
+
+
+@receiver([post_save, post_delete], sender=WorkoutExercise)
+def invalidate_workout_exercise_originality(sender, instance, **kwargs):
+    if instance.workout_id:
+        originality_service.invalidate_workouts([instance.workout_id])
+
+
+@receiver([post_save, post_delete], sender=WeeklyFitnessPlanWorkout)
+def invalidate_plan_workout_originality(sender, instance, **kwargs):
+    originality_service.invalidate_plans([instance.weekly_fitness_plan_id])
+
+
+@receiver(post_save, sender=Exercise)
+def invalidate_exercise_originality(sender, instance, created, **kwargs):
+    # Новое упражнение ещё не входит ни в одну тренировку
+    if not created:
+        workout_ids = WorkoutExercise.objects.filter(
+            exercise=instance
+        ).values_list('workout_id', flat=True)
+        originality_service.invalidate_workouts(workout_ids)
+
+
+@receiver(post_save, sender=Workout)
+def invalidate_workout_originality(sender, instance, created, **kwargs):
+    if not created:
+        originality_service.invalidate_workouts([instance.id])
+
+
+@receiver(post_save, sender=WeeklyFitnessPlan)
+def invalidate_plan_originality(sender, instance, created, **kwargs):
+    if not created:
+        originality_service.invalidate_plans([instance.id])
+
+
+@receiver(post_delete, sender=Exercise)
+def release_exercise_media(sender, instance, **kwargs):
+    media_store.release([instance.preview.name, instance.video.name])
+
+
+@receiver(post_delete, sender=GymEquipment)
+def release_gym_equipment_media(sender, instance, **kwargs):
+    media_store.release([instance.image.name])
+
+
+@receiver([post_save, post_delete], sender=GymEquipment)
+@receiver([post_save, post_delete], sender=ExerciseCategory)
+def invalidate_reference_data(sender, **kwargs):
+    # Новая версия после коммита, чтобы в кэш не попали откатанные данные
+    transaction.on_commit(reference_data_service.invalidate)
+
+
+@receiver(post_save, sender=Exercise)
+def invalidate_exercise_representations(sender, instance, created, **kwargs):
+    # Представления тренировок и планов содержат упражнение целиком
+    if not created:
+        cache_service.invalidate_exercise_tree(instance)
+
+
+@receiver(post_save, sender=Workout)
+def invalidate_workout_representations(sender, instance, created, **kwargs):
+    if not created:
+        cache_service.invalidate_workout_tree(instance)
+
+
+@receiver(m2m_changed, sender=Exercise.category.through)
+@receiver(m2m_changed, sender=Exercise.gym_equipment.through)
+def invalidate_exercise_relations(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ['post_add', 'post_remove', 'post_clear']:
+        return
+
+    if not reverse:
+        cache_service.invalidate_exercise_tree(instance)
+    elif pk_set:
+        cache_service.invalidate_exercise_trees(pk_set)
+
+
+@receiver([post_save, post_delete], sender=WorkoutExercise)
+def invalidate_workout_exercise_workout(sender, instance, **kwargs):
+    if instance.workout_id:
+        cache_service.invalidate_workout_trees([instance.workout_id])
+
+
+@receiver([post_save, post_delete], sender=WeeklyFitnessPlanWorkout)
+def invalidate_plan_workout_plan(sender, instance, **kwargs):
+    cache_service.invalidate_plan_trees([instance.weekly_fitness_plan_id])
+
+
+@receiver(pre_save, sender=CustomUser)
+def invalidate_author_content(sender, instance, **kwargs):
+    # Превью автора входит в представления его упражнений, тренировок и планов
+    if instance.pk and any(instance.has_changed(field_name) for field_name in AUTHOR_PREVIEW_FIELDS):
+        cache_service.invalidate_author_content(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Exercise)
+def invalidate_exercise_lists(sender, **kwargs):
+    cache_service.invalidate_exercises()
+
+
+@receiver([post_save, post_delete], sender=Exercise)
+def invalidate_exercise_name_index(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'name' in update_fields:
+        duplicate_service.invalidate_name_index(instance.created_by_id)
+
+
+@receiver([post_save, post_delete], sender=Workout)
+@receiver([post_save, post_delete], sender=WorkoutExercise)
+def invalidate_workout_lists(sender, **kwargs):
+    cache_service.invalidate_workouts()
+
+
+@receiver([post_save, post_delete], sender=WeeklyFitnessPlan)
+@receiver([post_save, post_delete], sender=WeeklyFitnessPlanWorkout)
+def invalidate_plan_lists(sender, **kwargs):
+    cache_service.invalidate_plans()
+
+
+@receiver([post_save, post_delete], sender=GymEquipment)
+@receiver([post_save, post_delete], sender=ExerciseCategory)
+def invalidate_representations(sender, **kwargs):
+    # Тренажёры и категории общие для всех упражнений, changed_at упражнений не меняется
+    cache_service.invalidate_representations()
+
+
+@receiver(post_save, sender=Exercise)
+@receiver(post_save, sender=Workout)
+@receiver(post_save, sender=WeeklyFitnessPlan)
+def increment_library_counter(sender, instance, created, **kwargs):
+    if created:
+        limitation_service.increment(instance.created_by_id, sender)
+
+
+@receiver(post_delete, sender=Exercise)
+@receiver(post_delete, sender=Workout)
+@receiver(post_delete, sender=WeeklyFitnessPlan)
+def decrement_library_counter(sender, instance, **kwargs):
+    limitation_service.decrement(instance.created_by_id, sender)
@@ -1,17 +1,43 @@
+import boto3
+import hashlib
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+from PIL import Image
+from botocore.exceptions import ClientError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from moto import mock_aws
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.db import connection
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from workout_manager.models import (
     Exercise,
     ExerciseCategory,
+    GymEquipment,
     Workout,
     WorkoutExercise,
+    WeeklyFitnessPlan,
+    WeeklyFitnessPlanWorkout,
+    WeeklyFitnessPlanSubscription,
+    WorkoutSubscription,
+    VideoUploadSession,
+    UserWorkoutManagerLimitation,
 )
+from workout_manager.management.benchmark import BENCHMARK_EMAIL_DOMAIN
 from workout_manager.serializers import (
     ExerciseSerializer,
 )
-from users.models import CustomUser
+from workout_manager.Services import duplicate_service, originality_service, published_service, representation_service
+from users.models import CustomUser, StoredMedia
+from users.Services import media_store
+from django.conf import settings
+from django.core.cache import cache
 
 
 class ExerciseViewTests(APITestCase):
@@ -356,6 +382,514 @@ class ExerciseViewTests(APITestCase):
         )
 
 
+class ExerciseCursorPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='paginator@example.com',
+            password='Securepassword123',
+            first_name='Paginator',
+        )
+        self.exercise_url = reverse('exercises')
+        for index in range(5):
+            Exercise.objects.create(
+                name=f'public{index}',
+                is_public=True,
+                created_by=self.user,
+            )
+
+    def test_get_without_pagination_returns_list(self):
+        response = self.client.get(self.exercise_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 5)
+
+    def test_get_pages_follow_next_cursor(self):
+        response = self.client.get(self.exercise_url, {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+        seen_ids = [exercise['id'] for exercise in response.data['results']]
+        next_url = response.data['next']
+        while next_url:
+            response = self.client.get(next_url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen_ids += [exercise['id'] for exercise in response.data['results']]
+            next_url = response.data['next']
+
+        self.assertEqual(len(seen_ids), 5)
+        self.assertEqual(len(set(seen_ids)), 5)
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(self.exercise_url, {'page_size': 10000})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
+
+
+class ExerciseListQueryCountTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='querycount@example.com',
+            password='Securepassword123',
+            first_name='Querycount',
+        )
+        self.exercise_url = reverse('exercises')
+        self.categories = list(ExerciseCategory.objects.all()[:2])
+        self.gym_equipment = list(GymEquipment.objects.all()[:2])
+
+    def create_public_exercises(self, count):
+        exercises = Exercise.objects.bulk_create([
+            Exercise(name=f'exercise{index}', is_public=True, created_by=self.user)
+            for index in range(count)
+        ])
+        Exercise.category.through.objects.bulk_create([
+            Exercise.category.through(exercise=exercise, exercisecategory=category)
+            for exercise in exercises
+            for category in self.categories
+        ])
+        Exercise.gym_equipment.through.objects.bulk_create([
+            Exercise.gym_equipment.through(exercise=exercise, gymequipment=equipment)
+            for exercise in exercises
+            for equipment in self.gym_equipment
+        ])
+
+    def test_query_count_does_not_depend_on_exercise_count(self):
+        for count in [1, 10, 500]:
+            Exercise.objects.all().delete()
+            self.create_public_exercises(count)
+
+            # exercises with authors, gym equipment, categories
+            with self.assertNumQueries(3):
+                response = self.client.get(self.exercise_url)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data), count)
+            self.assertEqual(len(response.data[0]['category']), 2)
+            self.assertEqual(len(response.data[0]['gym_equipment']), 2)
+
+
+class ExerciseFilterTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='filters@example.com',
+            password='Securepassword123',
+            first_name='Filters',
+        )
+        self.url = reverse('exercises')
+        self.stretching, self.cardio = ExerciseCategory.objects.all()[:2]
+        self.mat, self.bike = GymEquipment.objects.all()[:2]
+
+        self.lunge = Exercise.objects.create(name='lunge', is_public=True, created_by=self.user)
+        self.lunge.category.set([self.stretching, self.cardio])
+        self.lunge.gym_equipment.set([self.mat])
+
+        self.cycling = Exercise.objects.create(
+            name='cycling', is_public=True, is_measured_in_reps=False, created_by=self.user,
+        )
+        self.cycling.category.set([self.cardio])
+        self.cycling.gym_equipment.set([self.bike])
+
+    def get_ids(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(exercise['id'] for exercise in response.data)
+
+    def test_filters(self):
+        self.assertEqual(self.get_ids(category=self.stretching.id), [self.lunge.id])
+        self.assertEqual(
+            self.get_ids(category=f'{self.stretching.id},{self.cardio.id}'),
+            sorted([self.lunge.id, self.cycling.id]),
+        )
+        self.assertEqual(self.get_ids(category=self.cardio.id, equipment=self.bike.id), [self.cycling.id])
+        self.assertEqual(self.get_ids(measured_in_reps='false'), [self.cycling.id])
+
+    def test_facets(self):
+        response = self.client.get(self.url, {'category': self.cardio.id, 'facets': 'true', 'page_size': 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        facets = response.data['facets']
+        self.assertEqual(facets['category'], sorted([
+            {'id': self.stretching.id, 'count': 1},
+            {'id': self.cardio.id, 'count': 2},
+        ], key=lambda facet: facet['id']))
+        self.assertEqual(facets['equipment'], sorted([
+            {'id': self.mat.id, 'count': 1},
+            {'id': self.bike.id, 'count': 1},
+        ], key=lambda facet: facet['id']))
+        self.assertEqual(facets['measured_in_reps'], {'true': 1, 'false': 1})
+
+    def test_invalid_filter(self):
+        response = self.client.get(self.url, {'category': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExerciseSearchTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='search@example.com',
+            password='Securepassword123',
+            first_name='Search',
+        )
+        self.url = reverse('exercises_search')
+        self.bench_press = Exercise.objects.create(
+            name='Жим штанги лёжа',
+            description='Базовое упражнение для груди',
+            instructions=['Опустите штангу к груди'],
+            is_public=True,
+            created_by=self.user,
+        )
+        self.running = Exercise.objects.create(
+            name='Running',
+            description='Easy pace',
+            instructions=['Keep your shoulders relaxed'],
+            is_public=True,
+            created_by=self.user,
+        )
+        Exercise.objects.create(name='Жим гантелей', created_by=self.user)
+
+    def search(self, text, **params):
+        response = self.client.get(self.url, {'q': text, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [exercise['id'] for exercise in response.data['results']]
+
+    def test_search_uses_russian_and_english_stemming(self):
+        self.assertEqual(self.search('жима'), [self.bench_press.id])
+        self.assertEqual(self.search('run'), [self.running.id])
+        self.assertEqual(self.search('shoulder'), [self.running.id])
+
+    def test_name_is_ranked_above_description(self):
+        chest = Exercise.objects.create(name='Грудь', is_public=True, created_by=self.user)
+
+        self.assertEqual(self.search('грудь'), [chest.id, self.bench_press.id])
+
+    def test_search_vector_follows_updates(self):
+        self.running.name = 'Sprint'
+        self.running.save()
+
+        self.assertEqual(self.search('sprint'), [self.running.id])
+
+    def test_results_are_paginated(self):
+        response = self.client.get(self.url, {'q': 'жим OR running', 'page_size': 1})
+
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_query_is_required(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class DuplicateExerciseNameTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='duplicates@example.com',
+            password='Securepassword123',
+            first_name='Duplicates',
+        )
+        self.client.force_authenticate(self.user)
+        self.url = reverse('exercises_personal')
+        self.exercise = Exercise.objects.create(name='Жим штанги лёжа', created_by=self.user)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def create_exercise(self, name, **data):
+        return self.client.post(self.url, {
+            'name': name,
+            'instructions': ['step'],
+            'category': [ExerciseCategory.objects.first().id],
+            'gym_equipment': [GymEquipment.objects.first().id],
+            **data,
+        }, format='json')
+
+    def test_similar_name_is_flagged(self):
+        response = self.create_exercise('жим  лежа штанги!')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['similar_exercises'], [self.exercise.id])
+
+    def test_numbered_names_are_not_blocked(self):
+        Exercise.objects.create(name='Bench press 1', created_by=self.user)
+
+        response = self.create_exercise('Bench press 2')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.data['similar_exercises'])
+
+    def test_exact_duplicate_is_rejected(self):
+        response = self.create_exercise('Жим штанги лёжа')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['non_field_errors'], ['An exercise with these exact details already exists.'])
+
+    def test_different_name_is_created(self):
+        response = self.create_exercise('Приседания')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['similar_exercises'], [])
+
+    def test_cloned_names_are_indexed(self):
+        author = get_user_model().objects.create_user(
+            email='duplicatesauthor@example.com',
+            password='Securepassword123',
+            first_name='Author',
+        )
+        duplicate_service.find_similar_exercises(self.user, 'Тяга')
+
+        clone = Exercise.objects.create(name='Тяга верхнего блока', created_by=author).clone_for_user(self.user)
+
+        self.assertEqual(duplicate_service.find_similar_exercises(self.user, 'тяга верхнего блока'), [clone.id])
+
+    def test_index_is_read_once_and_follows_changes(self):
+        duplicate_service.find_similar_exercises(self.user, 'Тяга')
+        with self.assertNumQueries(0):
+            self.assertEqual(duplicate_service.find_similar_exercises(self.user, 'Жим штанги лёжа'), [self.exercise.id])
+
+        other = Exercise.objects.create(name='Тяга верхнего блока', created_by=self.user)
+
+        self.assertEqual(duplicate_service.find_similar_exercises(self.user, 'тяга верхнего блока'), [other.id])
+        self.assertEqual(duplicate_service.find_similar_exercises(self.user, 'тяга верхнего блока', exclude_id=other.id), [])
+
+
+class FieldTrackerTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='tracker@example.com',
+            password='Securepassword123',
+            first_name='Tracker',
+        )
+        self.exercise = Exercise.objects.create(name='tracked', created_by=self.user)
+
+    def test_update_does_not_reload_row_before_save(self):
+        exercise = Exercise.objects.get(id=self.exercise.id)
+        exercise.description = 'changed'
+
+        with CaptureQueriesContext(connection) as queries:
+            exercise.save()
+
+        self.assertTrue(any(query['sql'].startswith('UPDATE') for query in queries))
+        self.assertFalse(any(
+            query['sql'].startswith('SELECT') and 'FROM "workout_manager_exercise"' in query['sql']
+            for query in queries
+        ))
+
+    def test_changed_at_is_bumped_only_for_changed_fields(self):
+        exercise = Exercise.objects.get(id=self.exercise.id)
+        changed_at = exercise.changed_at
+
+        exercise.save()
+        self.assertEqual(exercise.changed_at, changed_at)
+        self.assertEqual(exercise.get_changed_fields(), [])
+
+        exercise.name = 'renamed'
+        self.assertEqual(exercise.get_changed_fields(), ['name'])
+        self.assertEqual(exercise.get_previous_value('name'), 'tracked')
+
+        exercise.save()
+        self.assertGreater(exercise.changed_at, changed_at)
+        self.assertFalse(exercise.has_changed('name'))
+
+
+@mock_aws
+class ExerciseVideoUploadTests(APITestCase):
+    def setUp(self):
+        self.s3_client = boto3.client('s3', region_name='us-east-1')
+        self.s3_client.create_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+
+        self.user = get_user_model().objects.create_user(
+            email='uploader@example.com',
+            password='Securepassword123',
+            first_name='Uploader',
+        )
+        self.exercise = Exercise.objects.create(name='with video', created_by=self.user)
+        self.client.force_authenticate(user=self.user)
+        self.start_url = reverse('exercise_video_upload', args=[self.exercise.id])
+
+    def start_upload(self, file_size):
+        return self.client.post(self.start_url, {'file_name': 'clip.MP4', 'file_size': file_size}, format='json')
+
+    def upload_video(self, exercise, body):
+        response = self.client.post(
+            reverse('exercise_video_upload', args=[exercise.id]),
+            {'file_name': 'clip.MP4', 'file_size': len(body)},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        upload_session = VideoUploadSession.objects.get(id=response.data['id'])
+        # Клиент загружает часть сам, минуя API
+        part = self.s3_client.upload_part(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=f'media/{upload_session.name}',
+            UploadId=upload_session.upload_id,
+            PartNumber=1,
+            Body=body,
+        )
+
+        response = self.client.post(
+            reverse('exercise_video_upload_detail', args=[exercise.id, upload_session.id]),
+            {'parts': [{'part_number': 1, 'etag': part['ETag']}]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return upload_session
+
+    def test_parts_are_uploaded_directly_and_completed(self):
+        response = self.start_upload(11)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['parts']), 1)
+        self.assertIn('uploadId=', response.data['parts'][0]['url'])
+        VideoUploadSession.objects.all().delete()
+
+        upload_session = self.upload_video(self.exercise, b'video bytes')
+
+        self.assertTrue(upload_session.name.endswith('.mp4'))
+        self.exercise.refresh_from_db()
+        self.assertFalse(VideoUploadSession.objects.exists())
+        self.assertEqual(
+            self.s3_client.head_object(
+                Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                Key=f'media/{self.exercise.video.name}',
+            )['ContentLength'],
+            len(b'video bytes'),
+        )
+
+    def test_completed_video_is_content_addressed(self):
+        upload_session = self.upload_video(self.exercise, b'video bytes')
+
+        self.exercise.refresh_from_db()
+        self.assertEqual(
+            self.exercise.video.name,
+            media_store.get_digest_name(hashlib.sha256(b'video bytes').hexdigest(), 'clip.mp4'),
+        )
+        self.assertEqual(StoredMedia.objects.get(name=self.exercise.video.name).reference_count, 1)
+        # Временный объект загрузки удалён
+        with self.assertRaises(ClientError):
+            self.s3_client.head_object(
+                Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                Key=f'media/{upload_session.name}',
+            )
+
+    def test_identical_videos_share_one_object(self):
+        other_exercise = Exercise.objects.create(name='same video', created_by=self.user)
+
+        self.upload_video(self.exercise, b'video bytes')
+        self.upload_video(other_exercise, b'video bytes')
+
+        self.exercise.refresh_from_db()
+        other_exercise.refresh_from_db()
+        self.assertEqual(self.exercise.video.name, other_exercise.video.name)
+        self.assertEqual(StoredMedia.objects.get(name=self.exercise.video.name).reference_count, 2)
+
+    def test_aborted_upload_is_removed(self):
+        response = self.start_upload(11)
+        upload_session = VideoUploadSession.objects.get(id=response.data['id'])
+
+        response = self.client.delete(
+            reverse('exercise_video_upload_detail', args=[self.exercise.id, upload_session.id])
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(VideoUploadSession.objects.exists())
+        uploads = self.s3_client.list_multipart_uploads(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+        self.assertNotIn(upload_session.upload_id, [upload['UploadId'] for upload in uploads.get('Uploads', [])])
+
+    def test_oversized_video_is_rejected(self):
+        response = self.start_upload(settings.WORKOUT_MANAGER_VIDEO_MAX_SIZE_MB * 1024 * 1024 + 1)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(VideoUploadSession.objects.exists())
+
+    def test_only_owner_can_upload(self):
+        other_user = get_user_model().objects.create_user(
+            email='other_uploader@example.com',
+            password='Securepassword123',
+            first_name='Other',
+        )
+        self.client.force_authenticate(user=other_user)
+
+        self.assertEqual(self.start_upload(11).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_published_exercise_with_subscribers_is_not_updated(self):
+        upload_session = VideoUploadSession.objects.get(id=self.start_upload(11).data['id'])
+        Exercise.objects.filter(id=self.exercise.id).update(is_published=True)
+        Exercise.objects.create(name='clone', created_by=self.user, original=self.exercise)
+
+        response = self.client.post(
+            reverse('exercise_video_upload_detail', args=[self.exercise.id, upload_session.id]),
+            {'parts': [{'part_number': 1, 'etag': '"etag"'}]},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.exercise.refresh_from_db()
+        self.assertFalse(self.exercise.video)
+        self.assertEqual(self.start_upload(11).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expired_uploads_are_aborted(self):
+        upload_session = VideoUploadSession.objects.get(id=self.start_upload(11).data['id'])
+        VideoUploadSession.objects.update(
+            created_at=timezone.now() - timedelta(seconds=settings.WORKOUT_MANAGER_VIDEO_UPLOAD_SESSION_EXPIRES + 1)
+        )
+        self.start_upload(11)
+        out = StringIO()
+
+        call_command('abort_expired_video_uploads', stdout=out)
+
+        self.assertIn('Aborted 1 uploads', out.getvalue())
+        self.assertEqual(VideoUploadSession.objects.count(), 1)
+        uploads = self.s3_client.list_multipart_uploads(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+        self.assertNotIn(upload_session.upload_id, [upload['UploadId'] for upload in uploads.get('Uploads', [])])
+
+
+@mock_aws
+@override_settings(BACKGROUND_TASKS_ALWAYS_EAGER=True, MEDIA_RENDITION_SIZES=[160, 320])
+class PreviewRenditionTests(APITestCase):
+    def setUp(self):
+        boto3.client('s3', region_name='us-east-1').create_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+        self.user = get_user_model().objects.create_user(
+            email='renditions@example.com',
+            password='Securepassword123',
+            first_name='Renditions',
+        )
+
+    def create_preview(self):
+        buffer = BytesIO()
+        Image.new('RGB', (800, 400), color='red').save(buffer, format='PNG')
+        return SimpleUploadedFile('preview.png', buffer.getvalue(), content_type='image/png')
+
+    def test_renditions_are_generated_after_upload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            exercise = Exercise.objects.create(
+                name='with preview',
+                created_by=self.user,
+                preview=self.create_preview(),
+            )
+
+        exercise.refresh_from_db()
+        self.assertEqual(set(exercise.preview_renditions), {'160', '320'})
+
+        storage = exercise.preview.storage
+        with storage.open(exercise.preview_renditions['160']['webp']) as file:
+            self.assertEqual(Image.open(file).size, (160, 80))
+        with storage.open(exercise.preview_renditions['320']['jpeg']) as file:
+            self.assertEqual(Image.open(file).format, 'JPEG')
+
+        data = ExerciseSerializer(exercise).data
+        self.assertTrue(data['preview_renditions']['160']['webp'].startswith('https://'))
+
+    def test_replaced_preview_drops_stale_renditions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            exercise = Exercise.objects.create(
+                name='replaced preview',
+                created_by=self.user,
+                preview=self.create_preview(),
+            )
+        exercise.refresh_from_db()
+
+        exercise.preview = None
+        exercise.save()
+
+        self.assertEqual(Exercise.objects.get(id=exercise.id).preview_renditions, {})
+
+
 class WorkoutExerciseViewTests(APITestCase):
     def setUp(self):
         self.User = get_user_model()
@@ -612,3 +1146,624 @@ class WorkoutViewTests(APITestCase):
             ),
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class WorkoutDetailQueryCountTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='workouttree@example.com',
+            password='Securepassword123',
+            first_name='Workouttree',
+        )
+        self.categories = list(ExerciseCategory.objects.all()[:2])
+        self.gym_equipment = list(GymEquipment.objects.all()[:2])
+        self.workout = Workout.objects.create(
+            name='tree',
+            is_public=True,
+            created_by=self.user,
+        )
+
+    def add_exercises(self, count):
+        for index in range(count):
+            exercise = Exercise.objects.create(
+                name=f'tree_exercise{index}',
+                created_by=self.user,
+            )
+            exercise.category.set(self.categories)
+            exercise.gym_equipment.set(self.gym_equipment)
+            WorkoutExercise.objects.create(workout=self.workout, exercise=exercise)
+
+    def test_query_count_does_not_depend_on_workout_size(self):
+        url = reverse('workout_detail', kwargs={'workout_id': self.workout.id})
+
+        for count in [1, 29]:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.add_exercises(count)
+
+            # workout with author, workout exercises with exercises and authors,
+            # gym equipment, categories
+            with self.assertNumQueries(4):
+                response = self.client.get(url)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(len(response.data['workout_exercises']), 30)
+        exercise_names = [
+            workout_exercise['exercise']['name']
+            for workout_exercise in response.data['workout_exercises']
+        ]
+        self.assertEqual(exercise_names[0], 'tree_exercise0')
+        self.assertEqual(len(response.data['workout_exercises'][0]['exercise']['category']), 2)
+
+
+def create_plan_tree(user, workouts_count, exercises_count, **plan_kwargs):
+    """Creates a weekly plan with one workout per week day and distinct exercises."""
+    categories = list(ExerciseCategory.objects.all()[:2])
+    gym_equipment = list(GymEquipment.objects.all()[:2])
+
+    plan = WeeklyFitnessPlan.objects.create(name='plan', created_by=user, **plan_kwargs)
+    for week_day in range(1, workouts_count + 1):
+        workout = Workout.objects.create(name=f'workout{week_day}', created_by=user, **plan_kwargs)
+        for index in range(exercises_count):
+            exercise = Exercise.objects.create(
+                name=f'plan{plan.id}_day{week_day}_exercise{index}',
+                created_by=user,
+                **plan_kwargs,
+            )
+            exercise.category.set(categories)
+            exercise.gym_equipment.set(gym_equipment)
+            WorkoutExercise.objects.create(workout=workout, exercise=exercise)
+        WeeklyFitnessPlanWorkout.objects.create(
+            weekly_fitness_plan=plan,
+            workout=workout,
+            week_day=week_day,
+        )
+    return plan
+
+
+class WeeklyFitnessPlanQueryCountTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='plantree@example.com',
+            password='Securepassword123',
+            first_name='Plantree',
+        )
+
+    def test_detail_query_count_does_not_depend_on_plan_depth(self):
+        for workouts_count, exercises_count in [(1, 1), (7, 5)]:
+            plan = create_plan_tree(
+                self.user, workouts_count, exercises_count, is_public=True,
+            )
+            url = reverse('weekly_plan_detail', kwargs={'plan_id': plan.id})
+
+            # plan with author, plan workouts with workouts and authors,
+            # workout exercises, gym equipment, categories
+            with self.assertNumQueries(5):
+                response = self.client.get(url)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            plan_workouts = response.data['weekly_fitness_plan_workouts']
+            self.assertEqual(len(plan_workouts), workouts_count)
+            self.assertEqual(len(plan_workouts[0]['workout']['workout_exercises']), exercises_count)
+
+    def test_list_query_count_does_not_depend_on_plan_count(self):
+        create_plan_tree(self.user, 2, 2, is_public=True)
+        create_plan_tree(self.user, 3, 3, is_public=True)
+
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('weekly_plans'), {'page_size': 10})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+
+
+@override_settings(WORKOUT_MANAGER_COPY_ON_WRITE_SUBSCRIPTIONS=False)
+class SubscriptionCloneTests(APITestCase):
+    def setUp(self):
+        self.author = get_user_model().objects.create_user(
+            email='cloneauthor@example.com',
+            password='Securepassword123',
+            first_name='Author',
+        )
+        self.subscriber = get_user_model().objects.create_user(
+            email='clonesubscriber@example.com',
+            password='Securepassword123',
+            first_name='Subscriber',
+        )
+        self.client.force_authenticate(user=self.subscriber)
+
+    def subscribe_on_plan(self, plan):
+        url = reverse('weekly_plan_subscriptions_detail', kwargs={'plan_id': plan.id})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_plan_clone_query_count_is_constant(self):
+        small_plan = create_plan_tree(self.author, 1, 1, is_published=True)
+        large_plan = create_plan_tree(self.author, 7, 30, is_published=True)
+
+        self.assertEqual(
+            self.subscribe_on_plan(small_plan),
+            self.subscribe_on_plan(large_plan),
+        )
+
+        cloned_plan = WeeklyFitnessPlan.objects.get(original=large_plan, created_by=self.subscriber)
+        self.assertEqual(cloned_plan.workouts.count(), 7)
+        self.assertEqual(
+            WorkoutExercise.objects.filter(workout__weekly_fitness_plan_workouts__weekly_fitness_plan=cloned_plan).count(),
+            210,
+        )
+        cloned_exercise = Exercise.objects.filter(created_by=self.subscriber, original__isnull=False).first()
+        self.assertEqual(cloned_exercise.category.count(), 2)
+        self.assertEqual(cloned_exercise.gym_equipment.count(), 2)
+
+    def test_workout_clone_keeps_exercise_order(self):
+        plan = create_plan_tree(self.author, 1, 3, is_published=True)
+        workout = plan.workouts.get()
+
+        url = reverse('workout_subscriptions_detail', kwargs={'workout_id': workout.id})
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        cloned_workout = Workout.objects.get(original=workout, created_by=self.subscriber)
+        self.assertEqual(
+            [we.exercise.original_id for we in cloned_workout.workout_exercises.all()],
+            [we.exercise_id for we in workout.workout_exercises.all()],
+        )
+
+
+class CopyOnWriteSubscriptionTests(APITestCase):
+    def setUp(self):
+        self.author = get_user_model().objects.create_user(
+            email='cowauthor@example.com',
+            password='Securepassword123',
+            first_name='Author',
+        )
+        self.subscriber = get_user_model().objects.create_user(
+            email='cowsubscriber@example.com',
+            password='Securepassword123',
+            first_name='Subscriber',
+        )
+        self.plan = create_plan_tree(self.author, 2, 3, is_published=True)
+        self.client.force_authenticate(user=self.subscriber)
+        self.client.post(
+            reverse('weekly_plan_subscriptions_detail', kwargs={'plan_id': self.plan.id})
+        )
+
+    def test_subscription_does_not_copy_rows(self):
+        self.assertTrue(
+            WeeklyFitnessPlanSubscription.objects.filter(
+                user=self.subscriber,
+                weekly_fitness_plan=self.plan,
+            ).exists()
+        )
+        self.assertFalse(WeeklyFitnessPlan.objects.filter(created_by=self.subscriber).exists())
+        self.assertFalse(Workout.objects.filter(created_by=self.subscriber).exists())
+        self.assertFalse(Exercise.objects.filter(created_by=self.subscriber).exists())
+
+    def test_subscribed_lists_contain_referenced_tree(self):
+        response = self.client.get(reverse('weekly_plans_subscribed'))
+        self.assertEqual([plan['id'] for plan in response.data], [self.plan.id])
+
+        response = self.client.get(reverse('workouts_subscribed'))
+        self.assertEqual(len(response.data), 2)
+
+        response = self.client.get(reverse('exercises_subscribed'))
+        self.assertEqual(len(response.data), 6)
+
+    def test_edit_materializes_private_copy(self):
+        response = self.client.put(
+            reverse('weekly_plan_detail', kwargs={'plan_id': self.plan.id}),
+            data={'name': 'my plan'},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['id'], self.plan.id)
+        self.assertEqual(response.data['original'], self.plan.id)
+
+        self.plan.refresh_from_db()
+        self.assertEqual(self.plan.name, 'plan')
+        self.assertEqual(WeeklyFitnessPlan.objects.get(id=response.data['id']).name, 'my plan')
+        self.assertEqual(Workout.objects.filter(created_by=self.subscriber).count(), 2)
+        self.assertFalse(WeeklyFitnessPlanSubscription.objects.filter(user=self.subscriber).exists())
+
+        response = self.client.get(reverse('weekly_plans_subscribed'))
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['name'], 'my plan')
+
+    def test_delete_unsubscribes(self):
+        response = self.client.delete(
+            reverse('weekly_plan_detail', kwargs={'plan_id': self.plan.id})
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(WeeklyFitnessPlan.objects.filter(id=self.plan.id).exists())
+        self.assertFalse(WeeklyFitnessPlanSubscription.objects.filter(user=self.subscriber).exists())
+
+
+@override_settings(WORKOUT_MANAGER_ORIGINALITY_CACHE_TIMEOUT=60)
+class OriginalityServiceTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='originality@example.com',
+            password='Securepassword123',
+            first_name='Originality',
+        )
+        self.plan = create_plan_tree(self.user, 3, 4)
+        self.workout = self.plan.workouts.first()
+
+    def tearDown(self):
+        originality_service.invalidate_plans([self.plan.id])
+        originality_service.invalidate_workouts([self.workout.id])
+
+    def test_values_are_counted_with_one_query(self):
+        with self.assertNumQueries(1):
+            values = originality_service.get_plan_originality_values(self.plan.id, self.user.id)
+        # plan, 3 workouts, 12 workout exercises
+        self.assertEqual(values, (16, 0))
+
+        with self.assertNumQueries(1):
+            values = originality_service.get_workout_originality_values(self.workout.id, self.user.id)
+        self.assertEqual(values, (5, 0))
+
+    def test_cached_values_are_invalidated_when_tree_changes(self):
+        originality_service.get_plan_originality_values(self.plan.id, self.user.id)
+        with self.assertNumQueries(0):
+            originality_service.get_plan_originality_values(self.plan.id, self.user.id)
+
+        copied_exercise = Exercise.objects.create(
+            name='copied',
+            created_by=self.user,
+            original=self.workout.exercises.first(),
+        )
+        WorkoutExercise.objects.create(workout=self.workout, exercise=copied_exercise)
+
+        self.assertEqual(
+            originality_service.get_plan_originality_values(self.plan.id, self.user.id),
+            (17, 1),
+        )
+        self.assertEqual(
+            originality_service.get_workout_originality_values(self.workout.id, self.user.id),
+            (6, 1),
+        )
+
+    def test_referenced_workout_of_another_user_is_not_original(self):
+        author = get_user_model().objects.create_user(
+            email='originalityauthor@example.com',
+            password='Securepassword123',
+            first_name='Author',
+        )
+        subscribed_workout = create_plan_tree(author, 1, 4, is_published=True).workouts.get()
+        WorkoutSubscription.objects.create(user=self.user, workout=subscribed_workout)
+
+        plan = WeeklyFitnessPlan.objects.create(name='own plan', created_by=self.user)
+        WeeklyFitnessPlanWorkout.objects.create(weekly_fitness_plan=plan, workout=subscribed_workout, week_day=1)
+        self.addCleanup(originality_service.invalidate_plans, [plan.id])
+        self.addCleanup(originality_service.invalidate_workouts, [subscribed_workout.id])
+
+        # plan is the user's own, the workout and its 4 exercises are the author's
+        values = originality_service.get_plan_originality_values(plan.id, self.user.id)
+        self.assertEqual(values, (6, 5))
+        self.assertFalse(originality_service.get_originality(*values))
+
+        self.assertEqual(
+            originality_service.get_workout_originality_values(subscribed_workout.id, self.user.id),
+            (5, 5),
+        )
+        self.assertEqual(
+            originality_service.get_workout_originality_values(subscribed_workout.id, author.id),
+            (5, 0),
+        )
+
+
+class PublishedServiceTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='publisher@example.com',
+            password='Securepassword123',
+            first_name='Publisher',
+        )
+
+    def test_plan_is_published_with_constant_query_count(self):
+        small_plan = create_plan_tree(self.user, 1, 1)
+        large_plan = create_plan_tree(self.user, 7, 10)
+
+        with CaptureQueriesContext(connection) as small_queries:
+            small_count = published_service.publish_plan(small_plan.id)
+        with CaptureQueriesContext(connection) as large_queries:
+            large_count = published_service.publish_plan(large_plan.id)
+
+        self.assertEqual(len(small_queries), len(large_queries))
+        self.assertEqual(small_count, 1 + 1 + 1)
+        self.assertEqual(large_count, 1 + 7 + 70)
+        self.assertFalse(Exercise.objects.filter(is_published=False).exists())
+        self.assertFalse(Workout.objects.filter(is_published=False).exists())
+        self.assertFalse(WeeklyFitnessPlan.objects.filter(is_published=False).exists())
+
+    def test_republishing_touches_no_rows(self):
+        plan = create_plan_tree(self.user, 2, 2)
+        published_service.publish_plan(plan.id)
+
+        self.assertEqual(published_service.publish_plan(plan.id), 0)
+
+
+class ReferenceDataCacheTests(APITestCase):
+    def setUp(self):
+        self.url = reverse('data_for_exercise_creation')
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_payload_is_cached_and_revalidated_with_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_writes_invalidate_cached_payload(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ExerciseCategory.objects.create(name='Новая категория')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Новая категория', [category['name'] for category in response.data['exercise_categories']])
+
+
+class PublishedListCacheTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='reader@example.com',
+            password='Securepassword123',
+            first_name='Reader',
+        )
+        self.client.force_authenticate(self.user)
+        self.url = reverse('workout_publish')
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_list_is_served_from_cache(self):
+        Workout.objects.create(name='published', created_by=self.user, is_published=True)
+        response = self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            cached_response = self.client.get(self.url)
+
+        self.assertEqual(cached_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached_response.data, response.data)
+
+    def test_publishing_invalidates_list(self):
+        plan = create_plan_tree(self.user, 1, 1)
+        self.assertEqual(self.client.get(self.url).data, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            published_service.publish_plan(plan.id)
+
+        self.assertEqual(len(self.client.get(self.url).data), 1)
+
+
+class RepresentationCacheTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='representation@example.com',
+            password='Securepassword123',
+            first_name='Representation',
+        )
+        self.plan = create_plan_tree(self.user, 2, 2, is_public=True)
+        self.plan_url = reverse('weekly_plan_detail', kwargs={'plan_id': self.plan.id})
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_detail_is_served_from_cache(self):
+        response = self.client.get(self.plan_url)
+
+        # только сам план с автором
+        with self.assertNumQueries(1):
+            cached_response = self.client.get(self.plan_url)
+
+        self.assertEqual(cached_response.data, response.data)
+
+    def test_list_renders_only_missing_items(self):
+        self.client.get(reverse('exercises'))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('exercises'))
+
+        self.assertEqual(len(response.data), 4)
+
+    def test_nested_changes_invalidate_representation(self):
+        self.client.get(self.plan_url)
+
+        exercise = Exercise.objects.filter(workout_exercises__workout__weekly_fitness_plan_workouts__weekly_fitness_plan=self.plan).first()
+        exercise.name = 'renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            exercise.save()
+
+        response = self.client.get(self.plan_url)
+        exercise_names = [
+            workout_exercise['exercise']['name']
+            for plan_workout in response.data['weekly_fitness_plan_workouts']
+            for workout_exercise in plan_workout['workout']['workout_exercises']
+        ]
+        self.assertIn('renamed', exercise_names)
+
+        changed_at = Exercise.objects.get(id=exercise.id).changed_at
+        with self.captureOnCommitCallbacks(execute=True):
+            exercise.category.clear()
+
+        response = self.client.get(reverse('exercise_detail', kwargs={'exercise_id': exercise.id}))
+        self.assertEqual(response.data['category'], [])
+        self.assertEqual(Exercise.objects.get(id=exercise.id).changed_at, changed_at)
+
+    def test_author_changes_invalidate_representation(self):
+        self.client.get(self.plan_url)
+
+        changed_at = WeeklyFitnessPlan.objects.get(id=self.plan.id).changed_at
+        self.user.last_name = 'Author'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        response = self.client.get(self.plan_url)
+        self.assertEqual(response.data['created_by']['last_name'], 'Author')
+        # Сброс кэша не переставляет объекты автора в списках
+        self.assertEqual(WeeklyFitnessPlan.objects.get(id=self.plan.id).changed_at, changed_at)
+
+    def test_nested_author_changes_invalidate_other_authors_trees(self):
+        subscriber = get_user_model().objects.create_user(
+            email='representationsubscriber@example.com',
+            password='Securepassword123',
+            first_name='Subscriber',
+        )
+        plan = WeeklyFitnessPlan.objects.create(name='own plan', created_by=subscriber, is_public=True)
+        WeeklyFitnessPlanWorkout.objects.create(weekly_fitness_plan=plan, workout=self.plan.workouts.first(), week_day=1)
+        url = reverse('weekly_plan_detail', kwargs={'plan_id': plan.id})
+        self.client.get(url)
+
+        self.user.first_name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['weekly_fitness_plan_workouts'][0]['workout']['created_by']['first_name'], 'Renamed')
+
+
+class DetailConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='conditional@example.com',
+            password='Securepassword123',
+            first_name='Conditional',
+        )
+        self.plan = create_plan_tree(self.user, 1, 1, is_public=True)
+        self.url = reverse('weekly_plan_detail', kwargs={'plan_id': self.plan.id})
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_not_modified_without_serialization(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with mock.patch.object(representation_service, 'get_representation') as get_representation:
+            with self.assertNumQueries(1):
+                not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        get_representation.assert_not_called()
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified.content, b'')
+
+    def test_nested_change_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            WorkoutExercise.objects.filter(workout__weekly_fitness_plan_workouts__weekly_fitness_plan=self.plan).first().delete()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['weekly_fitness_plan_workouts'][0]['workout']['workout_exercises'], [])
+
+    def test_private_object_is_not_revealed(self):
+        self.plan.is_public = False
+        self.plan.save()
+        self.client.force_authenticate(self.user)
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_authenticate(None)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class LibraryCounterTests(APITestCase):
+    def setUp(self):
+        self.author = get_user_model().objects.create_user(
+            email='counterauthor@example.com',
+            password='Securepassword123',
+            first_name='Author',
+        )
+        self.user = get_user_model().objects.create_user(
+            email='counter@example.com',
+            password='Securepassword123',
+            first_name='Counter',
+        )
+        self.client.force_authenticate(self.user)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def get_limitation(self):
+        return UserWorkoutManagerLimitation.objects.get(user=self.user)
+
+    def create_exercise(self, name):
+        return self.client.post(reverse('exercises_personal'), {
+            'name': name,
+            'instructions': ['step'],
+            'category': [ExerciseCategory.objects.first().id],
+            'gym_equipment': [GymEquipment.objects.first().id],
+        }, format='json')
+
+    def test_limit_is_checked_without_counting_rows(self):
+        UserWorkoutManagerLimitation.objects.filter(user=self.user).update(exercise_limitation=1)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.create_exercise('Приседания')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql']])
+        self.assertTrue([query for query in queries if 'FOR UPDATE' in query['sql']])
+
+        response = self.create_exercise('Становая тяга')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['non_field_errors'], ['You can create a maximum of 1 exercises.'])
+        self.assertEqual(self.get_limitation().exercise_count, 1)
+
+    def test_delete_releases_the_slot(self):
+        exercise = Exercise.objects.create(name='exercise', created_by=self.user)
+        workout = Workout.objects.create(name='workout', created_by=self.user)
+        self.assertEqual(self.get_limitation().exercise_count, 1)
+        self.assertEqual(self.get_limitation().workout_count, 1)
+
+        exercise.delete()
+        workout.delete()
+
+        limitation = self.get_limitation()
+        self.assertEqual(limitation.exercise_count, 0)
+        self.assertEqual(limitation.workout_count, 0)
+
+    def test_clone_adds_the_whole_tree(self):
+        plan = create_plan_tree(self.author, 2, 3, is_published=True)
+
+        plan.clone_for_user(self.user)
+
+        limitation = self.get_limitation()
+        self.assertEqual(limitation.plans_count, 1)
+        self.assertEqual(limitation.workout_count, 2)
+        self.assertEqual(limitation.exercise_count, 6)
+
+
+class ListIndexBenchmarkCommandTests(APITestCase):
+    def test_seed_requires_debug_or_force(self):
+        with self.assertRaises(CommandError):
+            call_command('seed_list_benchmark', users=1, stdout=StringIO())
+
+        self.assertFalse(get_user_model().objects.filter(email__endswith=f'@{BENCHMARK_EMAIL_DOMAIN}').exists())
+
+    def test_seed_and_explain(self):
+        out = StringIO()
+        call_command(
+            'seed_list_benchmark',
+            users=3, exercises_per_user=10, workouts_per_user=5, plans_per_user=5, force=True,
+            stdout=out,
+        )
+
+        self.assertIn('Exercise: 30', out.getvalue())
+        self.assertTrue(Exercise.objects.filter(original__isnull=False).exists())
+
+        out = StringIO()
+        call_command('explain_list_queries', stdout=out)
+
+        self.assertIn('/workout_manager/exercises/personal/', out.getvalue())
+        self.assertIn('/workout_manager/weekly_plans/archived/', out.getvalue())
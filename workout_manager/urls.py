@@ -4,9 +4,12 @@ from workout_manager.views import (
     ExercisePersonalView,
     ExerciseSubcribedView,
     ExerciseView,
+    ExerciseSearchView,
     ExerciseDetailView,
     ArchivedExerciseView,
     ArchivedExercisesDetailView,
+    ExerciseVideoUploadView,
+    ExerciseVideoUploadDetailView,
 
     WorkoutPersonalView,
     WorkoutSubcribedView,
@@ -34,6 +37,7 @@ from workout_manager.views import (
 urlpatterns = [
     # Exercises
     path('exercises/', ExerciseView.as_view(), name='exercises'),
+    path('exercises/search/', ExerciseSearchView.as_view(), name='exercises_search'),
     path('exercises/published/', ExercisePublishedView.as_view(), name='exercises_published'),
     path('exercises/personal/', ExercisePersonalView.as_view(), name='exercises_personal'),
     path('exercises/subscribed/', ExerciseSubcribedView.as_view(), name='exercises_subscribed'),
@@ -42,6 +46,9 @@ urlpatterns = [
     path('exercises/archived/', ArchivedExerciseView.as_view(), name='exercises_archived'),
     path('exercises/archived/<int:exercise_id>/', ArchivedExercisesDetailView.as_view(), name='exercise_archived_detail'), # изменение is_archived на противоположное
 
+    path('exercises/<int:exercise_id>/video_upload/', ExerciseVideoUploadView.as_view(), name='exercise_video_upload'),
+    path('exercises/<int:exercise_id>/video_upload/<int:session_id>/', ExerciseVideoUploadDetailView.as_view(), name='exercise_video_upload_detail'),
+
     path('exercises/data_for_exercise_creation/', DataForExerciseCreationView.as_view(), name='data_for_exercise_creation'),
 
     # Workouts
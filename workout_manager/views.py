@@ -5,27 +5,62 @@ from rest_framework.views import APIView
 from django.http import QueryDict
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from workout_manager.models import (
     Exercise,
     Workout,
     WorkoutExercise,
-    ExerciseCategory,
-    GymEquipment,
     WeeklyFitnessPlan,
     WeeklyFitnessPlanWorkout,
+    VideoUploadSession,
 )
 from workout_manager.serializers import (
     ExerciseSerializer,
     WorkoutSerializer,
     WorkoutExerciseSerializer,
-    ExerciseCategorySerializer,
-    GymEquipmentSerializer,
     WeeklyFitnessPlanSerializer,
     WeeklyFitnessPlanWorkoutSerializer,
+    VideoUploadSessionSerializer,
+    VideoUploadCompleteSerializer,
 )
 from users.models import CustomUser
 from rest_framework.parsers import MultiPartParser, FormParser
-from workout_manager.Services import originality_service, published_service
+from workout_manager.Services import (
+    originality_service,
+    published_service,
+    cache_service,
+    prefetch_service,
+    reference_data_service,
+    representation_service,
+    search_service,
+    subscription_service,
+    video_upload_service,
+)
+from django.core.exceptions import ValidationError
+from django.utils.cache import get_conditional_response, patch_cache_control
+from workout_manager.filters import filter_exercises
+from workout_manager.pagination import RankPageNumberPagination, get_cached_list_response, get_list_response
+
+
+def get_detail_response(request, instance, serializer_class):
+    """
+    Detail response validated by the representation ETag: a client that already has
+    the current version gets 304 without the object being serialized.
+    Nested changes don't move changed_at, so there is no Last-Modified.
+    """
+    etag = representation_service.get_etag(instance)
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        data = representation_service.get_representation(instance, serializer_class)
+        response = Response(data, status=status.HTTP_200_OK)
+
+    response['ETag'] = etag
+    if instance.is_public:
+        patch_cache_control(response, public=True, no_cache=True)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 class ExercisePublishedView(APIView):
@@ -38,11 +73,11 @@ class ExercisePublishedView(APIView):
         return super().get_permissions()
     
     def get(self, request):
-        exercises = Exercise.objects.filter(created_by=request.user, is_published=True)
-
-        serialized_exercises = ExerciseSerializer(exercises, many=True).data
+        exercises = prefetch_service.select_authors(
+            Exercise.objects.filter(created_by=request.user, is_published=True)
+        )
 
-        return Response(serialized_exercises, status=status.HTTP_200_OK)
+        return get_list_response(request, self, exercises, ExerciseSerializer)
 
 
 class ExercisePersonalView(APIView):
@@ -57,11 +92,12 @@ class ExercisePersonalView(APIView):
         return super().get_permissions()
     
     def get(self, request):
-        exercises = Exercise.objects.filter(created_by=request.user, is_archived=False, original=None)
-
-        serialized_exercises = ExerciseSerializer(exercises, many=True).data
+        exercises = prefetch_service.select_authors(
+            Exercise.objects.filter(created_by=request.user, is_archived=False, original=None)
+        )
+        exercises, facets = filter_exercises(request, exercises)
 
-        return Response(serialized_exercises, status=status.HTTP_200_OK)
+        return get_list_response(request, self, exercises, ExerciseSerializer, facets)
     
     def post(self, request):
         serializer = ExerciseSerializer(data=request.data, context={'request': request})
@@ -81,11 +117,12 @@ class ExerciseSubcribedView(APIView):
         return super().get_permissions()
     
     def get(self, request):
-        exercises = Exercise.objects.filter(created_by=request.user, is_archived=False, original__isnull=False)
-
-        serialized_exercises = ExerciseSerializer(exercises, many=True).data
+        exercises = prefetch_service.select_authors(
+            subscription_service.get_subscribed_exercises(request.user)
+        )
+        exercises, facets = filter_exercises(request, exercises)
 
-        return Response(serialized_exercises, status=status.HTTP_200_OK)
+        return get_list_response(request, self, exercises, ExerciseSerializer, facets)
     
 
 
@@ -99,11 +136,36 @@ class ExerciseView(APIView):
         return super().get_permissions()
     
     def get(self, request):
-        exercises = Exercise.objects.filter(is_public=True)
+        exercises = prefetch_service.select_authors(
+            Exercise.objects.filter(is_public=True)
+        )
+        exercises, facets = filter_exercises(request, exercises)
 
-        serialized_exercises = ExerciseSerializer(exercises, many=True).data
+        return get_list_response(request, self, exercises, ExerciseSerializer, facets)
 
-        return Response(serialized_exercises, status=status.HTTP_200_OK)
+
+class ExerciseSearchView(APIView):
+    http_method_names = ['get']
+    authentication_classes = [JWTAuthentication]
+
+    def get_permissions(self):
+        if self.request.method == 'GET':
+            return [AllowAny()]
+        return super().get_permissions()
+
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({"error": "Параметр q обязателен."}, status=status.HTTP_400_BAD_REQUEST)
+
+        exercises = search_service.search_exercises(
+            prefetch_service.select_authors(Exercise.objects.filter(is_public=True)),
+            text,
+        )
+
+        paginator = RankPageNumberPagination()
+        page = paginator.paginate_queryset(exercises, request, view=self)
+        return paginator.get_paginated_response(ExerciseSerializer(page, many=True).data)
 
 
 class ExerciseDetailView(APIView):
@@ -118,21 +180,31 @@ class ExerciseDetailView(APIView):
         return super().get_permissions()
     
     def get(self, request, exercise_id):
-        exercise = get_object_or_404(Exercise, pk=exercise_id)
-        if exercise.is_public or exercise.created_by == request.user:
-            serializer = ExerciseSerializer(exercise)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+        exercise = get_object_or_404(prefetch_service.select_authors(Exercise.objects.all()), pk=exercise_id)
+        if (
+            exercise.is_public or
+            exercise.created_by == request.user or
+            subscription_service.is_subscribed_on_exercise(exercise, request.user)
+        ):
+            return get_detail_response(request, exercise, ExerciseSerializer)
         return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
     
+    @transaction.atomic
     def put(self, request, exercise_id):
         exercise = get_object_or_404(Exercise, pk=exercise_id)
-        if exercise.created_by == request.user:
-            serializer = ExerciseSerializer(exercise, data=request.data, partial=True, context={'request': request})
-            if serializer.is_valid():
-                serializer.save()
-                return Response(serializer.data, status=status.HTTP_200_OK)
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+        if exercise.created_by != request.user:
+            # Подписчик изменяет свою копию, которая создаётся только сейчас
+            exercise = subscription_service.get_private_exercise_copy(exercise, request.user)
+            if not exercise:
+                return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = ExerciseSerializer(exercise, data=request.data, partial=True, context={'request': request})
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        transaction.set_rollback(True)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     def delete(self, request, exercise_id):
         exercise = get_object_or_404(Exercise, pk=exercise_id)
@@ -145,7 +217,7 @@ class ExerciseDetailView(APIView):
             )
         
         if exercise.is_published:
-            if Exercise.objects.filter(original=exercise).exists():
+            if subscription_service.exercise_has_subscribers(exercise):
                 return Response(
                     {"error": "Данное упражнение опубликовано и имеет подписчиков. Его нельзя удалить."},
                     status=status.HTTP_400_BAD_REQUEST
@@ -171,14 +243,11 @@ class ArchivedExerciseView(APIView):
         return super().get_permissions()
     
     def get(self, request):
-        exercises = Exercise.objects.filter(created_by=request.user, is_archived=True)
-
-        serialized_exercises = []
-
-        for exercise in exercises:
-            serialized_exercises.append(ExerciseSerializer(exercise).data)
+        exercises = prefetch_service.select_authors(
+            Exercise.objects.filter(created_by=request.user, is_archived=True)
+        )
 
-        return Response(serialized_exercises, status=status.HTTP_200_OK)
+        return get_list_response(request, self, exercises, ExerciseSerializer)
 
 class ArchivedExercisesDetailView(APIView):
     http_method_names = ['patch']
@@ -201,6 +270,77 @@ class ArchivedExercisesDetailView(APIView):
             )
         return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
 
+class ExerciseVideoUploadView(APIView):
+    """Видео загружается клиентом напрямую в хранилище по подписанным ссылкам"""
+    http_method_names = ['post']
+    authentication_classes = [JWTAuthentication]
+
+    def get_permissions(self):
+        if self.request.method == 'POST':
+            return [IsAuthenticated()]
+        return super().get_permissions()
+
+    def post(self, request, exercise_id):
+        exercise = get_object_or_404(Exercise, pk=exercise_id)
+        if exercise.created_by != request.user:
+            return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = VideoUploadSessionSerializer(data=request.data)
+        if serializer.is_valid():
+            try:
+                upload_session = video_upload_service.start_upload(
+                    exercise,
+                    request.user,
+                    serializer.validated_data['file_name'],
+                    serializer.validated_data['file_size'],
+                )
+            except ValidationError as e:
+                return Response({"error": e.messages}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(VideoUploadSessionSerializer(upload_session).data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ExerciseVideoUploadDetailView(APIView):
+    http_method_names = ['post', 'delete']
+    authentication_classes = [JWTAuthentication]
+
+    def get_permissions(self):
+        if self.request.method in ['POST', 'DELETE']:
+            return [IsAuthenticated()]
+        return super().get_permissions()
+
+    def post(self, request, exercise_id, session_id):
+        """Завершает загрузку после того, как клиент загрузил все части"""
+        upload_session = get_object_or_404(
+            VideoUploadSession.objects.select_related('exercise'),
+            pk=session_id,
+            exercise_id=exercise_id,
+            created_by=request.user,
+        )
+
+        serializer = VideoUploadCompleteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            exercise = video_upload_service.complete_upload(upload_session, serializer.validated_data['parts'])
+        except ValidationError as e:
+            return Response({"error": e.messages}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(ExerciseSerializer(exercise).data, status=status.HTTP_200_OK)
+
+    def delete(self, request, exercise_id, session_id):
+        upload_session = get_object_or_404(
+            VideoUploadSession,
+            pk=session_id,
+            exercise_id=exercise_id,
+            created_by=request.user,
+        )
+        video_upload_service.abort_upload(upload_session)
+
+        return Response({"message": "Video upload aborted."}, status=status.HTTP_200_OK)
+
+
 class WorkoutPersonalView(APIView):
     http_method_names = ['get', 'post']
     authentication_classes = [JWTAuthentication]
@@ -213,11 +353,11 @@ class WorkoutPersonalView(APIView):
         return super().get_permissions()
     
     def get(self, request):
-        workouts = Workout.objects.filter(created_by=request.user, is_archived=False, original=None)
-
-        serialized_workouts = WorkoutSerializer(workouts, many=True).data
+        workouts = prefetch_service.select_authors(
+            Workout.objects.filter(created_by=request.user, is_archived=False, original=None)
+        )
 
-        return Response(serialized_workouts, status=status.HTTP_200_OK)
+        return get_list_response(request, self, workouts, WorkoutSerializer)
     
 
     def post(self, request):
@@ -238,11 +378,11 @@ class WorkoutSubcribedView(APIView):
         return super().get_permissions()
     
     def get(self, request):
-        workouts = Workout.objects.filter(created_by=request.user, is_archived=False, original__isnull=False)
-
-        serialized_workouts = WorkoutSerializer(workouts, many=True).data
+        workouts = prefetch_service.select_authors(
+            subscription_service.get_subscribed_workouts(request.user)
+        )
 
-        return Response(serialized_workouts, status=status.HTTP_200_OK)
+        return get_list_response(request, self, workouts, WorkoutSerializer)
 
 
 class WorkoutView(APIView):
@@ -255,11 +395,11 @@ class WorkoutView(APIView):
         return super().get_permissions()
     
     def get(self, request):
-        workouts = Workout.objects.filter(is_public=True)
-
-        serialized_workouts = WorkoutSerializer(workouts, many=True).data
+        workouts = prefetch_service.select_authors(
+            Workout.objects.filter(is_public=True)
+        )
 
-        return Response(serialized_workouts, status=status.HTTP_200_OK)
+        return get_list_response(request, self, workouts, WorkoutSerializer)
     
 
 class WorkoutDetailView(APIView):
@@ -274,24 +414,40 @@ class WorkoutDetailView(APIView):
         return super().get_permissions()
     
     def get(self, request, workout_id):
-        workout = get_object_or_404(Workout, pk=workout_id)
-        if workout.is_public or workout.created_by == request.user:
-            serializer = WorkoutSerializer(workout)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+        workout = get_object_or_404(prefetch_service.select_authors(Workout.objects.all()), pk=workout_id)
+        if (
+            workout.is_public or
+            workout.created_by == request.user or
+            subscription_service.is_subscribed_on_workout(workout, request.user)
+        ):
+            return get_detail_response(request, workout, WorkoutSerializer)
         return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
     
+    @transaction.atomic
     def put(self, request, workout_id):
         workout = get_object_or_404(Workout, pk=workout_id)
-        if workout.created_by == request.user:
-            serializer = WorkoutSerializer(workout, data=request.data, partial=True, context={'request': request})
-            if serializer.is_valid():
-                serializer.save()
-                return Response(serializer.data, status=status.HTTP_200_OK)
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+        if workout.created_by != request.user:
+            # Подписчик изменяет свою копию, которая создаётся только сейчас
+            workout = subscription_service.get_private_workout_copy(workout, request.user)
+            if not workout:
+                return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = WorkoutSerializer(workout, data=request.data, partial=True, context={'request': request})
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        transaction.set_rollback(True)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     def delete(self, request, workout_id):
         workout = get_object_or_404(Workout, pk=workout_id)
+
+        if workout.created_by != request.user and subscription_service.unsubscribe_from_workout(workout, request.user):
+            return Response(
+                {"message": "Unsubscribed from workout successfully."},
+                status=status.HTTP_200_OK
+            )
         
         # Check if the exercise is associated with any workouts
         if WeeklyFitnessPlanWorkout.objects.filter(workout=workout).exists():
@@ -301,7 +457,7 @@ class WorkoutDetailView(APIView):
             )
         
         if workout.is_published:
-            if Workout.objects.filter(original=workout).exists():
+            if subscription_service.workout_has_subscribers(workout):
                 return Response(
                     {"error": "Данная тренировка опубликована и имеет подписчиков. Ее нельзя удалить."},
                     status=status.HTTP_400_BAD_REQUEST
@@ -326,14 +482,11 @@ class ArchivedWorkoutView(APIView):
         return super().get_permissions()
     
     def get(self, request):
-        workouts = Workout.objects.filter(created_by=request.user, is_archived=True)
-
-        serialized_workouts = []
-
-        for workout in workouts:
-            serialized_workouts.append(WorkoutSerializer(workout).data)
+        workouts = prefetch_service.select_authors(
+            subscription_service.get_archived_workouts(request.user)
+        )
 
-        return Response(serialized_workouts, status=status.HTTP_200_OK)
+        return get_list_response(request, self, workouts, WorkoutSerializer)
 
 class ArchivedWorkoutDetailView(APIView):
     http_method_names = ['patch']
@@ -354,6 +507,13 @@ class ArchivedWorkoutDetailView(APIView):
                 {"message": "Workout archived successfully." if workout.is_archived else "Workout unarchived successfully."},
                 status=status.HTTP_200_OK
             )
+
+        is_archived = subscription_service.toggle_workout_subscription_archived(workout, request.user)
+        if is_archived is not None:
+            return Response(
+                {"message": "Workout archived successfully." if is_archived else "Workout unarchived successfully."},
+                status=status.HTTP_200_OK
+            )
         return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
 
 
@@ -370,7 +530,7 @@ class WorkoutSubscriptionView(APIView):
         workout = get_object_or_404(Workout, pk=workout_id)
 
         if workout.is_published:
-            workout.clone_for_user(request.user)
+            subscription_service.subscribe_on_workout(workout, request.user)
 
             return Response(
                 {"message": "Subscribed on workout successfully."},
@@ -389,7 +549,7 @@ class WorkoutPublishDetailView(APIView):
         return super().get_permissions()
     
     def post(self, request, workout_id):
-        workout = get_object_or_404(Exercise, pk=workout_id)
+        workout = get_object_or_404(Workout, pk=workout_id)
 
         count_all, count_not_original = originality_service.get_workout_originality_values(workout.id, request.user.id)
 
@@ -405,10 +565,10 @@ class WorkoutPublishDetailView(APIView):
         return Response({"error": "Использовано слишком много чужих элементов, низкая оригинальность"}, status=status.HTTP_400_BAD_REQUEST)\
         
     def delete(self, request, workout_id):
-        workout = get_object_or_404(Exercise, pk=workout_id)
+        workout = get_object_or_404(Workout, pk=workout_id)
 
         if workout.created_by == request.user:
-            if Workout.objects.filter(original=workout).exists():
+            if subscription_service.workout_has_subscribers(workout):
                 return Response(
                     {"error": "Данная тренировка опубликована и имеет подписчиков. Ее нельзя удалить из публичных тренировок."},
                     status=status.HTTP_400_BAD_REQUEST
@@ -433,14 +593,13 @@ class WorkoutPublishView(APIView):
         return super().get_permissions()
     
     def get(self, request):
-        workouts = Workout.objects.filter(is_published=True)
-
-        serialized_plans = []
-
-        for workout in workouts:
-            serialized_plans.append(WeeklyFitnessPlanSerializer(workout).data)
+        workouts = prefetch_service.select_authors(
+            Workout.objects.filter(is_published=True)
+        )
 
-        return Response(serialized_plans, status=status.HTTP_200_OK)
+        return get_cached_list_response(
+            request, self, workouts, WorkoutSerializer, cache_service.WORKOUT_LIST_NAMESPACE
+        )
 
 
 class WeeklyFitnessPlanPersonalView(APIView):
@@ -455,11 +614,11 @@ class WeeklyFitnessPlanPersonalView(APIView):
         return super().get_permissions()
     
     def get(self, request):
-        plans = WeeklyFitnessPlan.objects.filter(created_by=request.user, is_archived=False, original=None)
-
-        serialized_plans = WeeklyFitnessPlanSerializer(plans, many=True).data
+        plans = prefetch_service.select_authors(
+            WeeklyFitnessPlan.objects.filter(created_by=request.user, is_archived=False, original=None)
+        )
 
-        return Response(serialized_plans, status=status.HTTP_200_OK)
+        return get_list_response(request, self, plans, WeeklyFitnessPlanSerializer)
 
     def post(self, request):
         serializer = WeeklyFitnessPlanSerializer(data=request.data, context={'request': request})
@@ -479,11 +638,11 @@ class WeeklyFitnessPlanSubcribedView(APIView):
         return super().get_permissions()
     
     def get(self, request):
-        plans = Workout.objects.filter(created_by=request.user, is_archived=False, original__isnull=False)
-
-        serialized_plans = WeeklyFitnessPlanSerializer(plans, many=True).data
+        plans = prefetch_service.select_authors(
+            subscription_service.get_subscribed_plans(request.user)
+        )
 
-        return Response(serialized_plans, status=status.HTTP_200_OK)
+        return get_list_response(request, self, plans, WeeklyFitnessPlanSerializer)
 
 
 class WeeklyFitnessPlanView(APIView):
@@ -496,11 +655,11 @@ class WeeklyFitnessPlanView(APIView):
         return super().get_permissions()
     
     def get(self, request):
-        plans = WeeklyFitnessPlan.objects.filter(is_public=True)
-
-        serialized_plans = WeeklyFitnessPlanSerializer(plans, many=True).data
+        plans = prefetch_service.select_authors(
+            WeeklyFitnessPlan.objects.filter(is_public=True)
+        )
 
-        return Response(serialized_plans, status=status.HTTP_200_OK)
+        return get_list_response(request, self, plans, WeeklyFitnessPlanSerializer)
     
 
 class WeeklyFitnessPlanDetailView(APIView):
@@ -515,27 +674,43 @@ class WeeklyFitnessPlanDetailView(APIView):
         return super().get_permissions()
     
     def get(self, request, plan_id):
-        plan = get_object_or_404(WeeklyFitnessPlan, pk=plan_id)
-        if plan.is_public or plan.created_by == request.user:
-            serializer = WeeklyFitnessPlanSerializer(plan)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+        plan = get_object_or_404(prefetch_service.select_authors(WeeklyFitnessPlan.objects.all()), pk=plan_id)
+        if (
+            plan.is_public or
+            plan.created_by == request.user or
+            subscription_service.is_subscribed_on_plan(plan, request.user)
+        ):
+            return get_detail_response(request, plan, WeeklyFitnessPlanSerializer)
         return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
     
+    @transaction.atomic
     def put(self, request, plan_id):
         plan = get_object_or_404(WeeklyFitnessPlan, pk=plan_id)
-        if plan.created_by == request.user:
-            serializer = WeeklyFitnessPlanSerializer(plan, data=request.data, partial=True, context={'request': request})
-            if serializer.is_valid():
-                serializer.save()
-                return Response(serializer.data, status=status.HTTP_200_OK)
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+        if plan.created_by != request.user:
+            # Подписчик изменяет свою копию, которая создаётся только сейчас
+            plan = subscription_service.get_private_plan_copy(plan, request.user)
+            if not plan:
+                return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = WeeklyFitnessPlanSerializer(plan, data=request.data, partial=True, context={'request': request})
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        transaction.set_rollback(True)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     def delete(self, request, plan_id):
         plan = get_object_or_404(WeeklyFitnessPlan, pk=plan_id)
+
+        if plan.created_by != request.user and subscription_service.unsubscribe_from_plan(plan, request.user):
+            return Response(
+                {"message": "Unsubscribed from plan successfully."},
+                status=status.HTTP_200_OK
+            )
         
         if plan.is_published:
-            if WeeklyFitnessPlan.objects.filter(original=plan).exists():
+            if subscription_service.plan_has_subscribers(plan):
                 return Response(
                     {"error": "Данный недельный план опубликован и имеет подписчиков. Его нельзя удалить."},
                     status=status.HTTP_400_BAD_REQUEST
@@ -560,14 +735,11 @@ class ArchivedWeeklyFitnessPlanView(APIView):
         return super().get_permissions()
     
     def get(self, request):
-        plans = WeeklyFitnessPlan.objects.filter(created_by=request.user, is_archived=True)
-
-        serialized_plans = []
-
-        for plan in plans:
-            serialized_plans.append(WeeklyFitnessPlanSerializer(plan).data)
+        plans = prefetch_service.select_authors(
+            subscription_service.get_archived_plans(request.user)
+        )
 
-        return Response(serialized_plans, status=status.HTTP_200_OK)
+        return get_list_response(request, self, plans, WeeklyFitnessPlanSerializer)
 
 class ArchivedWeeklyFitnessPlanDetailView(APIView):
     http_method_names = ['patch']
@@ -580,6 +752,14 @@ class ArchivedWeeklyFitnessPlanDetailView(APIView):
     
     def patch(self, request, plan_id):
         plan = get_object_or_404(WeeklyFitnessPlan, pk=plan_id)
+
+        is_archived = subscription_service.toggle_plan_subscription_archived(plan, request.user)
+        if is_archived is not None:
+            return Response(
+                {"message": "Plan archived successfully." if is_archived else "Plan unarchived successfully."},
+                status=status.HTTP_200_OK
+            )
+
         if not plan.original:
             return Response({"error": "This plan is original"}, status=status.HTTP_400_BAD_REQUEST)
         if plan.created_by == request.user and plan.original:
@@ -606,7 +786,7 @@ class WeeklyFitnessPlanSubscriptionView(APIView):
         plan = get_object_or_404(WeeklyFitnessPlan, pk=plan_id)
 
         if plan.is_published:
-            plan.clone_for_user(request.user)
+            subscription_service.subscribe_on_plan(plan, request.user)
 
             return Response(
                 {"message": "Subscribed on plan successfully."},
@@ -645,7 +825,7 @@ class WeeklyFitnessPlanPublishDetailView(APIView):
         plan = get_object_or_404(WeeklyFitnessPlan, pk=plan_id)
 
         if plan.created_by == request.user:
-            if WeeklyFitnessPlan.objects.filter(original=plan).exists():
+            if subscription_service.plan_has_subscribers(plan):
                 return Response(
                     {"error": "Данный план опубликован и имеет подписчиков. Его нельзя удалить из публичных планов."},
             )
@@ -670,14 +850,13 @@ class WeeklyFitnessPlanPublishView(APIView):
         return super().get_permissions()
     
     def get(self, request):
-        plans = WeeklyFitnessPlan.objects.filter(is_published=True)
-
-        serialized_plans = []
-
-        for plan in plans:
-            serialized_plans.append(WeeklyFitnessPlanSerializer(plan).data)
+        plans = prefetch_service.select_authors(
+            WeeklyFitnessPlan.objects.filter(is_published=True)
+        )
 
-        return Response(serialized_plans, status=status.HTTP_200_OK)
+        return get_cached_list_response(
+            request, self, plans, WeeklyFitnessPlanSerializer, cache_service.PLAN_LIST_NAMESPACE
+        )
 
 class DataForExerciseCreationView(APIView):
     http_method_names = ['get']
@@ -689,14 +868,13 @@ class DataForExerciseCreationView(APIView):
         return super().get_permissions()
     
     def get(self, request):
-        gym_equipment = GymEquipment.objects.all()
-        exercise_categories = ExerciseCategory.objects.all()
-
-        serialized_gym_equipment = GymEquipmentSerializer(gym_equipment, many=True).data
-        serialized_exercise_categories = ExerciseCategorySerializer(exercise_categories, many=True).data
-        data = dict()
-        data['gym_equipment'] = serialized_gym_equipment
-        data['exercise_categories'] = serialized_exercise_categories
+        data, etag = reference_data_service.get_reference_data()
 
+        # Клиент уже получил эти данные, тело не отправляем
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(data, status=status.HTTP_200_OK)
 
-        return Response(data, status=status.HTTP_200_OK)
\ No newline at end of file
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
\ No newline at end of file